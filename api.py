@@ -1,8 +1,15 @@
-import re, sqlite3, datetime, joblib
+import os, re, joblib, sqlite3
 import pandas as pd
-from fastapi import FastAPI, BackgroundTasks
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from domain_index import DomainIndex, host_of
+from hot_reload import FileWatcher
+from log_sink import LogSink
+from log_rollups import read_stats
 
 app = FastAPI()
 
@@ -15,45 +22,72 @@ app.add_middleware(
 
 # Load resources
 WHITELIST = ["pnc.edu.ph", "abs-cbn.com", "facebook.com", "google.com"]
+WHITELIST_FILE = "whitelist.bin" # Built by update_whitelist.py
+
+builtin_whitelist = DomainIndex.from_domains(WHITELIST)
+whitelist = builtin_whitelist
+
+def load_whitelist():
+    global whitelist
+    if os.path.exists(WHITELIST_FILE):
+        loaded = DomainIndex.load(WHITELIST_FILE)
+        whitelist = DomainIndex.from_hashes(np.concatenate([loaded.hashes, builtin_whitelist.hashes]))
+
+load_whitelist()
+whitelist_watcher = FileWatcher(WHITELIST_FILE, load_whitelist).start()
 model = joblib.load("phiusiil_model.pkl")
 trained_features = joblib.load("feature_names.pkl")
 
 class ThreatRequest(BaseModel):
     url: str
 
-# ⚡ FUNCTION TO LOG IN BACKGROUND (Doesn't slow down the user)
+# ⚡ LOGGING IN BACKGROUND (One writer thread, batched commits; see log_sink.py)
+log_sink = LogSink("threats.db")
+
 def log_to_db(url: str, status: str):
-    try:
-        conn = sqlite3.connect("threats.db")
-        conn.execute("INSERT INTO logs (content, status, date) VALUES (?, ?, ?)",
-                     (url[:200], status, str(datetime.datetime.now())))
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        print(f"Logging Error: {e}")
+    log_sink.log(url, status)
+
+@app.on_event("shutdown")
+def flush_logs():
+    log_sink.close()
+
+def classify(url: str) -> str:
+    # 1. Whitelist Check (Host or any parent domain, NOT a substring match)
+    if host_of(url) in whitelist:
+        return "SAFE"
+
+    # 2. AI Feature Extraction
+    domain = url.split("//")[-1].split("/")[0]
+    features = pd.DataFrame([{"URLLength": len(url), "NoOfSubDomain": domain.count('.') - 1}])
+    for col in trained_features:
+        if col not in features.columns: features[col] = 0
+
+    prediction = model.predict(features[trained_features])[0]
+    return "SAFE" if prediction == 1 else "DANGER"
 
 @app.post("/analyze")
-async def analyze_threat(data: ThreatRequest, background_tasks: BackgroundTasks):
+async def analyze_threat(data: ThreatRequest):
     url = data.url.lower()
-    
-    # 1. Whitelist Check
-    if any(site in url for site in WHITELIST):
-        status = "SAFE"
-    else:
-        # 2. AI Feature Extraction
-        domain = url.split("//")[-1].split("/")[0]
-        features = pd.DataFrame([{"URLLength": len(url), "NoOfSubDomain": domain.count('.') - 1}])
-        for col in trained_features:
-            if col not in features.columns: features[col] = 0
-        
-        prediction = model.predict(features[trained_features])[0]
-        status = "SAFE" if prediction == 1 else "DANGER"
-
-    # 3. ⚡ Add Logging to Background Task (Instant Response)
-    background_tasks.add_task(log_to_db, url, status)
+
+    # pandas/sklearn block: run them off the event loop so other requests keep flowing
+    # (serve.py is the multi-process mode for CPU-bound load)
+    status = await run_in_threadpool(classify, url)
+
+    # 3. ⚡ Queue the log row (Instant Response, never blocks)
+    log_to_db(url, status)
 
     return {"result": status}
 
+@app.get("/stats")
+def verdict_stats(period: str = 'hour', buckets: int = None, top: int = 10):
+    # Answered from the rollup tables LogSink maintains, never from `logs` itself
+    try:
+        return read_stats(log_sink.db_path, period=period, buckets=buckets, top=top)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except sqlite3.Error as e:
+        return JSONResponse({'error': f'Log database unavailable: {e}'}, status_code=503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
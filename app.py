@@ -1,131 +1,241 @@
-from flask import Flask, request, jsonify
-import pandas as pd
-import joblib
+from flask import Flask, request, jsonify, g
+import numpy as np
 import os
-import math
-import re
-import requests # <--- NEEDED FOR UNROLLING
-from urllib.parse import urlparse
-from collections import Counter
+import queue
+import sqlite3
+import atexit
+import logging
+from collections import Counter as Tally
+from time import perf_counter
+from logging.handlers import QueueHandler, QueueListener
+from features import extract_features, extract_features_batch, FEATURE_SCHEMA_VERSION, SCANNER
+from cache import LRUCache
+from unroller import RedirectUnroller
+from domain_index import DomainIndex, host_of
+from bloom import whitelist_payload
+from url_index import KnownURLIndex
+from hot_reload import FileWatcher
+from model_artifact import load_artifact, load_pickle, current_version, current_path
+from batcher import MicroBatcher
+from log_sink import LogSink
+from log_rollups import read_stats
+from metrics import Registry
+from config import (MODEL_FILE, MODEL_DIR, WHITELIST_FILE, WHITELIST_TEXT_FILE, URL_INDEX_FILE, RELOAD_INTERVAL,
+                    COMPILED_CHUNK_ROWS, MAX_BATCH_URLS, BLOOM_FP_RATE, BLOOM_MAX_AGE, BATCH_MAX_SIZE,
+                    BATCH_MAX_WAIT_MS, LOG_DB, LOG_REQUESTS, LOG_RETENTION_DAYS, UNROLL_WAIT, UNROLL_DEADLINE,
+                    UNROLL_MAX_HOPS, UNROLL_MAX_PENDING, VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL,
+                    VERDICT_CACHE_MAX_MB, LOG_LEVEL)
 
 app = Flask(__name__)
 
 # --- CONFIGURATION ---
-MODEL_FILE = "phiusiil_model.pkl"
-WHITELIST_FILE = "whitelist.txt"
+# Shared settings live in config.py; these are Flask/waitress-only
+BATCH_MAX_QUEUE = int(os.environ.get("BATCH_MAX_QUEUE", 1024))
+WAITRESS_THREADS = int(os.environ.get("WAITRESS_THREADS", 16))
+
+# --- LOGGING ---
+# Request threads only enqueue records; the stdout write happens on the
+# QueueListener thread, so a slow console never stalls a request.
+def setup_logging(level=LOG_LEVEL):
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    listener = QueueListener(records, handler)
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(records)]
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log = logging.getLogger("app")
+
+# --- METRICS (Prometheus text at /metrics) ---
+STAGES = ['shortener_check', 'unroll', 'cache', 'whitelist', 'known_urls', 'features', 'inference', 'serialize']
+metrics = Registry()
+STAGE_SECONDS = {stage: metrics.histogram("phishing_detector_stage_seconds", "Time spent in one pipeline stage per request",
+                                          labels={'stage': stage}) for stage in STAGES}
+REQUEST_SECONDS = {endpoint: metrics.histogram("phishing_detector_request_seconds", "Handler time per request",
+                                               labels={'endpoint': endpoint}) for endpoint in ('predict', 'predict_batch')}
+VERDICTS = {(path, result): metrics.counter("phishing_detector_verdicts_total", "URLs classified, by deciding path",
+                                            labels={'path': path, 'result': result})
+            for path in ('cache', 'whitelist', 'known_urls', 'model') for result in ('SAFE', 'DANGER')}
+ERRORS = metrics.counter("phishing_detector_errors_total", "Requests that failed with a 500")
 
 # --- GLOBAL VARIABLES ---
-model = None
-feature_names = None
-whitelist = set()
+active = None # LoadedModel: estimator/compiled forest + features + metadata, swapped as ONE reference
+whitelist = DomainIndex.from_domains([])
+whitelist_bloom = None # (payload bytes, etag) built from `whitelist`, swapped together
+known_urls = KnownURLIndex.empty()
+log_sink = LogSink(LOG_DB, raw_retention_days=LOG_RETENTION_DAYS) if LOG_REQUESTS else None
+verdict_cache = LRUCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL, VERDICT_CACHE_MAX_MB * 1024 * 1024)
 
 # --- 1. LOAD RESOURCES ---
-def load_whitelist():
-    global whitelist
-    if os.path.exists(WHITELIST_FILE):
-        with open(WHITELIST_FILE, "r") as f:
-            whitelist = set(line.strip().lower() for line in f)
-        print(f"✅ Loaded Whitelist: {len(whitelist)} domains")
+def load_known_urls():
+    global known_urls
+    if os.path.exists(URL_INDEX_FILE):
+        known_urls = KnownURLIndex.load(URL_INDEX_FILE) # mmap; single reference swap
+        verdict_cache.clear() # A URL may have just been confirmed as phishing
+        log.info("✅ Loaded Known-URL Index: %d URLs (%.1f MB)", len(known_urls), known_urls.nbytes / 1e6)
     else:
-        print("⚠️ Whitelist file not found.")
+        log.warning("⚠️ Known-URL index not found (run populate_db.py).")
 
-def load_model():
-    global model, feature_names
-    if os.path.exists(MODEL_FILE):
-        artifact = joblib.load(MODEL_FILE)
-        if isinstance(artifact, dict):
-            model = artifact["model"]
-            feature_names = artifact["features"]
+def known_verdict(url):
+    """'SAFE'/'DANGER' when the exact URL is a labeled training sample, else None."""
+    label = known_urls.lookup(url)
+    return None if label is None else ("SAFE" if label == 1 else "DANGER")
+
+def build_bloom(index):
+    """
+    Wire-format Bloom filter of `index` for the extension. Shortener domains
+    are left out: their links must reach the server to be unrolled first.
+    """
+    return whitelist_payload(index, SCANNER.shorteners, BLOOM_FP_RATE)
+
+def load_whitelist():
+    global whitelist, whitelist_bloom
+    if os.path.exists(WHITELIST_FILE) or os.path.exists(WHITELIST_TEXT_FILE):
+        if os.path.exists(WHITELIST_FILE):
+            new_whitelist = DomainIndex.load(WHITELIST_FILE) # mmap: no cold-start pause
         else:
-            model = artifact
-            feature_names = ['url_len', 'hostname_len', 'count_dots', 'count_dashes', 
-                             'count_at', 'count_digits', 'sus_word_count', 'is_bad_tld', 'is_https']
-        print(f"✅ AI Model Loaded (Expecting {len(feature_names)} features)")
+            new_whitelist = DomainIndex.from_text_file(WHITELIST_TEXT_FILE)
+        bloom = build_bloom(new_whitelist)
+        whitelist = new_whitelist # Single reference swap; in-flight requests keep the old one
+        whitelist_bloom = bloom
+        verdict_cache.clear() # Old verdicts were made against the old list
+        log.info("✅ Loaded Whitelist: %d domains (%.1f MB, filter %.1f MB)",
+                 len(whitelist), whitelist.nbytes / 1e6, len(bloom[0]) / 1e6)
     else:
-        print("❌ Model not found! Run train_model.py")
+        log.warning("⚠️ Whitelist file not found.")
 
-# --- 2. THE UNROLLER (New Feature) ---
-def resolve_redirects(url):
+def load_model():
     """
-    Follows bit.ly/etc to find the REAL destination.
+    Loads the CURRENT versioned artifact (memory-mapped, checksummed), or the
+    legacy pickle when there is none, then publishes it with one reference
+    swap: in-flight requests finish on the model they started with.
     """
-    try:
-        # We use a HEAD request because it's faster (doesn't download the body)
-        response = requests.head(url, allow_redirects=True, timeout=3)
-        real_url = response.url
-        if real_url != url:
-            print(f"   🔄 Unrolled: {url}  --->  {real_url}")
-        return real_url
-    except:
-        return url # If it fails, just analyze the original
+    global active
+    loaded = None
+    if current_version(MODEL_DIR):
+        try:
+            loaded = load_artifact(MODEL_DIR)
+        except (OSError, ValueError, KeyError) as e:
+            if active is not None:
+                raise # Hot reload: FileWatcher keeps the model we have
+            log.error("❌ Model artifact in %s unusable (%s); trying %s", MODEL_DIR, e, MODEL_FILE)
+    if loaded is None and os.path.exists(MODEL_FILE):
+        loaded = load_pickle(MODEL_FILE)
+    if loaded is None:
+        log.error("❌ Model not found! Run train_model.py")
+        return
+
+    schema = loaded.info.get('schema_version')
+    if 'schema_version' in loaded.info and schema != FEATURE_SCHEMA_VERSION:
+        log.warning("⚠️ Model was trained on feature schema v%s, this server extracts v%s; retrain with train_model.py",
+                    schema, FEATURE_SCHEMA_VERSION)
+    active = loaded
+    verdict_cache.clear() # Old verdicts were made by the old model
+    log.info("✅ AI Model Loaded: %s (Expecting %d features)", loaded.version, len(loaded.features))
+
+def reload_pickle():
+    if not current_version(MODEL_DIR): # A versioned artifact wins over the pickle
+        load_model()
+
+# --- 2. THE UNROLLER ---
+# Follows bit.ly/etc to find the REAL destination on a shared, pooled thread
+# pool (see unroller.py) so a slow shortener can't hold a waitress thread.
+unroller = RedirectUnroller(max_pending=UNROLL_MAX_PENDING, max_hops=UNROLL_MAX_HOPS, deadline=UNROLL_DEADLINE,
+                            is_shortener=SCANNER.is_shortener)
 
 # --- 3. FEATURE EXTRACTION ---
-def calculate_entropy(text):
-    if not text: return 0
-    entropy = 0
-    total = len(text)
-    for count in Counter(text).values():
-        p = count / total
-        entropy -= p * math.log2(p)
-    return entropy
-
-def check_impersonation(url, domain):
-    brands = {
-        'google': 'google.com', 'facebook': 'facebook.com', 'amazon': 'amazon.com',
-        'paypal': 'paypal.com', 'netflix': 'netflix.com', 'microsoft': 'microsoft.com',
-        'apple': 'apple.com', 'instagram': 'instagram.com', 'whatsapp': 'whatsapp.com',
-        'bdo': 'bdo.com.ph', 'bpi': 'bpi.com.ph', 'metrobank': 'metrobank.com.ph',
-        'gcash': 'gcash.com'
-    }
-    for brand, legit_domain in brands.items():
-        if brand in url and legit_domain not in domain:
-            return 1 
-    return 0
-
-def extract_features(url):
-    features = {}
-    url = str(url).lower()
+# Lives in features.py so training and serving share the exact same code.
+
+def predict_matrix(X, loaded=None):
+    """Labels for a float32 matrix in the model's feature order."""
+    return (loaded or active).predict(X, COMPILED_CHUNK_ROWS)
+
+# Concurrent /predict handlers share one batched model call
+batcher = MicroBatcher(predict_matrix, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, BATCH_MAX_QUEUE)
+
+def predict_one(X, loaded):
+    """Label for one row built in `loaded.features` order; scored by that same model."""
     try:
-        parsed = urlparse(url)
-        if not parsed.scheme: parsed = urlparse("http://" + url)
-        hostname = parsed.netloc
-        path = parsed.path
-    except:
-        hostname = url
-        path = ""
-
-    features['url_len'] = len(url)
-    features['hostname_len'] = len(hostname)
-    features['path_len'] = len(path)
-    features['entropy'] = calculate_entropy(url)
-    features['count_dots'] = url.count('.')
-    features['count_dashes'] = url.count('-')
-    features['count_at'] = url.count('@')
-    features['count_qmark'] = url.count('?')
-    features['count_digits'] = sum(c.isdigit() for c in url)
-    
-    sus_keywords = ['login', 'verify', 'update', 'account', 'secure', 'banking']
-    features['sus_word_count'] = sum(1 for w in sus_keywords if w in url)
-    
-    bad_tlds = ['.xyz', '.top', '.club', '.info', '.site', '.cn']
-    features['is_bad_tld'] = 1 if any(tld in url for tld in bad_tlds) else 0
-    
-    features['is_https'] = 1 if url.startswith('https') else 0
-    features['is_impersonating'] = check_impersonation(url, hostname)
-    
-    return features
+        return batcher.predict(X, loaded)
+    except queue.Full:
+        return predict_matrix(X, loaded)[0] # Backlog full: don't queue behind it, predict inline
 
 # Initialize
 load_whitelist()
+load_known_urls()
 load_model()
+whitelist_watcher = FileWatcher(WHITELIST_FILE, load_whitelist, RELOAD_INTERVAL).start()
+known_urls_watcher = FileWatcher(URL_INDEX_FILE, load_known_urls, RELOAD_INTERVAL).start()
+model_watcher = FileWatcher(current_path(MODEL_DIR), load_model, RELOAD_INTERVAL).start()
+pickle_watcher = FileWatcher(MODEL_FILE, reload_pickle, RELOAD_INTERVAL).start()
+
+# Existing stats, read at scrape time
+metrics.register('histogram', "phishing_detector_batcher_queue_wait_seconds", "Time a /predict row waited for its batch",
+                 batcher.queue_wait)
+metrics.register('histogram', "phishing_detector_batcher_batch_size", "Rows per batched model call", batcher.batch_size)
+metrics.gauge("phishing_detector_verdict_cache_entries", "Entries in the verdict cache", lambda: len(verdict_cache))
+metrics.gauge("phishing_detector_verdict_cache_hit_rate", "Verdict cache hit rate since start",
+              lambda: verdict_cache.stats()['hit_rate'])
+metrics.gauge("phishing_detector_unroller_in_flight", "Redirect lookups in progress", lambda: unroller.stats()['in_flight'])
+metrics.register('counter', "phishing_detector_unroller_shed_total", "Redirect lookups shed under load",
+                 lambda: unroller.stats()['shed'])
+metrics.gauge("phishing_detector_whitelist_domains", "Domains in the loaded whitelist", lambda: len(whitelist))
+metrics.gauge("phishing_detector_known_urls", "URLs in the known-URL index", lambda: len(known_urls))
+if log_sink is not None:
+    metrics.register('counter', "phishing_detector_log_rows_dropped_total", "Request log rows dropped",
+                     lambda: log_sink.dropped)
+    metrics.gauge("phishing_detector_log_writer_up", "1 while the request-log writer thread runs",
+                  lambda: int(log_sink.alive))
+
+@app.before_request
+def start_timer():
+    g.started = perf_counter()
 
 @app.after_request
 def add_cors_headers(response):
+    histogram = REQUEST_SECONDS.get(request.endpoint)
+    if histogram is not None and request.method == 'POST':
+        histogram.observe(perf_counter() - g.started)
     response.headers["Access-Control-Allow-Origin"] = "*"
     response.headers["Access-Control-Allow-Headers"] = "Content-Type"
-    response.headers["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
     return response
 
+# --- 4. SHARED PIPELINE HELPERS ---
+def log_verdict(url, result):
+    if log_sink is not None:
+        log_sink.log(url, result) # Non-blocking; the writer thread batches the INSERTs
+
+def is_shortened(url):
+    return SCANNER.is_shortener(host_of(url)) # Hostname match; lists in patterns.json
+
+def unroll_if_shortened(urls):
+    """
+    Only pays for a network round-trip when a URL looks like a shortener; all
+    short links of one request share a single UNROLL_WAIT budget.
+    Returns {url: (final_url, complete)}.
+    """
+    with STAGE_SECONDS['shortener_check'].time():
+        short = [u for u in urls if is_shortened(u)]
+    results = {}
+    if short:
+        with STAGE_SECONDS['unroll'].time():
+            results = unroller.resolve_many(short, UNROLL_WAIT)
+    return {u: results.get(u, (u, True)) for u in urls}
+
+def respond(payload):
+    with STAGE_SECONDS['serialize'].time():
+        return jsonify(payload)
+
+def verdict_response(url, result, path):
+    VERDICTS[(path, result)].inc()
+    log_verdict(url, result)
+    return respond({'url': url, 'result': result})
+
 # --- ROUTES ---
 @app.route('/predict', methods=['POST', 'OPTIONS'])
 def predict():
@@ -133,54 +243,207 @@ def predict():
         return jsonify({}), 200
 
     try:
+        generation = verdict_cache.generation # Before reading any state a reload could swap
         data = request.json
         original_url = data.get('url', '').strip() # Keep case for unrolling
         if not original_url: return jsonify({'error': 'No URL'}), 400
 
-        print(f"🔎 Analyzing: {original_url}")
+        log.debug("🔎 Analyzing: %s", original_url)
 
         # 1. UNROLL SHORTENED LINKS
         # Check if it looks like a shortener before wasting time
-        shorteners = ['bit.ly', 'goo.gl', 'tinyurl', 't.co', 'is.gd', 'ow.ly']
-        if any(s in original_url.lower() for s in shorteners):
-            final_url = resolve_redirects(original_url)
-        else:
-            final_url = original_url
+        final_url, complete = unroll_if_shortened([original_url])[original_url]
 
         # Lowercase for analysis
         url_for_ai = final_url.lower()
 
+        with STAGE_SECONDS['cache'].time():
+            cached = verdict_cache.get(url_for_ai)
+        if cached:
+            return verdict_response(original_url, cached, 'cache')
+
         # 2. WHITELIST CHECK (On the FINAL URL)
-        try:
-            parsed = urlparse(url_for_ai)
-            if not parsed.scheme: parsed = urlparse("http://" + url_for_ai)
-            domain = parsed.netloc.replace("www.", "")
-        except:
-            domain = url_for_ai
-
-        if domain in whitelist:
-            print(f"   ✅ Whitelisted ({domain})")
-            return jsonify({'url': original_url, 'result': 'SAFE'})
-
-        # 3. AI PREDICTION
-        if not model: return jsonify({'error': 'Model not loaded'}), 500
+        with STAGE_SECONDS['whitelist'].time():
+            domain = host_of(url_for_ai)
+            whitelisted = domain in whitelist # Host or any parent domain
+
+        if whitelisted:
+            log.debug("   ✅ Whitelisted (%s)", domain)
+            if complete: verdict_cache.set(url_for_ai, 'SAFE', generation)
+            return verdict_response(original_url, 'SAFE', 'whitelist')
+
+        # 3. KNOWN URL (Exact match against the labeled training data)
+        with STAGE_SECONDS['known_urls'].time():
+            known = known_verdict(url_for_ai)
+        if known:
+            if complete: verdict_cache.set(url_for_ai, known, generation)
+            return verdict_response(original_url, known, 'known_urls')
+
+        # 4. AI PREDICTION
+        loaded = active
+        if loaded is None: return jsonify({'error': 'Model not loaded'}), 500
         
-        feats = extract_features(url_for_ai)
-        df = pd.DataFrame([feats])
-        df = df.reindex(columns=feature_names, fill_value=0)
+        with STAGE_SECONDS['features'].time():
+            feats = extract_features(url_for_ai)
+            X = np.array([[feats.get(name, 0) for name in loaded.features]], dtype=np.float32)
         
-        pred = model.predict(df)[0]
+        with STAGE_SECONDS['inference'].time():
+            pred = predict_one(X, loaded)
         result = "SAFE" if pred == 1 else "DANGER"
+        if complete: verdict_cache.set(url_for_ai, result, generation)
         
-        print(f"   🤖 AI Says: {result}")
-        return jsonify({'url': original_url, 'result': result})
+        log.debug("   🤖 AI Says: %s", result)
+        return verdict_response(original_url, result, 'model')
 
     except Exception as e:
-        print(f"❌ Error: {e}")
+        ERRORS.inc()
+        log.exception("❌ Error: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict_batch', methods=['POST', 'OPTIONS'])
+def predict_batch():
+    """
+    Classifies a whole page of links in one round-trip.
+    Body: {"urls": [...]}  ->  {"results": [{"url": ..., "result": ...}, ...]}
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+
+    try:
+        generation = verdict_cache.generation # Before reading any state a reload could swap
+        data = request.json or {}
+        urls = data.get('urls')
+        if not isinstance(urls, list) or not urls:
+            return jsonify({'error': 'No URLs'}), 400
+        if len(urls) > MAX_BATCH_URLS:
+            return jsonify({'error': f'Too many URLs (max {MAX_BATCH_URLS})'}), 413
+
+        # 1. DEDUPE (Keep first-seen order; anything but a string is SKIPPED)
+        originals = [u.strip() if isinstance(u, str) else None for u in urls]
+        distinct = [u for u in dict.fromkeys(originals) if u]
+        log.debug("🔎 Analyzing batch: %d links (%d distinct)", len(originals), len(distinct))
+
+        # 2. UNROLL + NORMALIZE
+        unrolled = unroll_if_shortened(distinct)
+        final_urls = {u: final.lower() for u, (final, _) in unrolled.items()}
+
+        # 3. CACHE + WHITELIST CHECK (Once per distinct domain)
+        domain_safe = {}
+        verdicts = {}
+        paths = Tally()
+        pending = []
+        cache_time = whitelist_time = 0.0
+        for original, url_for_ai in final_urls.items():
+            started = perf_counter()
+            cached = verdict_cache.get(url_for_ai)
+            cache_time += perf_counter() - started
+            if cached:
+                verdicts[original] = cached
+                paths[('cache', cached)] += 1
+                continue
+            started = perf_counter()
+            domain = host_of(url_for_ai)
+            if domain not in domain_safe:
+                domain_safe[domain] = domain in whitelist
+            whitelist_time += perf_counter() - started
+            if domain_safe[domain]:
+                verdicts[original] = "SAFE"
+                paths[('whitelist', 'SAFE')] += 1
+                if unrolled[original][1]: verdict_cache.set(url_for_ai, "SAFE", generation)
+            else:
+                pending.append(original)
+        STAGE_SECONDS['cache'].observe(cache_time)
+        STAGE_SECONDS['whitelist'].observe(whitelist_time)
+
+        # 4. KNOWN URLS (One searchsorted for everything left)
+        if pending:
+            with STAGE_SECONDS['known_urls'].time():
+                labels = known_urls.lookup_many([final_urls[u] for u in pending])
+            unknown = []
+            for original, label in zip(pending, labels):
+                if label < 0:
+                    unknown.append(original)
+                    continue
+                verdicts[original] = "SAFE" if label == 1 else "DANGER"
+                paths[('known_urls', verdicts[original])] += 1
+                if unrolled[original][1]: verdict_cache.set(final_urls[original], verdicts[original], generation)
+            pending = unknown
+
+        # 5. AI PREDICTION (One matrix, one model call)
+        if pending:
+            loaded = active
+            if loaded is None: return jsonify({'error': 'Model not loaded'}), 500
+            with STAGE_SECONDS['features'].time():
+                df = extract_features_batch([final_urls[u] for u in pending])
+                X = df.reindex(columns=loaded.features, fill_value=0).to_numpy(dtype=np.float32)
+            with STAGE_SECONDS['inference'].time():
+                preds = predict_matrix(X, loaded)
+            for original, pred in zip(pending, preds):
+                verdicts[original] = "SAFE" if pred == 1 else "DANGER"
+                paths[('model', verdicts[original])] += 1
+                if unrolled[original][1]: verdict_cache.set(final_urls[original], verdicts[original], generation)
+
+        log.debug("   ✅ %d whitelisted/cached/known, 🤖 %d sent to AI", len(verdicts) - len(pending), len(pending))
+        for key, count in paths.items():
+            VERDICTS[key].inc(count)
+        for u, result in verdicts.items():
+            log_verdict(u, result)
+        results = [{'url': u if u is not None else raw, 'result': verdicts.get(u, 'SKIPPED')}
+                   for u, raw in zip(originals, urls)]
+        return respond({'results': results})
+
+    except Exception as e:
+        ERRORS.inc()
+        log.exception("❌ Error: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/batcher_stats', methods=['GET'])
+def batcher_stats():
+    return jsonify(batcher.stats())
+
+@app.route('/whitelist_bloom', methods=['GET'])
+def whitelist_bloom_filter():
+    """Bloom filter of the whitelist (format in bloom.py); 304 when the ETag still matches."""
+    if whitelist_bloom is None: return jsonify({'error': 'Whitelist not loaded'}), 503
+    payload, etag = whitelist_bloom
+    response = app.response_class(payload, mimetype='application/octet-stream')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={BLOOM_MAX_AGE}'
+    return response.make_conditional(request)
+
+@app.route('/model', methods=['GET'])
+def model_info():
+    loaded = active
+    if loaded is None: return jsonify({'error': 'Model not loaded'}), 503
+    return jsonify(loaded.info)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.route('/stats', methods=['GET'])
+def verdict_stats():
+    """
+    Verdict counts from the log rollups, e.g. /stats?period=minute&buckets=30&top=5
+    (period: minute|hour). Cost depends on the window, not on the log size.
+    """
+    try:
+        return jsonify(read_stats(LOG_DB, period=request.args.get('period', 'hour'),
+                                  buckets=request.args.get('buckets', type=int),
+                                  top=request.args.get('top', 10, type=int)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except sqlite3.Error as e:
+        return jsonify({'error': f'Log database unavailable: {e}'}), 503
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'verdicts': verdict_cache.stats(), 'unroller': unroller.stats(),
+                    'log_sink': log_sink.stats() if log_sink else None})
+
 if __name__ == '__main__':
     from waitress import serve
+    setup_logging() # Only when run as the server; importing app leaves the root logger alone
     print("--- 🚀 SERVER STARTED (With Link Unrolling) ---")
     print("    ✅ Serving on http://127.0.0.1:5000")
-    serve(app, host='0.0.0.0', port=5000)
\ No newline at end of file
+    serve(app, host='0.0.0.0', port=5000, threads=WAITRESS_THREADS)
\ No newline at end of file
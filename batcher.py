@@ -0,0 +1,83 @@
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+from time import monotonic
+from metrics import Histogram, LATENCY_BUCKETS, SIZE_BUCKETS
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one batched call.
+
+    Request threads submit() a feature vector, plus the model it was built
+    for, and wait on a Future. One scheduler thread takes the first pending
+    vector, keeps collecting for at most `max_wait_ms` or until `max_batch`
+    vectors are in hand, then calls predict_fn(matrix, model) once per model
+    in the batch and hands each row's label back. Grouping by model means a
+    row queued just before a hot swap is still scored by the model whose
+    columns it has. `max_queue` bounds the backlog; submit() raises
+    queue.Full beyond it.
+    """
+
+    def __init__(self, predict_fn, max_batch=64, max_wait_ms=2.0, max_queue=1024):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(max_queue)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.batch_size = Histogram(SIZE_BUCKETS)
+        self.rejected = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, vector, model=None):
+        future = Future()
+        try:
+            self._queue.put_nowait((vector, model, future, monotonic()))
+        except queue.Full:
+            self.rejected += 1
+            raise
+        return future
+
+    def predict(self, vector, model=None, timeout=None):
+        """Blocking helper: label for one feature vector."""
+        return self.submit(vector, model).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = monotonic()
+            groups = {} # id(model) -> (model, [(vector, future)]); models need not be hashable
+            for vector, model, future, enqueued in batch:
+                self.queue_wait.observe(started - enqueued)
+                groups.setdefault(id(model), (model, []))[1].append((vector, future))
+            self.batch_size.observe(len(batch))
+            for model, rows in groups.values():
+                try:
+                    labels = self.predict_fn(np.vstack([vector for vector, _ in rows]), model)
+                    for (_, future), label in zip(rows, labels):
+                        future.set_result(label)
+                except Exception as e:
+                    for _, future in rows:
+                        future.set_exception(e)
+
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queue_depth': self._queue.qsize(),
+            'rejected': self.rejected,
+            'queue_wait_seconds': self.queue_wait.snapshot(),
+            'batch_size': self.batch_size.snapshot(),
+        }
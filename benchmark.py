@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import string
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import numpy as np
+import pandas as pd
+import requests
+from features import BRANDS, SUS_KEYWORDS, BAD_TLDS, extract_features, extract_features_batch
+
+# --- CONFIGURATION ---
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_SIZE = 50000           # URLs written to the generated threats.db
+REQUESTS_PER_LEVEL = 2000     # /predict calls per concurrency level
+CONCURRENCY = "1,4,16"
+FEATURE_URLS = 20000          # URLs for the extract_features throughput runs
+WARMUP_REQUESTS = 50
+SERVER_START_TIMEOUT = 60     # Seconds to wait for a server to accept requests
+
+# Corpus mix (fractions of the generated URLs)
+MIX = {'whitelisted': 0.3, 'shortener': 0.1, 'impersonation': 0.3, 'phishing': 0.3}
+WHITELIST_DOMAINS = ['google.com', 'facebook.com', 'youtube.com', 'wikipedia.org', 'amazon.com',
+                     'microsoft.com', 'apple.com', 'github.com', 'pnc.edu.ph', 'abs-cbn.com']
+SHORTENER_HOSTS = ['bit.ly', 'tinyurl.com', 't.co', 'is.gd', 'ow.ly']
+WORDS = ['home', 'news', 'docs', 'shop', 'cart', 'item', 'help', 'blog', 'user', 'media', 'search', 'about']
+
+# --- 1. SYNTHETIC CORPUS ---
+def _token(rng, n, alphabet=string.ascii_lowercase + string.digits):
+    return ''.join(rng.choice(alphabet) for _ in range(n))
+
+def _path(rng, depth):
+    return '/'.join(rng.choice(WORDS) for _ in range(depth))
+
+def generate_corpus(n, seed=0):
+    """
+    n (url, label, kind) tuples mixing whitelisted, shortener, brand
+    impersonation and random phishing-like URLs in MIX proportions.
+    Labels use the populate_db vocabulary: 'legitimate' / 'phishing'.
+    """
+    rng = random.Random(seed)
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=n)
+    corpus = []
+    for kind in kinds:
+        if kind == 'whitelisted':
+            url = f"https://www.{rng.choice(WHITELIST_DOMAINS)}/{_path(rng, rng.randint(0, 3))}"
+            label = 'legitimate'
+        elif kind == 'shortener':
+            url = f"https://{rng.choice(SHORTENER_HOSTS)}/{_token(rng, 7, string.ascii_letters + string.digits)}"
+            label = rng.choice(['legitimate', 'phishing'])
+        elif kind == 'impersonation':
+            brand = rng.choice(list(BRANDS))
+            url = (f"http://{brand}-{rng.choice(SUS_KEYWORDS)}-{_token(rng, 4)}{rng.choice(BAD_TLDS + ['.com', '.net'])}"
+                   f"/{rng.choice(SUS_KEYWORDS)}?id={_token(rng, 12)}")
+            label = 'phishing'
+        else:
+            host = '.'.join(_token(rng, rng.randint(3, 10)) for _ in range(rng.randint(1, 4)))
+            url = (f"{rng.choice(['http', 'https'])}://{host}{rng.choice(BAD_TLDS + ['.com'])}"
+                   f"/{rng.choice(SUS_KEYWORDS)}/{_token(rng, rng.randint(5, 40))}")
+            if rng.random() < 0.2:
+                url = url.replace('://', '://' + _token(rng, 6) + '@', 1)
+            label = 'phishing'
+        corpus.append((url, label, kind))
+    return corpus
+
+def write_workdir(workdir, corpus):
+    """Corpus CSV + whitelist.txt the scripts under test pick up from their cwd."""
+    pd.DataFrame([(u, l) for u, l, _ in corpus], columns=['url', 'label']).to_csv(
+        os.path.join(workdir, "corpus.csv"), index=False)
+    with open(os.path.join(workdir, "whitelist.txt"), "w") as f:
+        f.write("\n".join(WHITELIST_DOMAINS) + "\n")
+
+# --- 2. HELPERS ---
+def percentiles(samples):
+    if not samples:
+        return {}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3),
+            'max_ms': round(max(samples) * 1000.0, 3)}
+
+def child_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+def run_measured(args, cwd):
+    """
+    Runs one script to completion. Peak RSS comes from wait4() on that exact
+    child (Linux reports KB); worker processes it forks are not included.
+    """
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable] + args, cwd=cwd, env=child_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = proc.stderr.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    result = {'command': ' '.join(args), 'wall_s': round(time.perf_counter() - started, 3),
+              'peak_rss_mb': round(usage.ru_maxrss / 1024.0, 1), 'exit_code': proc.returncode}
+    if proc.returncode != 0:
+        result['stderr_tail'] = stderr.decode(errors='replace')[-2000:]
+    return result
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+# --- 3. FEATURE EXTRACTION THROUGHPUT ---
+def bench_features(urls):
+    print(f"🧪 extract_features on {len(urls)} URLs...")
+    started = time.perf_counter()
+    for url in urls:
+        extract_features(url)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    extract_features_batch(urls)
+    batch = time.perf_counter() - started
+    return {'urls': len(urls),
+            'single_urls_per_s': round(len(urls) / single, 1),
+            'batch_urls_per_s': round(len(urls) / batch, 1)}
+
+# --- 4. OFFLINE JOBS (populate_db / train_model) ---
+def bench_jobs(workdir, stream):
+    print("📥 populate_db.py --incremental on the generated corpus...")
+    results = {'populate_db': run_measured(
+        [os.path.join(REPO_DIR, "populate_db.py"), "--incremental", "--sources", "", "--csv", "corpus.csv"], workdir)}
+
+    print("🌲 train_model.py on the generated threats.db...")
+    results['train_model'] = run_measured([os.path.join(REPO_DIR, "train_model.py")], workdir)
+    if stream:
+        print("🌲 train_model.py --stream...")
+        results['train_model_stream'] = run_measured(
+            [os.path.join(REPO_DIR, "train_model.py"), "--stream", "--no-store"], workdir)
+    return results
+
+def write_api_model(workdir, corpus):
+    """api.py still expects a bare estimator over its two legacy columns."""
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+    api_dir = os.path.join(workdir, "api")
+    os.makedirs(api_dir, exist_ok=True)
+    urls = [u.lower() for u, _, _ in corpus]
+    hosts = [u.split("//")[-1].split("/")[0] for u in urls]
+    X = pd.DataFrame({"URLLength": [len(u) for u in urls], "NoOfSubDomain": [h.count('.') - 1 for h in hosts]})
+    y = [1 if l == 'legitimate' else 0 for _, l, _ in corpus]
+    model = RandomForestClassifier(n_estimators=50, random_state=42).fit(X, y)
+    joblib.dump(model, os.path.join(api_dir, "phiusiil_model.pkl"))
+    joblib.dump(list(X.columns), os.path.join(api_dir, "feature_names.pkl"))
+    return api_dir
+
+# --- 5. SERVING LATENCY ---
+SERVERS = {
+    # name: (bootstrap code, endpoint)
+    'app': ("import app; from waitress import serve; app.setup_logging(); "
+            "serve(app.app, host='127.0.0.1', port={port}, threads=app.WAITRESS_THREADS, _quiet=True)", "/predict"),
+    'api': ("import api, uvicorn; uvicorn.run(api.app, host='127.0.0.1', port={port}, log_level='warning')", "/analyze"),
+    'serve': ("import serve, uvicorn; "
+              "uvicorn.run(serve.app, host='127.0.0.1', port={port}, log_level='warning')", "/predict"),
+}
+
+def start_server(name, cwd, env_overrides):
+    code, endpoint = SERVERS[name]
+    port = free_port()
+    env = child_env()
+    env.update(env_overrides)
+    proc = subprocess.Popen([sys.executable, "-c", code.format(port=port)], cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}{endpoint}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{name} exited during startup (code {proc.returncode})")
+        try:
+            requests.post(url, json={'url': 'https://www.google.com/'}, timeout=2)
+            return proc, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{name} did not accept requests within {SERVER_START_TIMEOUT}s")
+
+def load_test(url, urls, total, concurrency, offset=0):
+    """
+    Closed loop: `concurrency` clients, each with its own keep-alive session,
+    sending urls[offset:offset + total] (wrapping around the corpus).
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    counter = iter(range(offset, offset + total))
+
+    def client():
+        session = requests.Session()
+        local, failed = [], 0
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                ok = session.post(url, json={'url': urls[i % len(urls)]}, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            local.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return {'concurrency': concurrency, 'requests': total, 'errors': errors[0],
+            'throughput_rps': round(total / wall, 1), **percentiles(latencies)}
+
+def bench_serving(name, cwd, urls, total, levels, env_overrides):
+    print(f"🚀 Benchmarking {name}...")
+    proc, url = start_server(name, cwd, env_overrides)
+    try:
+        # Every run gets its own slice of the corpus, so no level replays URLs an earlier one sent
+        if WARMUP_REQUESTS + total * len(levels) > len(urls):
+            print(f"   ⚠️ {len(urls)} URLs is fewer than the {WARMUP_REQUESTS + total * len(levels)} requests; later levels repeat URLs")
+        load_test(url, urls, WARMUP_REQUESTS, 1)
+        offset = WARMUP_REQUESTS
+        results = []
+        for level in levels:
+            results.append(load_test(url, urls, total, level, offset))
+            offset += total
+            print(f"   {name} c={level}: {results[-1]['throughput_rps']} req/s, p99 {results[-1].get('p99_ms')} ms")
+        return results
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency, throughput and training-cost benchmarks (JSON output).")
+    parser.add_argument("--urls", type=int, default=CORPUS_SIZE, help="Generated corpus size")
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_LEVEL, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", default=CONCURRENCY, help="Comma-separated client counts")
+    parser.add_argument("--targets", default="features,jobs,app,api,serve",
+                        help="Comma-separated subset of features,jobs,app,api,serve")
+    parser.add_argument("--stream", action="store_true", help="Also time train_model.py --stream")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Keep generated files here instead of a temp dir")
+    parser.add_argument("--output", default="benchmark.json", help="JSON report path ('-' for stdout)")
+    args = parser.parse_args()
+
+    targets = set(args.targets.split(","))
+    levels = [int(c) for c in args.concurrency.split(",") if c]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="phish-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    corpus = generate_corpus(args.urls, args.seed)
+    urls = [u for u, _, _ in corpus]
+    write_workdir(workdir, corpus)
+    report = {
+        'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'workdir': workdir,
+                 'args': vars(args)},
+        'corpus': {'urls': len(corpus), 'mix': MIX, 'seed': args.seed},
+    }
+
+    if 'features' in targets:
+        report['features'] = bench_features(urls[:FEATURE_URLS])
+    if targets & {'jobs', 'app', 'serve'}:
+        # app.py and serve.py need the model train_model.py produces
+        report['jobs'] = bench_jobs(workdir, args.stream)
+
+    # Shortener URLs hit the network; cap how long a request may wait on them.
+    # The verdict cache is off so every request pays for the full pipeline.
+    server_env = {'UNROLL_WAIT': os.environ.get('UNROLL_WAIT', '0.2'), 'RELOAD_INTERVAL': '3600',
+                  'VERDICT_CACHE_SIZE': '0'}
+    report['serving'] = {}
+    if 'app' in targets:
+        report['serving']['app'] = bench_serving('app', workdir, urls, args.requests, levels, server_env)
+    if 'api' in targets:
+        api_dir = write_api_model(workdir, corpus)
+        report['serving']['api'] = bench_serving('api', api_dir, urls, args.requests, levels, server_env)
+    if 'serve' in targets:
+        report['serving']['serve'] = bench_serving('serve', workdir, urls, args.requests, levels, server_env)
+
+    output = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"✅ Report saved to {args.output}")
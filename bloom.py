@@ -0,0 +1,136 @@
+import math
+import struct
+import hashlib
+import numpy as np
+from functools import lru_cache
+from domain_index import candidate_suffixes, domain_hash, domain_hashes, normalize_domain, public_suffixes, MASK_64
+
+# --- CONFIGURATION ---
+# Wire format (little endian), served to the extension as-is:
+#   magic "PHBLOOM\0" | format u32 | k u32 | m_bits u64 | count u64 | seed u64 | built_at u64 | bits
+# Bit p lives in byte p >> 3 at bit p & 7.
+# /whitelist_bloom serves two filters back to back: the whitelist, then the
+# Public Suffix List rules, so the extension can stop its parent-domain walk
+# at the registrable domain like domain_index.candidate_suffixes does.
+MAGIC = b"PHBLOOM\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQ")
+CHUNK = 100000 # Hashes per vectorized insert (bounds the (chunk, k) position matrix)
+SUFFIX_FP_RATE = 0.01 # A false "public suffix" only ends the walk early (server decides)
+
+# splitmix64 finalizer: spreads FNV-1a's weak low bits over all 64
+MIX_1 = 0xbf58476d1ce4e5b9
+MIX_2 = 0x94d049bb133111eb
+
+def _mix(z):
+    z = ((z ^ (z >> 30)) * MIX_1) & MASK_64
+    z = ((z ^ (z >> 27)) * MIX_2) & MASK_64
+    return z ^ (z >> 31)
+
+def _mix_array(z):
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX_1) # uint64 math wraps like & MASK_64
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX_2)
+    return z ^ (z >> np.uint64(31))
+
+def optimal_size(count, fp_rate):
+    """(m_bits, k) for `count` keys at false-positive rate `fp_rate`."""
+    count = max(count, 1)
+    m = math.ceil(-count * math.log(fp_rate) / (math.log(2) ** 2))
+    m = max(64, (m + 7) // 8 * 8)
+    k = max(1, round(m / count * math.log(2)))
+    return m, k
+
+class BloomFilter:
+    """
+    Bloom filter over the whitelist's 64-bit FNV-1a domain hashes, so the
+    extension can answer "known good" locally with the same hash it already
+    computes for DomainIndex lookups.
+
+    Probe i of a key is (h1 + i * h2) mod m (Kirsch-Mitzenmacher double
+    hashing) with h1/h2 the low/high 32 bits of mix(hash ^ seed), h2 forced
+    odd. Every term stays below 2**53, so JavaScript Numbers get it exactly.
+    The seed changes with the list, so a false positive someone finds
+    against one build does not carry over to the next.
+    """
+
+    def __init__(self, bits, m_bits, k, count, seed, built_at=0):
+        self.bits = bits          # uint8 (m_bits / 8,)
+        self.m_bits = int(m_bits)
+        self.k = int(k)
+        self.count = int(count)
+        self.seed = int(seed)
+        self.built_at = int(built_at)
+
+    @classmethod
+    def from_hashes(cls, hashes, fp_rate=0.0001, built_at=0):
+        hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+        m, k = optimal_size(len(hashes), fp_rate)
+        seed = int.from_bytes(hashlib.blake2b(hashes.tobytes(), digest_size=8).digest(), "little")
+        flags = np.zeros(m, dtype=bool)
+        for start in range(0, len(hashes), CHUNK):
+            flags[cls._positions(hashes[start:start + CHUNK], seed, m, k).ravel()] = True
+        return cls(np.packbits(flags, bitorder="little"), m, k, len(hashes), seed, built_at)
+
+    @staticmethod
+    def _positions(hashes, seed, m, k):
+        z = _mix_array(hashes ^ np.uint64(seed))
+        h1 = z & np.uint64(0xffffffff)
+        h2 = (z >> np.uint64(32)) | np.uint64(1)
+        return (h1[:, None] + np.arange(k, dtype=np.uint64)[None, :] * h2[:, None]) % np.uint64(m)
+
+    def contains_hash(self, h):
+        z = _mix(h ^ self.seed)
+        h1, h2 = z & 0xffffffff, (z >> 32) | 1
+        for i in range(self.k):
+            p = (h1 + i * h2) % self.m_bits
+            if not (self.bits[p >> 3] >> (p & 7)) & 1:
+                return False
+        return True
+
+    def match(self, host):
+        """First suffix of `host` that is (probably) in the filter, or None."""
+        host = normalize_domain(host)
+        if not host:
+            return None
+        for suffix in candidate_suffixes(host):
+            if self.contains_hash(domain_hash(suffix)):
+                return suffix
+        return None
+
+    def __contains__(self, host):
+        return self.match(host) is not None
+
+    # --- WIRE FORMAT ---
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, self.k, self.m_bits, self.count, self.seed, self.built_at)
+        return header + self.bits.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """The filter starting at `offset`; the next one (if any) starts at offset + nbytes."""
+        magic, fmt, k, m, count, seed, built_at = HEADER.unpack_from(data, offset)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"Not a v{FORMAT_VERSION} whitelist Bloom filter")
+        bits = np.frombuffer(data, dtype=np.uint8, count=m // 8, offset=offset + HEADER.size)
+        return cls(bits, m, k, count, seed, built_at)
+
+    @property
+    def nbytes(self):
+        return HEADER.size + self.bits.nbytes
+
+@lru_cache(maxsize=1)
+def public_suffix_hashes():
+    return np.unique(domain_hashes(public_suffixes()))
+
+def whitelist_payload(index, exclude=(), fp_rate=0.0001):
+    """
+    (wire bytes, etag) served at /whitelist_bloom: a filter over DomainIndex
+    `index` minus the `exclude` domains and minus any public suffix (those
+    only ever match exactly server-side), followed by the suffix filter.
+    """
+    suffixes = public_suffix_hashes()
+    dropped = np.concatenate([domain_hashes(sorted(exclude)), suffixes])
+    hashes = np.setdiff1d(np.asarray(index.hashes), dropped)
+    payload = (BloomFilter.from_hashes(hashes, fp_rate, index.built_at).to_bytes() +
+               BloomFilter.from_hashes(suffixes, SUFFIX_FP_RATE).to_bytes())
+    return payload, hashlib.blake2b(payload, digest_size=16).hexdigest()
@@ -0,0 +1,248 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+from features import FEATURE_COLUMNS, SCANNER, extract_features, extract_features_batch
+from domain_index import DomainIndex, host_of
+from url_index import KnownURLIndex
+from model_artifact import MODELS_DIR, current_version, load_artifact, load_pickle
+from config import MODEL_FILE, WHITELIST_FILE, WHITELIST_TEXT_FILE, URL_INDEX_FILE, COMPILED_CHUNK_ROWS
+
+# --- CONFIGURATION ---
+# Artifact paths and COMPILED_CHUNK_ROWS come from config.py (same as the servers)
+CHUNK_SIZE = 10000                  # URLs per task
+WORKERS = os.cpu_count() or 1
+ROW_PATH_MAX = 32                   # Below this extract_features() per URL beats the batch DataFrame
+
+# --- WORKER STATE ---
+# Loaded once per process by init_worker(); artifacts are memory-mapped, so
+# every worker shares the same whitelist/index/forest pages.
+_resources = None
+
+def load_resources(models_dir=MODELS_DIR, model_file=MODEL_FILE):
+    if current_version(models_dir):
+        loaded = load_artifact(models_dir)
+    elif os.path.exists(model_file):
+        loaded = load_pickle(model_file)
+    else:
+        raise FileNotFoundError("No model found! Run train_model.py")
+    if os.path.exists(WHITELIST_FILE):
+        whitelist = DomainIndex.load(WHITELIST_FILE)
+    elif os.path.exists(WHITELIST_TEXT_FILE):
+        whitelist = DomainIndex.from_text_file(WHITELIST_TEXT_FILE)
+    else:
+        whitelist = DomainIndex.from_domains([])
+    known = KnownURLIndex.load(URL_INDEX_FILE) if os.path.exists(URL_INDEX_FILE) else KnownURLIndex.empty()
+    return loaded, whitelist, known
+
+def init_worker(models_dir, model_file):
+    global _resources
+    _resources = load_resources(models_dir, model_file)
+
+def feature_matrix(loaded, urls, df=None):
+    """float32 rows for `urls` in the model's order; tiny batches skip the DataFrame overhead."""
+    if df is None and len(urls) <= ROW_PATH_MAX:
+        feats = [extract_features(u) for u in urls]
+        return np.array([[f.get(name, 0) for name in loaded.features] for f in feats], dtype=np.float32)
+    if df is None:
+        df = extract_features_batch(urls)
+    return df.reindex(columns=loaded.features, fill_value=0).to_numpy(dtype=np.float32)
+
+def classify_chunk(urls, with_features=True):
+    """
+    Same decision order as app.py's /predict_batch, without the network:
+    whitelist (once per distinct host) -> known URL -> model on one matrix.
+    With `with_features` every row's features are extracted and written out;
+    without, only the rows that reach the model are extracted.
+    Shortened links are not unrolled; they are flagged in `shortener`.
+    """
+    loaded, whitelist, known = _resources
+    lowered = [u.lower() for u in urls]
+    hosts = [host_of(u) for u in lowered]
+    safe_hosts = {h: h in whitelist for h in set(hosts)}
+
+    verdict = np.empty(len(urls), dtype=object)
+    source = np.empty(len(urls), dtype=object)
+    whitelisted = np.fromiter((safe_hosts[h] for h in hosts), dtype=bool, count=len(urls))
+    verdict[whitelisted], source[whitelisted] = "SAFE", "whitelist"
+
+    labels = known.lookup_many(lowered)
+    is_known = ~whitelisted & (labels >= 0)
+    verdict[is_known] = np.where(labels[is_known] == 1, "SAFE", "DANGER")
+    source[is_known] = "known_urls"
+
+    df = extract_features_batch(lowered) if with_features else None
+    todo = ~whitelisted & ~is_known
+    if todo.any():
+        rows = [lowered[i] for i in np.flatnonzero(todo)]
+        X = feature_matrix(loaded, rows, None if df is None else df[todo])
+        verdict[todo] = np.where(loaded.predict(X, COMPILED_CHUNK_ROWS) == 1, "SAFE", "DANGER")
+        source[todo] = "model"
+
+    out = pd.DataFrame({'url': urls, 'verdict': verdict, 'source': source,
+                        'shortener': [SCANNER.is_shortener(h) for h in hosts]})
+    if with_features:
+        for col in FEATURE_COLUMNS:
+            out[col] = df[col].to_numpy()
+    return out
+
+# --- INPUT ---
+def detect_format(path, fmt):
+    if fmt != "auto":
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(ext, 'txt')
+
+def iter_lines(stream, chunk_size):
+    chunk = []
+    for line in stream:
+        url = line.strip()
+        if url and not url.startswith("#"):
+            chunk.append(url)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def report_skipped(count, what):
+    if count:
+        print(f"\n   ⚠️ Skipped {count} {what}", file=sys.stderr)
+
+def iter_jsonl(stream, field, chunk_size):
+    """Lines that are not JSON objects, or have no `field`, are skipped and counted."""
+    chunk = []
+    skipped = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            url = json.loads(line).get(field)
+        except (json.JSONDecodeError, AttributeError): # Not JSON, or JSON that isn't an object
+            url = None
+        if not url:
+            skipped += 1
+            continue
+        chunk.append(str(url))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+    report_skipped(skipped, f"JSONL line(s) without a '{field}'")
+
+def iter_csv(source, column, chunk_size):
+    """`column` defaults to the first header named url (any case). Rows with it empty are skipped and counted."""
+    pick = (lambda c: c == column) if column else (lambda c: c.lower() == "url")
+    skipped = 0
+    for frame in pd.read_csv(source, chunksize=chunk_size, dtype=str, usecols=pick):
+        if frame.shape[1] == 0:
+            raise ValueError("CSV input has no url column (use --column)")
+        urls = frame.iloc[:, 0].dropna().str.strip()
+        urls = urls[urls != ""]
+        skipped += len(frame) - len(urls)
+        if len(urls):
+            yield urls.tolist()
+    report_skipped(skipped, "CSV row(s) without a URL")
+
+def iter_urls(path, fmt, field, column, chunk_size):
+    """Yields lists of up to `chunk_size` URLs; '-' reads stdin."""
+    fmt = detect_format(path, fmt)
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", errors="replace", newline="")
+    try:
+        if fmt == "csv":
+            yield from iter_csv(stream, column, chunk_size)
+        elif fmt == "jsonl":
+            yield from iter_jsonl(stream, field, chunk_size)
+        else:
+            yield from iter_lines(stream, chunk_size)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+# --- OUTPUT ---
+class ResultWriter:
+    """Appends each result chunk as soon as it is ready (JSONL or CSV)."""
+
+    def __init__(self, path, fmt):
+        self.fmt = detect_format(path, fmt) if path != "-" else (fmt if fmt != "auto" else "jsonl")
+        self.stream = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+        self.header = True
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.stream, header=self.header, index=False)
+        else:
+            text = df.to_json(orient="records", lines=True, force_ascii=False)
+            self.stream.write(text if text.endswith("\n") else text + "\n") # Trailing newline varies by pandas version
+        self.header = False
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+# --- DRIVER ---
+def scan(chunks, writer, workers=WORKERS, with_features=True, models_dir=MODELS_DIR, model_file=MODEL_FILE):
+    """
+    Classifies every chunk and writes results in input order. At most
+    2 * workers chunks are in flight, so memory stays flat however long the
+    input is. Returns a {verdict: count} summary.
+    """
+    totals = {'SAFE': 0, 'DANGER': 0}
+    started = time.perf_counter()
+    done = 0
+
+    def emit(df):
+        nonlocal done
+        writer.write(df)
+        done += len(df)
+        for verdict, count in df['verdict'].value_counts().items():
+            totals[verdict] = totals.get(verdict, 0) + int(count)
+        rate = done / max(time.perf_counter() - started, 1e-9)
+        print(f"   🔎 {done} URLs scanned ({rate:,.0f}/s)", end="\r", file=sys.stderr)
+
+    if workers <= 1:
+        init_worker(models_dir, model_file)
+        for urls in chunks:
+            emit(classify_chunk(urls, with_features))
+    else:
+        with Pool(workers, initializer=init_worker, initargs=(models_dir, model_file)) as pool:
+            pending = deque()
+            for urls in chunks:
+                pending.append(pool.apply_async(classify_chunk, (urls, with_features)))
+                if len(pending) >= 2 * workers:
+                    emit(pending.popleft().get())
+            while pending:
+                emit(pending.popleft().get())
+    print(file=sys.stderr)
+    return totals
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify URLs from a file or stdin without the HTTP server.")
+    parser.add_argument("input", help="txt (one URL per line), csv, jsonl, or '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Results file (.jsonl or .csv); '-' = stdout")
+    parser.add_argument("--format", default="auto", choices=["auto", "txt", "csv", "jsonl"], help="Input format")
+    parser.add_argument("--output-format", default="auto", choices=["auto", "jsonl", "csv"])
+    parser.add_argument("--field", default="url", help="JSONL key holding the URL")
+    parser.add_argument("--column", help="CSV column holding the URL (default: 'url', any case)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--no-features", action="store_true", help="Only write url/verdict/source/shortener")
+    args = parser.parse_args()
+
+    print(f"--- 🔎 BULK SCAN ({args.workers} worker(s), {args.chunk_size} URLs per chunk) ---", file=sys.stderr)
+    writer = ResultWriter(args.output, args.output_format)
+    try:
+        totals = scan(iter_urls(args.input, args.format, args.field, args.column, args.chunk_size),
+                      writer, args.workers, not args.no_features)
+    finally:
+        writer.close()
+    print(f"✅ Done: {totals.get('SAFE', 0)} SAFE, {totals.get('DANGER', 0)} DANGER", file=sys.stderr)
@@ -0,0 +1,96 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+# Rough per-entry bookkeeping cost on top of key/value (OrderedDict node + tuple)
+ENTRY_OVERHEAD = 120
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL, bounded both by entry count
+    and by an approximate memory budget (sys.getsizeof of key + value).
+
+    clear() bumps `generation`. A caller that computes a value from state
+    that clear() invalidates reads the generation first and passes it to
+    set(), so a value computed before the clear is never stored after it.
+    """
+
+    def __init__(self, max_entries=100000, ttl=3600, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._data = OrderedDict() # key -> (expires_at, value, size)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.generation = 0
+        self.stale_sets = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value, size = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """Stores `value`, unless `generation` is given and clear() ran since it was read."""
+        size = sys.getsizeof(key) + sys.getsizeof(value) + ENTRY_OVERHEAD
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_sets += 1
+                return
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry (e.g. the model or whitelist changed underneath us)."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.invalidations += 1
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'approx_bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'generation': self.generation,
+                'stale_sets': self.stale_sets,
+            }
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,116 @@
+import numpy as np
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into plain NumPy node arrays:
+    every tree's nodes live in one table, children are global indices and
+    leaves point to themselves. Prediction walks all trees for all rows at
+    once, one level per step, with no DataFrame, input validation or joblib
+    dispatch in the way.
+
+    Arithmetic mirrors sklearn exactly (float32 inputs compared against
+    float64 thresholds, per-tree normalized leaf values summed in tree
+    order, NaN sent to the side sklearn's missing_go_to_left names, inf
+    rejected), so predictions are identical to model.predict().
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, classes, max_depth, is_leaf=None,
+                 nan_left=None):
+        self.feature = feature        # int32  (n_nodes,)    split feature (0 at leaves)
+        self.threshold = threshold    # float64 (n_nodes,)   go left if x <= threshold
+        self.children = children      # int32  (n_nodes, 2)  [left, right]; leaves -> self
+        self.value = value            # float64 (n_nodes, n_classes) leaf class fractions
+        self.roots = roots            # int32  (n_trees,)
+        self.classes = classes
+        self.max_depth = int(max_depth)   # informational (artifact metadata)
+        # Stored in model artifacts so a memory-mapped load allocates nothing per node
+        self.is_leaf = children[:, 0] == np.arange(len(children)) if is_leaf is None else is_leaf
+        # bool (n_nodes,) where a NaN goes; artifacts from before it existed sent NaN left
+        self.nan_left = np.ones(len(children), dtype=bool) if nan_left is None else nan_left
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, children, values, roots, nan_left = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            idx = np.arange(n, dtype=np.int64)
+            leaf = tree.children_left == -1
+
+            left = np.where(leaf, idx, tree.children_left) + offset
+            right = np.where(leaf, idx, tree.children_right) + offset
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            children.append(np.stack([left, right], axis=1).astype(np.int32))
+            values.append(value / normalizer)
+            # Older sklearn has no missing-value support (it rejects NaN before predicting)
+            nan_left.append(np.asarray(getattr(tree, 'missing_go_to_left', np.ones(n)), dtype=bool))
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(np.concatenate(features), np.concatenate(thresholds), np.concatenate(children),
+                   np.concatenate(values), np.array(roots, dtype=np.int32), np.asarray(model.classes_),
+                   max_depth, nan_left=np.concatenate(nan_left))
+
+    @property
+    def n_features(self):
+        return int(self.feature.max()) + 1 if len(self.feature) else 0
+
+    def leaves(self, X):
+        """(n_rows, n_trees) leaf index reached by every row in every tree."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+        has_nan = bool(np.isnan(X).any())
+        n_trees = len(self.roots)
+        node = np.tile(self.roots, len(X))
+        row = np.repeat(np.arange(len(X)), n_trees)
+
+        # Walk only the (row, tree) pairs still inside the tree: total work is
+        # the sum of path lengths, not rows * trees * max_depth.
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            current = node[active]
+            x = X[row[active], self.feature[current]]
+            go_right = x > self.threshold[current]
+            if has_nan:
+                go_right |= np.isnan(x) & ~self.nan_left[current]
+            current = self.children[current, go_right.view(np.int8)]
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node.reshape(len(X), n_trees)
+
+    def predict_proba(self, X):
+        # Summing over the tree axis adds slice by slice in tree order, like sklearn
+        return self.value[self.leaves(X)].sum(axis=1) / len(self.roots)
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def verify(self, model, X):
+        """True if this forest gives exactly model.predict(X) on X."""
+        X = np.asarray(X, dtype=np.float32)
+        return bool(np.array_equal(self.predict(X), model.predict(X)))
+
+def probe_matrix(forest, n_features, rows=512, seed=0):
+    """
+    Random feature vectors spread around the forest's own split thresholds,
+    for verify() when no real data is at hand.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.zeros((rows, n_features), dtype=np.float32)
+    split = ~forest.is_leaf
+    for f in range(n_features):
+        thresholds = forest.threshold[split & (forest.feature == f)]
+        if len(thresholds):
+            X[:, f] = rng.choice(thresholds, rows) + rng.normal(0, 0.5, rows)
+    return X
@@ -0,0 +1,42 @@
+import os
+
+# --- CONFIGURATION ---
+# Settings shared by the servers (app.py, serve.py) and bulk_scan.py. Each
+# can be overridden from the environment where it says os.environ; settings
+# only one server uses stay in that server.
+
+# Artifacts
+MODEL_FILE = "phiusiil_model.pkl"     # Legacy joblib artifact (used when MODEL_DIR has no CURRENT)
+MODEL_DIR = os.environ.get("MODEL_DIR", "models") # Versioned, memory-mapped artifacts from train_model.py
+WHITELIST_FILE = "whitelist.bin"       # Built by update_whitelist.py
+WHITELIST_TEXT_FILE = "whitelist.txt"  # Legacy one-domain-per-line fallback
+URL_INDEX_FILE = "known_urls.bin"      # Labeled training URLs, built by populate_db.py
+RELOAD_INTERVAL = int(os.environ.get("RELOAD_INTERVAL", 30)) # Seconds between artifact checks
+COMPILED_CHUNK_ROWS = 4096 # Rows per CompiledForest pass; bounds its (rows x trees) work arrays
+MAX_BATCH_URLS = 500 # One page scan; protects the server from huge payloads
+
+# Whitelist Bloom filter for the extension (GET /whitelist_bloom)
+BLOOM_FP_RATE = float(os.environ.get("BLOOM_FP_RATE", 0.0001)) # ~2.4 MB per 1M domains
+BLOOM_MAX_AGE = int(os.environ.get("BLOOM_MAX_AGE", 3600))      # Cache-Control max-age, seconds
+
+# Micro-batching of concurrent /predict calls
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 64))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 2.0))
+
+# Request log (buffered sink, see log_sink.py)
+LOG_DB = os.environ.get("LOG_DB", "threats.db")
+LOG_REQUESTS = os.environ.get("LOG_REQUESTS", "1") == "1"
+LOG_RETENTION_DAYS = int(os.environ.get("LOG_RETENTION_DAYS", 30)) # Raw rows; /stats rollups are kept longer
+
+# Link unrolling
+UNROLL_WAIT = float(os.environ.get("UNROLL_WAIT", 1.0))         # Max seconds a request waits for unrolling
+UNROLL_DEADLINE = float(os.environ.get("UNROLL_DEADLINE", 3.0)) # Max seconds one unroll may take (background)
+UNROLL_MAX_HOPS = int(os.environ.get("UNROLL_MAX_HOPS", 5))
+UNROLL_MAX_PENDING = int(os.environ.get("UNROLL_MAX_PENDING", 256))
+
+# Verdict cache (keyed on the normalized FINAL url)
+VERDICT_CACHE_SIZE = int(os.environ.get("VERDICT_CACHE_SIZE", 100000))
+VERDICT_CACHE_TTL = int(os.environ.get("VERDICT_CACHE_TTL", 3600)) # seconds
+VERDICT_CACHE_MAX_MB = int(os.environ.get("VERDICT_CACHE_MAX_MB", 64))
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO") # DEBUG adds one line per analyzed URL
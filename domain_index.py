@@ -0,0 +1,198 @@
+import os
+import struct
+import time
+import numpy as np
+import tldextract
+from functools import lru_cache
+from urllib.parse import urlparse
+
+# --- CONFIGURATION ---
+# 64-bit FNV-1a over the UTF-8 bytes of the domain. Simple enough to
+# re-implement anywhere (the browser extension can compute the same hash),
+# and at 1M domains the chance of any collision is ~1e-8.
+FNV_OFFSET = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+MASK_64 = 0xffffffffffffffff
+
+# On-disk format (little endian): 32-byte header, then `count` sorted uint64 hashes.
+#   magic "PHWLIDX\0" | format u32 | reserved u32 | count u64 | built_at u64 (unix time)
+MAGIC = b"PHWLIDX\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+
+# Registrable-domain boundaries come from the Public Suffix List snapshot
+# bundled with tldextract (no network fetch, same answer in every process).
+# The private section is included, so github.io, blogspot.com, herokuapp.com
+# and the like count as suffixes: a whitelisted hosting platform must not
+# vouch for every customer subdomain under it.
+PSL = tldextract.TLDExtract(suffix_list_urls=(), include_psl_private_domains=True, cache_dir=None)
+
+# --- HASHING ---
+def domain_hash(domain):
+    h = FNV_OFFSET
+    for byte in domain.encode("utf-8"):
+        h = ((h ^ byte) * FNV_PRIME) & MASK_64
+    return h
+
+def domain_hashes(domains):
+    """
+    FNV-1a for a whole list at once: one pass per byte column of a padded
+    uint8 matrix instead of one Python loop per byte per domain.
+    """
+    encoded = [d.encode("utf-8") for d in domains]
+    out = np.full(len(encoded), FNV_OFFSET, dtype=np.uint64)
+    if not encoded:
+        return out
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    width = int(lengths.max())
+    matrix = np.zeros((len(encoded), width), dtype=np.uint8)
+    flat = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(encoded)), lengths)
+    cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    matrix[rows, cols] = flat
+
+    prime = np.uint64(FNV_PRIME)
+    for col in range(width):
+        active = lengths > col
+        out[active] = (out[active] ^ matrix[active, col]) * prime # uint64 math wraps like & MASK_64
+    return out
+
+# --- NORMALIZATION ---
+def normalize_domain(domain):
+    """Lowercase, no port/userinfo/trailing dot, no leading 'www.'."""
+    host = domain.strip().lower().rsplit("@", 1)[-1]
+    if not host.startswith("["):
+        host = host.split(":", 1)[0]
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+def host_of(url):
+    """Normalized hostname of a URL (scheme optional)."""
+    try:
+        parsed = urlparse(url)
+        if not parsed.scheme or not parsed.netloc: parsed = urlparse("http://" + url)
+        return normalize_domain(parsed.netloc)
+    except ValueError:
+        return normalize_domain(url)
+
+@lru_cache(maxsize=65536)
+def registrable_domain(host):
+    """
+    The part of `host` one registrant controls: mail.google.com -> google.com,
+    evil.github.io -> evil.github.io. None when `host` is itself a public
+    suffix (github.io, co.uk). Hosts outside the PSL (IPs, intranet names,
+    unknown TLDs) keep the old rule: IPs as-is, otherwise the last two labels.
+    """
+    parts = PSL(host)
+    if parts.ipv4 or host.startswith("["):
+        return host
+    if not parts.suffix:
+        return ".".join(host.split(".")[-2:])
+    if not parts.domain:
+        return None
+    return f"{parts.domain}.{parts.suffix}"
+
+def public_suffixes():
+    """Every PSL rule ('co.uk', 'github.io', '*.ck', '!www.ck'), IDN rules also in punycode."""
+    rules = set(PSL.tlds)
+    for rule in list(rules):
+        if not rule.isascii():
+            try:
+                rules.add(".".join(label if label in ("*", "") or label.startswith("!") else
+                                   label.encode("idna").decode("ascii") for label in rule.split(".")))
+            except UnicodeError:
+                pass
+    return sorted(rules)
+
+def candidate_suffixes(host):
+    """
+    The host itself plus every parent down to its registrable domain:
+    mail.google.com -> mail.google.com, google.com
+    evil.github.io  -> evil.github.io   (never github.io, never bare 'com').
+    A host that is itself a public suffix only matches exactly.
+    """
+    top = registrable_domain(host)
+    if top is None or not host.endswith(top):
+        return [host]
+    labels = host.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - top.count("."))]
+
+# --- THE INDEX ---
+class DomainIndex:
+    """
+    Sorted, deduplicated uint64 array of domain hashes (8 bytes per domain,
+    versus ~100 bytes for a Python str in a set). A lookup hashes each
+    candidate suffix of the host and binary-searches them in one
+    np.searchsorted call: O(labels) hashes, ~20 comparisons each at 1M domains.
+    """
+
+    def __init__(self, hashes, built_at=0):
+        self.hashes = hashes
+        self.built_at = built_at
+
+    @classmethod
+    def from_domains(cls, domains):
+        cleaned = [d for d in (normalize_domain(d) for d in domains) if d]
+        return cls(np.unique(domain_hashes(cleaned)))
+
+    @classmethod
+    def from_text_file(cls, path):
+        """One domain per line (the whitelist.txt format)."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_domains(line for line in f)
+
+    @classmethod
+    def from_hashes(cls, hashes, built_at=0):
+        return cls(np.unique(np.asarray(hashes, dtype=np.uint64)), built_at)
+
+    # --- BINARY ARTIFACT ---
+    def save(self, path):
+        """
+        Writes the binary artifact next to `path` and renames it into place,
+        so a reader never sees a half-written file.
+        """
+        built_at = self.built_at or int(time.time())
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self.hashes), built_at))
+            f.write(np.ascontiguousarray(self.hashes, dtype="<u8").tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps the artifact read-only: loading is instant whatever the
+        size, and every worker process shares the same page-cache pages.
+        """
+        with open(path, "rb") as f:
+            magic, fmt, _, count, built_at = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a v{FORMAT_VERSION} whitelist index")
+        if count == 0:
+            return cls(np.zeros(0, dtype=np.uint64), built_at)
+        hashes = np.memmap(path, dtype="<u8", mode="r", offset=HEADER.size, shape=(count,))
+        return cls(hashes, built_at)
+
+    def match(self, host):
+        """Returns the whitelisted suffix of `host` (e.g. 'google.com'), or None."""
+        host = normalize_domain(host)
+        if not host or not len(self.hashes):
+            return None
+        suffixes = candidate_suffixes(host)
+        probes = np.fromiter((domain_hash(s) for s in suffixes), dtype=np.uint64, count=len(suffixes))
+        pos = np.searchsorted(self.hashes, probes)
+        pos[pos == len(self.hashes)] = 0
+        hits = np.flatnonzero(self.hashes[pos] == probes)
+        return suffixes[hits[0]] if len(hits) else None
+
+    def __contains__(self, host):
+        return self.match(host) is not None
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @property
+    def nbytes(self):
+        return self.hashes.nbytes
@@ -0,0 +1,64 @@
+import numpy as np
+from features import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, extract_features_batch, url_fingerprint
+
+# --- CONFIGURATION ---
+# One row per distinct (lowercased) URL: features packed as float32 bytes in
+# FEATURE_COLUMNS order, tagged with the schema version that produced them.
+TABLE = "url_features"
+
+def ensure_table(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE} (
+            url_hash INTEGER PRIMARY KEY,
+            schema_version INTEGER NOT NULL,
+            features BLOB NOT NULL
+        )""")
+
+def fingerprints(urls):
+    return np.fromiter((url_fingerprint(u) for u in urls), dtype=np.int64, count=len(urls))
+
+def lookup(conn, hashes):
+    """
+    Stored, up-to-date features for `hashes`.
+    Returns (found_hashes sorted int64, matrix float32 in the same order).
+    Only touches a TEMP table, so it works on read-only connections too.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS chunk_keys (url_hash INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM chunk_keys")
+    conn.executemany("INSERT OR IGNORE INTO chunk_keys VALUES (?)", ((int(h),) for h in hashes))
+    rows = conn.execute(f"""
+        SELECT f.url_hash, f.features FROM {TABLE} f JOIN chunk_keys k ON k.url_hash = f.url_hash
+        WHERE f.schema_version = ? ORDER BY f.url_hash""", (FEATURE_SCHEMA_VERSION,)).fetchall()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32)
+    found = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    matrix = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32).reshape(len(rows), len(FEATURE_COLUMNS))
+    return found, matrix
+
+def upsert(conn, hashes, matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TABLE} (url_hash, schema_version, features) VALUES (?, ?, ?)",
+        ((int(h), FEATURE_SCHEMA_VERSION, row.tobytes()) for h, row in zip(hashes, matrix)))
+
+def resolve(conn, urls):
+    """
+    Feature matrix for `urls` (float32, FEATURE_COLUMNS order). Rows already
+    in the store at the current schema version are reused; only new or stale
+    URLs go through extract_features_batch.
+    Returns (matrix, new_hashes, new_rows); nothing is written, so worker
+    processes can call this on read-only connections.
+    """
+    hashes = fingerprints(urls)
+    found, stored = lookup(conn, hashes)
+
+    X = np.empty((len(urls), len(FEATURE_COLUMNS)), dtype=np.float32)
+    pos = np.searchsorted(found, hashes)
+    pos[pos == len(found)] = 0
+    hit = (found[pos] == hashes) if len(found) else np.zeros(len(urls), dtype=bool)
+    X[hit] = stored[pos[hit]]
+
+    missing = np.flatnonzero(~hit)
+    if len(missing):
+        X[missing] = extract_features_batch([urls[i] for i in missing]).to_numpy(dtype=np.float32)
+    return X, hashes[missing], X[missing]
@@ -0,0 +1,127 @@
+import re
+import hashlib
+import numpy as np
+import pandas as pd
+from url_scanner import URLScanner, load_patterns
+
+# --- CONFIGURATION ---
+# The ONE feature list. Training writes it into the model artifact and the
+# servers reindex to whatever the loaded model expects, so both sides always
+# agree on what a feature means.
+FEATURE_COLUMNS = ['url_len', 'hostname_len', 'path_len', 'entropy', 'count_dots', 'count_dashes',
+                   'count_at', 'count_qmark', 'count_digits', 'sus_word_count', 'is_bad_tld',
+                   'is_https', 'is_impersonating']
+
+# Bump whenever a feature's meaning changes: stored features (feature_store.py)
+# with an older version are re-extracted instead of reused.
+# v2: is_bad_tld matches the hostname suffix instead of anywhere in the URL.
+FEATURE_SCHEMA_VERSION = 2
+
+# Small dtypes keep a 1M-row feature matrix at a few dozen MB
+FEATURE_DTYPES = {col: 'int32' for col in FEATURE_COLUMNS}
+FEATURE_DTYPES.update({'entropy': 'float32', 'sus_word_count': 'int8', 'is_bad_tld': 'int8',
+                       'is_https': 'int8', 'is_impersonating': 'int8'})
+
+# Pattern lists live in patterns.json (shared with the shortener check in app.py)
+PATTERNS = load_patterns()
+SUS_KEYWORDS = PATTERNS['sus_keywords']
+BAD_TLDS = PATTERNS['bad_tlds']
+BRANDS = PATTERNS['brands']
+SCANNER = URLScanner(SUS_KEYWORDS, BAD_TLDS, BRANDS, PATTERNS['shorteners'])
+
+CHAR_CHUNK = 100000 # Rows per code-point pass (bounds the temporary arrays)
+
+# Same split as urlparse(): "scheme:" + optional "//netloc", then path up to ? or #.
+# URLs without a scheme are read as if "http://" was prepended (netloc first).
+URL_PARTS = re.compile(r'^(?:[a-z][a-z0-9+.\-]*:(?://([^/?#]*))?|([^/?#]*))([^?#]*)')
+
+# Character counts taken from the same code-point pass as entropy
+CHAR_COUNTS = {'count_dots': '.', 'count_dashes': '-', 'count_at': '@', 'count_qmark': '?'}
+
+# --- HELPERS ---
+def url_fingerprint(url):
+    """Signed 64-bit key of the lowercased URL (fits an SQLite INTEGER)."""
+    digest = hashlib.blake2b(str(url).lower().encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+def char_features(urls):
+    """
+    url_len, entropy (bits per character) and the character counts for a
+    whole column at once: every URL is flattened into one array of code
+    points, (row, character) pairs are counted with np.unique and per-row
+    totals come from np.bincount. Returns a dict of NumPy arrays.
+    """
+    urls = list(urls)
+    lengths = np.fromiter(map(len, urls), dtype=np.int64, count=len(urls))
+    out = {'url_len': lengths, 'entropy': np.zeros(len(urls), dtype=np.float64),
+           'count_digits': np.zeros(len(urls), dtype=np.int64)}
+    for col in CHAR_COUNTS:
+        out[col] = np.zeros(len(urls), dtype=np.int64)
+
+    for start in range(0, len(urls), CHAR_CHUNK):
+        lens = lengths[start:start + CHAR_CHUNK]
+        stop = start + len(lens)
+        text = "".join(urls[start:stop])
+        codes = np.frombuffer(text.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32)
+        rows = np.repeat(np.arange(len(lens), dtype=np.int64), lens)
+
+        keys, counts = np.unique((rows << 21) | codes, return_counts=True)
+        key_rows = keys >> 21
+        p = counts / lens[key_rows]
+        out['entropy'][start:stop] = -np.bincount(key_rows, weights=p * np.log2(p), minlength=len(lens))
+
+        for col, char in CHAR_COUNTS.items():
+            out[col][start:stop] = np.bincount(rows[codes == ord(char)], minlength=len(lens))
+        out['count_digits'][start:stop] = np.bincount(rows[(codes >= 48) & (codes <= 57)], minlength=len(lens))
+
+    return out
+
+def _row(url):
+    """
+    hostname_len, path_len and the pattern features for one lowercased URL,
+    in ROW_COLUMNS order. One regex parse plus one SCANNER pass for every
+    keyword/brand/TLD check.
+    """
+    m = URL_PARTS.match(url)
+    hostname = m.group(1) if m.group(1) is not None else (m.group(2) or "")
+    sus_word_count, is_bad_tld, is_impersonating = SCANNER.scan(url, hostname)
+    return (
+        len(hostname), len(m.group(3)),
+        sus_word_count, is_bad_tld,
+        1 if url.startswith('https') else 0,
+        is_impersonating,
+    )
+
+ROW_COLUMNS = ['hostname_len', 'path_len', 'sus_word_count', 'is_bad_tld', 'is_https', 'is_impersonating']
+
+# --- FEATURE EXTRACTION ---
+def extract_features_batch(urls):
+    """
+    Columnar feature extraction for many URLs (training, batch scans).
+    Every URL is lowercased and parsed exactly once; counts and entropy are
+    computed for the whole column in NumPy. Returns a DataFrame with
+    FEATURE_COLUMNS.
+    """
+    url = [str(u).lower() for u in urls]
+
+    columns = char_features(url)
+    rows = np.array([_row(u) for u in url], dtype=np.int32).reshape(len(url), len(ROW_COLUMNS))
+    for i, col in enumerate(ROW_COLUMNS):
+        columns[col] = rows[:, i]
+
+    df = pd.DataFrame({col: columns[col] for col in FEATURE_COLUMNS})
+    return df.astype(FEATURE_DTYPES)
+
+def extract_features(url):
+    """
+    Single-URL wrapper: same char_features() and _row() as the batch path,
+    so the values can never drift from what the model was trained on.
+    """
+    url = str(url).lower()
+    columns = char_features([url])
+    features = dict(zip(ROW_COLUMNS, _row(url)))
+    for col in FEATURE_COLUMNS:
+        if col not in features:
+            features[col] = columns[col][0].item()
+    features['entropy'] = float(np.float32(features['entropy']))
+    return {col: features[col] for col in FEATURE_COLUMNS}
@@ -0,0 +1,53 @@
+import os
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+class FileWatcher:
+    """
+    Polls a file's (inode, size, mtime) on a daemon thread and calls
+    `on_change()` when it differs. Writers are expected to rename new files
+    into place, so the callback only ever sees complete artifacts; readers
+    keep using the old object until the callback swaps in the new one.
+    """
+
+    def __init__(self, path, on_change, interval=30):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            return None
+
+    def check(self):
+        """Runs one poll; returns True if the callback fired."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            self.on_change()
+        except Exception as e:
+            log.warning("⚠️ Reload of %s failed, keeping the old one: %s", self.path, e)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"watch:{self.path}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
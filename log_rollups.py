@@ -0,0 +1,193 @@
+import time
+import sqlite3
+import argparse
+from collections import Counter
+from domain_index import host_of
+
+# --- CONFIGURATION ---
+# Verdict counts per time bucket, updated by LogSink in the SAME transaction
+# as the raw INSERT, so dashboards never have to scan `logs`:
+#   rollup_verdicts(period, bucket, status, count)
+#   rollup_domains(period, bucket, domain, status, count)
+# `period` is the bucket width in seconds, `bucket` its unix start time.
+# Reading a window costs O(buckets in it), however big `logs` grows.
+DB_PATH = "threats.db"
+MINUTE = 60
+HOUR = 3600
+PERIODS = {'minute': MINUTE, 'hour': HOUR}
+DEFAULT_BUCKETS = {MINUTE: 60, HOUR: 24}
+RETENTION = {MINUTE: 2 * 86400, HOUR: 90 * 86400} # Seconds of rollup rows kept per period
+RAW_RETENTION_DAYS = 30                           # Raw `logs` rows; the rollups outlive them
+DELETE_CHUNK = 5000                               # Rows per DELETE/commit during compaction
+STATUSES = ('SAFE', 'DANGER')                     # Always present in stats(), 0 when absent
+MAX_TOP = 100
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS rollup_verdicts (period INTEGER NOT NULL, bucket INTEGER NOT NULL, "
+    "status TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (period, bucket, status)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS rollup_domains (period INTEGER NOT NULL, bucket INTEGER NOT NULL, "
+    "domain TEXT NOT NULL, status TEXT NOT NULL, count INTEGER NOT NULL, "
+    "PRIMARY KEY (period, bucket, domain, status)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs (ts)",
+    "CREATE INDEX IF NOT EXISTS idx_logs_status_ts ON logs (status, ts)",
+]
+UPSERT_VERDICTS = ("INSERT INTO rollup_verdicts (period, bucket, status, count) VALUES (?, ?, ?, ?) "
+                   "ON CONFLICT (period, bucket, status) DO UPDATE SET count = count + excluded.count")
+UPSERT_DOMAINS = ("INSERT INTO rollup_domains (period, bucket, domain, status, count) VALUES (?, ?, ?, ?, ?) "
+                  "ON CONFLICT (period, bucket, domain, status) DO UPDATE SET count = count + excluded.count")
+
+# --- SCHEMA / MIGRATION ---
+def _has_table(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def ensure_schema(conn):
+    """
+    Creates `logs` (with the typed `ts` column), its indexes and the rollup
+    tables. Databases from before `ts` get it added and back-filled from the
+    free-form `date` text (written with datetime.now(), i.e. local time),
+    and brand-new rollup tables are filled from the existing rows once.
+    """
+    conn.execute("BEGIN IMMEDIATE") # Two servers starting together migrate once
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS logs (content TEXT, status TEXT, date TEXT, ts INTEGER)")
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(logs)")]
+        if 'ts' not in columns:
+            conn.execute("ALTER TABLE logs ADD COLUMN ts INTEGER")
+            conn.execute("UPDATE logs SET ts = CAST(strftime('%s', date, 'utc') AS INTEGER) WHERE ts IS NULL")
+        fresh = not _has_table(conn, 'rollup_verdicts')
+        for statement in SCHEMA:
+            conn.execute(statement)
+        if fresh:
+            rebuild(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def rebuild(conn):
+    """Recomputes every rollup inside retention from raw `logs` (caller commits)."""
+    conn.create_function("host_of", 1, host_of, deterministic=True)
+    conn.execute("DELETE FROM rollup_verdicts")
+    conn.execute("DELETE FROM rollup_domains")
+    now = int(time.time())
+    for period, keep in RETENTION.items():
+        conn.execute("INSERT INTO rollup_verdicts SELECT ?, ts - ts % ?, status, COUNT(*) FROM logs "
+                     "WHERE ts >= ? AND status IS NOT NULL GROUP BY 2, 3", (period, period, now - keep))
+        conn.execute("INSERT INTO rollup_domains SELECT ?, ts - ts % ?, host_of(content), status, COUNT(*) FROM logs "
+                     "WHERE ts >= ? AND status IS NOT NULL AND content IS NOT NULL GROUP BY 2, 3, 4",
+                     (period, period, now - keep))
+
+# --- WRITING (Called by LogSink inside its batch transaction) ---
+def apply(conn, rows):
+    """Adds a batch of (content, status, date, ts) log rows to the rollups."""
+    verdicts = Counter()
+    domains = Counter()
+    for content, status, _, ts in rows:
+        domain = host_of(content)
+        for period in RETENTION:
+            bucket = ts - ts % period
+            verdicts[(period, bucket, status)] += 1
+            domains[(period, bucket, domain, status)] += 1
+    conn.executemany(UPSERT_VERDICTS, [(*key, count) for key, count in verdicts.items()])
+    conn.executemany(UPSERT_DOMAINS, [(*key, count) for key, count in domains.items()])
+
+# --- RETENTION ---
+def _delete_chunked(conn, table, where, params, pause=0.0):
+    """
+    Deletes in DELETE_CHUNK slices with a commit each, so writers never wait
+    long; `pause` seconds between slices leave them room to take the lock.
+    """
+    deleted = 0
+    while True:
+        cursor = conn.execute(f"DELETE FROM {table} WHERE rowid IN "
+                              f"(SELECT rowid FROM {table} WHERE {where} LIMIT {DELETE_CHUNK})", params)
+        conn.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < DELETE_CHUNK:
+            return deleted
+        time.sleep(pause)
+
+def compact(conn, raw_retention_days=RAW_RETENTION_DAYS, now=None, pause=0.0):
+    """
+    Drops raw rows older than `raw_retention_days` (via idx_logs_ts) and
+    rollup buckets past RETENTION. Counts already rolled up are kept, so
+    /stats is unaffected by raw retention. Returns rows deleted per table.
+    """
+    now = int(time.time()) if now is None else now
+    deleted = {'logs': _delete_chunked(conn, "logs", "ts < ?", (now - raw_retention_days * 86400,), pause)}
+    deleted['rollup_verdicts'] = deleted['rollup_domains'] = 0
+    for period, keep in RETENTION.items():
+        for table in ('rollup_verdicts', 'rollup_domains'): # WITHOUT ROWID: range-delete on the primary key
+            cursor = conn.execute(f"DELETE FROM {table} WHERE period = ? AND bucket < ?", (period, now - keep))
+            conn.commit()
+            deleted[table] += cursor.rowcount
+    return deleted
+
+# --- READING ---
+def stats(conn, period='hour', buckets=None, top=10, now=None):
+    """
+    Verdict totals, a zero-filled per-bucket series and the most-flagged
+    domains over the last `buckets` minutes/hours, from the rollups only.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    width = PERIODS[period]
+    buckets = DEFAULT_BUCKETS[width] if buckets is None else int(buckets)
+    buckets = max(1, min(buckets, RETENTION[width] // width))
+    top = max(0, min(int(top), MAX_TOP))
+    now = int(time.time()) if now is None else now
+    last = now - now % width
+    first = last - (buckets - 1) * width
+
+    series = {bucket: Counter(dict.fromkeys(STATUSES, 0)) for bucket in range(first, last + 1, width)}
+    for bucket, status, count in conn.execute(
+            "SELECT bucket, status, count FROM rollup_verdicts WHERE period = ? AND bucket BETWEEN ? AND ?",
+            (width, first, last)):
+        series[bucket][status] += count
+    totals = Counter(dict.fromkeys(STATUSES, 0))
+    for counts in series.values():
+        totals.update(counts)
+    flagged = conn.execute(
+        "SELECT domain, SUM(count) FROM rollup_domains WHERE period = ? AND bucket BETWEEN ? AND ? "
+        "AND status = 'DANGER' GROUP BY domain ORDER BY 2 DESC, domain LIMIT ?", (width, first, last, top)).fetchall()
+    return {
+        'period': period,
+        'from': first,
+        'to': last + width,
+        'totals': dict(totals),
+        'series': [{'bucket': bucket, **counts} for bucket, counts in series.items()],
+        'top_flagged_domains': [{'domain': domain, 'count': count} for domain, count in flagged],
+    }
+
+def read_stats(db_path=DB_PATH, **kwargs):
+    """stats() on a short-lived read-only connection (WAL: never blocks the writer)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return stats(conn, **kwargs)
+    finally:
+        conn.close()
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    import json
+    parser = argparse.ArgumentParser(description="Maintain and query the request-log rollups.")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--compact", action="store_true", help="Apply retention to raw logs and rollups")
+    parser.add_argument("--raw-days", type=int, default=RAW_RETENTION_DAYS, help="Raw log rows to keep (days)")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the rollups from the raw logs")
+    parser.add_argument("--period", default="hour", choices=list(PERIODS))
+    parser.add_argument("--buckets", type=int)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    ensure_schema(conn)
+    if args.rebuild:
+        print("--- 🔁 Rebuilding rollups from logs ---")
+        rebuild(conn)
+        conn.commit()
+    if args.compact:
+        print(f"--- 🧹 Compacting (raw logs kept {args.raw_days} days) ---")
+        for table, count in compact(conn, args.raw_days).items():
+            print(f"   {table}: {count} rows deleted")
+    print(json.dumps(stats(conn, args.period, args.buckets), indent=2))
+    conn.close()
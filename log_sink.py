@@ -0,0 +1,219 @@
+import atexit
+import queue
+import sqlite3
+import logging
+import datetime
+import threading
+from time import monotonic, time
+import log_rollups
+
+log = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+DB_PATH = "threats.db"
+MAX_QUEUE = 10000      # Rows buffered in memory before we start dropping
+BATCH_SIZE = 500       # Rows per executemany/commit
+FLUSH_INTERVAL = 1.0   # Seconds; a partial batch is committed at least this often
+BUSY_TIMEOUT = 30.0    # Seconds a statement waits for another connection's write lock
+RETRY_DELAY = 1.0      # First wait after a failed connect/migration; doubles up to MAX_RETRY_DELAY
+MAX_RETRY_DELAY = 60.0
+COMPACT_INTERVAL = 3600 # Seconds between retention passes (see log_rollups.compact)
+COMPACT_DELAY = 60      # Seconds after startup before the first pass
+COMPACT_PAUSE = 0.05    # Seconds between compaction DELETE chunks (lets the writer in)
+
+_STOP = object()
+
+class LogSink:
+    """
+    Request log with ONE long-lived writer thread.
+
+    log() never touches the database: it drops the row into a bounded
+    in-memory queue and returns. The writer drains the queue and commits
+    batches with executemany on a single WAL-mode connection, so there is
+    one fsync per batch instead of one per request and no lock contention.
+    Each batch updates the per-minute/per-hour rollups (log_rollups.py) in
+    the same transaction. Retention runs on a separate compaction thread
+    with its own connection, in small chunks, so it never stalls the writer.
+
+    If the database cannot be opened or migrated (e.g. another process
+    holds the lock), the writer retries with backoff while rows queue up.
+    Should the writer thread die anyway, `alive` turns False, log() counts
+    every row as dropped and stats() reports it with the last error.
+
+    Backpressure policy: when the queue is full the NEW row is dropped and
+    counted in `dropped`; request handlers are never blocked by logging.
+    `dropped` is bumped from every request thread and the writer, so it is
+    only changed under `_lock`.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_queue=MAX_QUEUE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 compact_interval=COMPACT_INTERVAL, raw_retention_days=log_rollups.RAW_RETENTION_DAYS,
+                 compact_delay=COMPACT_DELAY, busy_timeout=BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval # None/0 disables the built-in retention pass
+        self.compact_delay = compact_delay
+        self.raw_retention_days = raw_retention_days
+        self.busy_timeout = busy_timeout
+        self._queue = queue.Queue(max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.alive = True
+        self._lock = threading.Lock() # Guards `dropped`
+        self._closed = False
+        self._stop = threading.Event()  # Wakes the retry/compaction waits on close()
+        self._ready = threading.Event() # Set once the schema is in place
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+        self._compactor = None
+        if compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name="log-compact", daemon=True)
+            self._compactor.start()
+        atexit.register(self.close)
+
+    # --- PRODUCER SIDE ---
+    def log(self, url, status):
+        """Queues one row; False if it was dropped (queue full, writer dead or closed)."""
+        if self._closed:
+            return False
+        if self.alive:
+            try:
+                now = time()
+                self._queue.put_nowait((url[:200], status, str(datetime.datetime.fromtimestamp(now)), int(now)))
+                return True
+            except queue.Full:
+                pass
+        with self._lock:
+            self.dropped += 1
+        return False
+
+    # --- WRITER SIDE ---
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL") # WAL keeps this crash-safe
+            conn.commit()
+            log_rollups.ensure_schema(conn) # Typed ts column, indexes, rollup tables
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _connect_with_retry(self):
+        """The writer's connection, retrying with backoff; None if closed first."""
+        delay = RETRY_DELAY
+        while not self._stop.is_set():
+            try:
+                return self._connect()
+            except sqlite3.Error as e:
+                self.errors += 1
+                self.last_error = str(e)
+                log.warning("⚠️ Log database not ready (%s); retrying in %.0fs", e, delay)
+                self._stop.wait(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+        return None
+
+    def _write(self, conn, rows):
+        try:
+            conn.executemany("INSERT INTO logs (content, status, date, ts) VALUES (?, ?, ?, ?)", rows)
+            log_rollups.apply(conn, rows) # Same transaction: rollups never drift from the raw rows
+            conn.commit()
+            self.written += len(rows)
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.errors += 1
+            self.last_error = str(e)
+            with self._lock:
+                self.dropped += len(rows)
+            log.error("Logging Error (%d rows dropped): %s", len(rows), e)
+
+    def _drain(self, conn):
+        rows = []
+        next_flush = monotonic() + self.flush_interval
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_flush - monotonic()))
+                if item is _STOP:
+                    stopping = True
+                else:
+                    rows.append(item)
+            except queue.Empty:
+                pass
+            if rows and (stopping or len(rows) >= self.batch_size or monotonic() >= next_flush):
+                self._write(conn, rows)
+                rows = []
+            if monotonic() >= next_flush:
+                next_flush = monotonic() + self.flush_interval
+
+    def _run(self):
+        try:
+            conn = self._connect_with_retry()
+            if conn is not None:
+                self._ready.set()
+                try:
+                    self._drain(conn)
+                finally:
+                    conn.close()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            log.exception("❌ Log writer stopped: %s", e)
+        finally:
+            self.alive = False
+            lost = 0
+            while True: # Nothing will ever write what is still queued
+                try:
+                    lost += self._queue.get_nowait() is not _STOP
+                except queue.Empty:
+                    break
+            with self._lock:
+                self.dropped += lost
+
+    # --- COMPACTION SIDE ---
+    def _compact(self, conn):
+        try:
+            deleted = log_rollups.compact(conn, self.raw_retention_days, pause=COMPACT_PAUSE)
+            if any(deleted.values()):
+                log.info("🧹 Log retention: %s", deleted)
+        except sqlite3.Error as e:
+            conn.rollback()
+            log.error("Log compaction failed: %s", e)
+
+    def _compact_loop(self):
+        """Own thread and connection: a long retention pass never holds up the writer's batches."""
+        if self._stop.wait(self.compact_delay):
+            return
+        while not self._ready.wait(1.0): # The writer creates the schema
+            if self._stop.is_set():
+                return
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+        try:
+            while not self._stop.is_set():
+                self._compact(conn)
+                self._stop.wait(self.compact_interval)
+        finally:
+            conn.close()
+
+    def close(self, timeout=5.0):
+        """Flushes everything already queued, then stops the writer and compactor."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        if self.alive:
+            try:
+                self._queue.put(_STOP, timeout=timeout) # Waits only if full, i.e. for the writer to free a slot
+            except queue.Full:
+                log.warning("⚠️ Log writer did not drain in %.0fs; %d rows unsaved", timeout, self._queue.qsize())
+        self._thread.join(timeout)
+        if self._compactor is not None:
+            self._compactor.join(timeout)
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'written': self.written, 'dropped': self.dropped,
+                'errors': self.errors, 'writer_alive': self.alive, 'last_error': self.last_error}
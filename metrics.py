@@ -0,0 +1,138 @@
+import threading
+from time import perf_counter
+
+# --- DEFAULT BUCKETS ---
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+class Histogram:
+    """
+    Fixed-bucket histogram (cumulative, Prometheus style): counts[i] is the
+    number of observations <= buckets[i]; the last count is +Inf.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self):
+        """Context manager observing the seconds spent inside the block."""
+        return _Timer(self)
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = []
+        running = 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return {
+            'buckets': {**{str(b): n for b, n in zip(self.buckets, cumulative)}, '+Inf': cumulative[-1]},
+            'sum': total,
+            'count': count,
+        }
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(perf_counter() - self.started)
+
+class Counter:
+    """Monotonic, thread-safe counter."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+# --- PROMETHEUS TEXT EXPOSITION ---
+def _labels(labels, extra=None):
+    pairs = list(labels.items()) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+class Registry:
+    """
+    Named metric families rendered in Prometheus text format (version 0.0.4).
+    Several series may share a name with different labels; each family gets
+    one HELP/TYPE header. Gauges are callbacks read at scrape time; so are
+    counters whose value some other object already keeps.
+    """
+
+    def __init__(self):
+        self._families = {} # name -> [kind, help, [(labels, source)]]
+        self._lock = threading.Lock()
+
+    def _add(self, kind, name, help_text, labels, source):
+        with self._lock:
+            family = self._families.setdefault(name, [kind, help_text, []])
+            family[2].append((dict(labels or {}), source))
+        return source
+
+    def counter(self, name, help_text, labels=None):
+        return self._add('counter', name, help_text, labels, Counter())
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, labels=None):
+        return self._add('histogram', name, help_text, labels, Histogram(buckets))
+
+    def register(self, kind, name, help_text, source, labels=None):
+        """
+        Exposes an existing Histogram/Counter, or a callable for a gauge or
+        for a counter kept elsewhere (it must never go down).
+        """
+        return self._add(kind, name, help_text, labels, source)
+
+    def gauge(self, name, help_text, fn, labels=None):
+        return self._add('gauge', name, help_text, labels, fn)
+
+    def render(self):
+        with self._lock:
+            families = [(name, kind, help_text, list(series))
+                        for name, (kind, help_text, series) in self._families.items()]
+        lines = []
+        for name, kind, help_text, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, source in series:
+                if kind == 'histogram':
+                    snap = source.snapshot()
+                    for bound, count in snap['buckets'].items():
+                        lines.append(f"{name}_bucket{_labels(labels, ('le', bound))} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {snap['sum']}")
+                    lines.append(f"{name}_count{_labels(labels)} {snap['count']}")
+                elif kind == 'counter':
+                    value = source() if callable(source) else source.value
+                    lines.append(f"{name}{_labels(labels)} {value}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {source()}")
+        return "\n".join(lines) + "\n"
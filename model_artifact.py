@@ -0,0 +1,218 @@
+import os
+import json
+import logging
+import time
+import hashlib
+import threading
+import joblib
+import numpy as np
+import pandas as pd
+from compiled_forest import CompiledForest, probe_matrix
+
+log = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+# models/
+#   CURRENT                 <- one line: the active version (replaced atomically)
+#   20261017-181500-1a2b3c/
+#     metadata.json         <- version, features, schema, accuracy, sha256, ...
+#     feature.npy ...       <- CompiledForest arrays, loaded with mmap_mode='r'
+#     model.joblib          <- the estimator; next to compiled arrays the servers
+#                              never unpickle it (training tools use load_estimator)
+MODELS_DIR = "models"
+CURRENT_FILE = "CURRENT"
+METADATA_FILE = "metadata.json"
+ESTIMATOR_FILE = "model.joblib"
+ARRAYS = ['feature', 'threshold', 'children', 'value', 'roots', 'classes', 'is_leaf', 'nan_left']
+# Arrays of artifacts whose metadata predates the 'arrays' key
+LEGACY_ARRAYS = ARRAYS[:7]
+HASH_BLOCK = 1 << 20
+# Column order of bare-estimator pickles from before the artifact carried its feature list
+LEGACY_FEATURES = ['url_len', 'hostname_len', 'count_dots', 'count_dashes',
+                   'count_at', 'count_digits', 'sus_word_count', 'is_bad_tld', 'is_https']
+
+_verified = {} # file signatures -> sha256, so a reload of unchanged files skips the re-hash
+_verified_lock = threading.Lock()
+
+def _signature(paths):
+    stats = [os.stat(path) for path in paths]
+    return tuple((path, st.st_ino, st.st_size, st.st_mtime_ns) for path, st in zip(paths, stats))
+
+def _sha256(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def _verified_sha256(paths):
+    signature = _signature(paths)
+    with _verified_lock:
+        if signature in _verified:
+            return _verified[signature]
+    digest = _sha256(paths)
+    with _verified_lock:
+        _verified[signature] = digest
+    return digest
+
+def _payload_names(info):
+    """Files covered by metadata['sha256'] (older artifacts predate the 'payload' key)."""
+    if 'payload' in info:
+        return info['payload']
+    if info['kind'] == 'compiled_forest':
+        return [f"{name}.npy" for name in info.get('arrays', LEGACY_ARRAYS)]
+    return [ESTIMATOR_FILE]
+
+def _payload_files(version_dir, names):
+    return [os.path.join(version_dir, name) for name in names]
+
+def current_path(models_dir=MODELS_DIR):
+    return os.path.join(models_dir, CURRENT_FILE)
+
+def current_version(models_dir=MODELS_DIR):
+    try:
+        with open(current_path(models_dir), "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+# --- WRITING ---
+def save_artifact(model, features, schema_version, accuracy=None, models_dir=MODELS_DIR, extra=None):
+    """
+    Writes a new version directory, then points CURRENT at it with a rename,
+    so a watching server switches from one complete artifact to the next.
+    Random forests are stored as CompiledForest .npy arrays (memory-mapped by
+    every worker, no unpickling) next to the joblib estimator, which only
+    training tools read back; anything else is joblib only. Returns the
+    metadata dict.
+    """
+    trained_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    compiled = compile_model(model, list(features)) # Never ship arrays that disagree with the estimator
+    kind = 'compiled_forest' if compiled is not None else 'joblib'
+
+    tmp_dir = os.path.join(models_dir, f".tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(tmp_dir)
+    payload = [ESTIMATOR_FILE]
+    if compiled is not None:
+        for name in ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), np.ascontiguousarray(getattr(compiled, name)))
+        payload = [f"{name}.npy" for name in ARRAYS] + payload
+    joblib.dump(model, os.path.join(tmp_dir, ESTIMATOR_FILE))
+
+    sha256 = _sha256(_payload_files(tmp_dir, payload))
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{sha256[:8]}"
+    metadata = {
+        'version': version,
+        'kind': kind,
+        'trained_at': trained_at,
+        'features': list(features),
+        'schema_version': schema_version,
+        'accuracy': accuracy,
+        'sha256': sha256,
+        'payload': payload,
+        'estimator': type(model).__name__,
+        **(extra or {}),
+    }
+    if compiled is not None:
+        metadata.update({'arrays': ARRAYS, 'n_trees': len(compiled.roots), 'n_nodes': len(compiled.feature),
+                         'max_depth': compiled.max_depth})
+    with open(os.path.join(tmp_dir, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    version_dir = os.path.join(models_dir, version)
+    os.replace(tmp_dir, version_dir)
+    tmp_current = current_path(models_dir) + ".tmp"
+    with open(tmp_current, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp_current, current_path(models_dir))
+    return metadata
+
+# --- READING ---
+class LoadedModel:
+    """
+    What the servers predict with: the compiled forest and/or sklearn
+    estimator, the feature order and the artifact metadata. Built in full
+    before it is published, so swapping one reference swaps all of it.
+    Memory-mapped artifacts carry no estimator: nothing is unpickled on
+    the request path, in any worker.
+    """
+
+    def __init__(self, model, compiled, features, info):
+        self.model = model        # sklearn estimator, or None for memory-mapped artifacts
+        self.compiled = compiled  # CompiledForest, or None
+        self.features = list(features)
+        self.info = info
+
+    @property
+    def version(self):
+        return self.info.get('version')
+
+    def predict(self, X, chunk_rows):
+        """Labels for a float32 matrix in `features` order, `chunk_rows` rows per compiled pass."""
+        if self.compiled is None:
+            return self.model.predict(pd.DataFrame(X, columns=self.features))
+        if len(X) <= chunk_rows:
+            return self.compiled.predict(X)
+        return np.concatenate([self.compiled.predict(X[i:i + chunk_rows]) for i in range(0, len(X), chunk_rows)])
+
+def load_artifact(models_dir=MODELS_DIR, version=None, verify=True):
+    """
+    LoadedModel for `version` (default: CURRENT). Forest arrays are opened
+    with mmap_mode='r': loading costs a few page faults, not an unpickle,
+    and all processes share the page cache. `verify` re-hashes the payload
+    against metadata['sha256'] (once per unchanged set of files).
+    """
+    version = version or current_version(models_dir)
+    if not version:
+        raise FileNotFoundError(f"No {CURRENT_FILE} in {models_dir}")
+    version_dir = os.path.join(models_dir, version)
+    with open(os.path.join(version_dir, METADATA_FILE), "r") as f:
+        info = json.load(f)
+
+    payload = _payload_names(info)
+    if verify and _verified_sha256(_payload_files(version_dir, payload)) != info['sha256']:
+        raise ValueError(f"Checksum mismatch for model {version}")
+
+    if info['kind'] == 'compiled_forest':
+        arrays = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')
+                  for name in info.get('arrays', LEGACY_ARRAYS)}
+        arrays['classes'] = np.array(arrays['classes']) # Tiny; a plain array keeps take() results ordinary
+        compiled = CompiledForest(max_depth=info.get('max_depth', 0), **arrays)
+        return LoadedModel(None, compiled, info['features'], info)
+    return LoadedModel(joblib.load(os.path.join(version_dir, ESTIMATOR_FILE)), None, info['features'], info)
+
+def load_estimator(models_dir=MODELS_DIR, version=None):
+    """
+    The sklearn estimator saved with `version` (default: CURRENT), for
+    training tools. Servers use load_artifact(), which never unpickles it
+    next to compiled arrays.
+    """
+    version = version or current_version(models_dir)
+    if not version:
+        raise FileNotFoundError(f"No {CURRENT_FILE} in {models_dir}")
+    return joblib.load(os.path.join(models_dir, version, ESTIMATOR_FILE))
+
+def compile_model(model, feature_names):
+    """Flattens a RandomForest and only keeps it if it agrees with sklearn exactly."""
+    if not hasattr(model, "estimators_") or not hasattr(model.estimators_[0], "tree_"):
+        return None
+    forest = CompiledForest.from_sklearn(model)
+    probe = pd.DataFrame(probe_matrix(forest, len(feature_names)), columns=feature_names)
+    if not np.array_equal(forest.predict(probe.to_numpy()), model.predict(probe)):
+        log.warning("⚠️ Compiled forest disagrees with sklearn; using model.predict only")
+        return None
+    return forest
+
+def load_pickle(path):
+    """The legacy joblib file: {"model", "features", "schema_version"} or a bare estimator."""
+    artifact = joblib.load(path)
+    if isinstance(artifact, dict):
+        model, feature_names = artifact["model"], artifact["features"]
+        info = {'schema_version': artifact.get("schema_version")}
+    else:
+        model, feature_names = artifact, LEGACY_FEATURES
+        info = {}
+    info.update({'version': f"pickle-{int(os.path.getmtime(path))}", 'kind': 'joblib', 'source': path,
+                 'features': feature_names})
+    return LoadedModel(model, compile_model(model, feature_names), feature_names, info)
@@ -1,11 +1,135 @@
 // --- CONFIGURATION ---
 // Connects to your Python Server (Brain)
 const API_URL = "http://127.0.0.1:5000/predict"; 
+const BATCH_API_URL = "http://127.0.0.1:5000/predict_batch";
+const BLOOM_URL = "http://127.0.0.1:5000/whitelist_bloom";
+const BLOOM_REFRESH_MS = 60 * 60 * 1000; // Re-check hourly (the HTTP cache + ETag make it cheap)
+
+// --- LOCAL WHITELIST (Bloom filters, see bloom.py for the format) ---
+// Links to well-known sites are marked SAFE here without a server call.
+// The payload holds the whitelist filter followed by a Public Suffix List
+// filter, used to stop the parent-domain walk at the registrable domain.
+let bloom = null;
+let suffixes = null;
+let bloomCheckedAt = 0;
+
+const FNV_OFFSET = 0xcbf29ce484222325n;
+const FNV_PRIME = 0x100000001b3n;
+const BLOOM_HEADER_BYTES = 48;
+const encoder = new TextEncoder();
+
+function fnv1a64(text) {
+    let h = FNV_OFFSET;
+    for (const byte of encoder.encode(text)) {
+        h = BigInt.asUintN(64, (h ^ BigInt(byte)) * FNV_PRIME);
+    }
+    return h;
+}
+
+function mix64(z) {
+    z = BigInt.asUintN(64, (z ^ (z >> 30n)) * 0xbf58476d1ce4e5b9n);
+    z = BigInt.asUintN(64, (z ^ (z >> 27n)) * 0x94d049bb133111ebn);
+    return z ^ (z >> 31n);
+}
+
+function parseBloom(buffer, offset = 0) {
+    if (buffer.byteLength < offset + BLOOM_HEADER_BYTES) return null;
+    const view = new DataView(buffer, offset);
+    const magic = new TextDecoder().decode(new Uint8Array(buffer, offset, 7));
+    if (magic !== "PHBLOOM" || view.getUint32(8, true) !== 1) return null;
+    const m = Number(view.getBigUint64(16, true));
+    return {
+        k: view.getUint32(12, true),
+        m: m,
+        seed: view.getBigUint64(32, true),
+        bits: new Uint8Array(buffer, offset + BLOOM_HEADER_BYTES, m / 8),
+        end: offset + BLOOM_HEADER_BYTES + m / 8
+    };
+}
+
+function bloomPositions(filter, hash) {
+    const z = mix64(hash ^ filter.seed);
+    const h1 = Number(z & 0xffffffffn);
+    const h2 = Number((z >> 32n) | 1n);
+    const positions = [];
+    for (let i = 0; i < filter.k; i++) {
+        positions.push((h1 + i * h2) % filter.m); // < 2^53, exact
+    }
+    return positions;
+}
+
+function bloomHas(filter, hash) {
+    return bloomPositions(filter, hash).every(p => (filter.bits[Math.floor(p / 8)] >> (p % 8)) & 1);
+}
+
+// PSL rule or wildcard rule ("*.ck") match; a false positive only stops the walk early
+function isPublicSuffix(domain) {
+    if (bloomHas(suffixes, fnv1a64(domain))) return true;
+    const dot = domain.indexOf(".");
+    return dot > 0 && bloomHas(suffixes, fnv1a64("*" + domain.slice(dot)));
+}
+
+// Same normalization as domain_index.normalize_domain, and the same walk as
+// candidate_suffixes: the host, then parents down to the registrable domain
+// (never a public suffix like github.io, never a bare TLD)
+function isKnownGood(url) {
+    if (!bloom || !suffixes) return false;
+    let host;
+    try {
+        const parsed = new URL(url);
+        if (parsed.protocol !== "http:" && parsed.protocol !== "https:") return false;
+        host = parsed.hostname.toLowerCase().replace(/\.+$/, "");
+    } catch (e) {
+        return false;
+    }
+    if (host.startsWith("www.")) host = host.slice(4);
+    const labels = host.split(".");
+    for (let i = 0; i < Math.max(1, labels.length - 1); i++) {
+        const suffix = labels.slice(i).join(".");
+        if (isPublicSuffix(suffix)) return false; // Public suffixes are never in the filter
+        if (bloomHas(bloom, fnv1a64(suffix))) return true;
+    }
+    return false;
+}
+
+function loadBloom(buffer) {
+    const whitelistFilter = parseBloom(buffer);
+    const suffixFilter = whitelistFilter && parseBloom(buffer, whitelistFilter.end);
+    if (!suffixFilter) return; // Old or damaged payload: keep what we have
+    bloom = whitelistFilter;
+    suffixes = suffixFilter;
+}
+
+function refreshBloom() {
+    if (Date.now() - bloomCheckedAt < BLOOM_REFRESH_MS) return;
+    bloomCheckedAt = Date.now();
+    fetch(BLOOM_URL) // Cache-Control/ETag: usually answered from cache or with a 304
+        .then(res => res.ok ? res.arrayBuffer() : null)
+        .then(buffer => { if (buffer) loadBloom(buffer); })
+        .catch(err => {
+            bloomCheckedAt = 0; // Server down: try again on the next message
+            console.error("Whitelist filter unavailable:", err);
+        });
+}
+
+refreshBloom();
 
 chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
     
     // Listen for the silent check from content.js
     if (message.type === "CHECK_LINK_SILENT") {
+        refreshBloom();
+
+        if (isKnownGood(message.url)) {
+            if (sender.tab && sender.tab.id) {
+                chrome.tabs.sendMessage(sender.tab.id, {
+                    type: "INSERT_SHIELD",
+                    elementId: message.elementId,
+                    status: "SAFE"
+                });
+            }
+            return false;
+        }
         
         fetch(API_URL, {
             method: 'POST',
@@ -29,4 +153,47 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
 
         return true; // Keep connection open
     }
+
+    // One message per debounced scan from content.js -> one HTTP request
+    if (message.type === "CHECK_LINKS_BATCH") {
+        refreshBloom();
+        if (!sender.tab || !sender.tab.id) return false;
+
+        // Known-good links are answered locally; only the rest go to the server
+        const known = [];
+        const unknown = [];
+        for (const link of message.links) {
+            (isKnownGood(link.url) ? known : unknown).push(link);
+        }
+        if (known.length) {
+            chrome.tabs.sendMessage(sender.tab.id, {
+                type: "INSERT_SHIELDS",
+                shields: known.map(link => ({ elementId: link.elementId, status: "SAFE" }))
+            });
+        }
+        if (!unknown.length) return false;
+
+        fetch(BATCH_API_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ urls: unknown.map(link => link.url) })
+        })
+        .then(res => res.json())
+        .then(data => {
+            if (!data.results) return;
+            // Results come back in the same order as the links we sent
+            chrome.tabs.sendMessage(sender.tab.id, {
+                type: "INSERT_SHIELDS",
+                shields: unknown.map((link, i) => ({
+                    elementId: link.elementId,
+                    status: data.results[i] ? data.results[i].result : "SKIPPED"
+                }))
+            });
+        })
+        .catch(err => {
+            console.error("Server Error:", err);
+        });
+
+        return true; // Keep connection open
+    }
 });
\ No newline at end of file
@@ -1,5 +1,6 @@
 // --- CONFIGURATION ---
 const API_URL = "http://127.0.0.1:5000"; 
+const BATCH_SIZE = 500;
 
 // [Keep your existing styles here...]
 const style = document.createElement('style');
@@ -25,6 +26,7 @@ function scanLinks() {
     if (document.hidden) return;
 
     const links = document.querySelectorAll('a:not([data-ai-checked])');
+    const batch = [];
     
     links.forEach((link, index) => {
         if (link.querySelector('img, svg, i')) {
@@ -52,13 +54,16 @@ function scanLinks() {
 
         const uniqueId = "ai-link-" + Date.now() + "-" + index;
         link.setAttribute('data-ai-checked', uniqueId);
-        
+        batch.push({ url: link.href, elementId: uniqueId });
+    });
+
+    // Server caps a batch at 500 URLs
+    for (let i = 0; i < batch.length; i += BATCH_SIZE) {
         chrome.runtime.sendMessage({ 
-            type: "CHECK_LINK_SILENT", 
-            url: link.href, 
-            elementId: uniqueId 
+            type: "CHECK_LINKS_BATCH", 
+            links: batch.slice(i, i + BATCH_SIZE)
         });
-    });
+    }
 }
 
 // Smart Debouncer
@@ -71,20 +76,28 @@ observer.observe(document.body, { childList: true, subtree: true });
 scanLinks();
 
 // --- POPUP LOGIC ---
-chrome.runtime.onMessage.addListener((message) => {
-    if (message.type === "INSERT_SHIELD" && message.status !== "SKIPPED") {
-        const linkElement = document.querySelector(`[data-ai-checked="${message.elementId}"]`);
-        if (linkElement && !linkElement.querySelector('.ai-shield')) {
-            linkElement.dataset.aiStatus = message.status;
-            if (message.status === "DANGER" || message.status === "SAFE") { 
-                const shield = document.createElement('span');
-                shield.className = 'ai-shield';
-                shield.innerText = message.status === "SAFE" ? "✅" : "⛔";
-                shield.title = message.status === "SAFE" ? "Verified Safe" : "AI Warning: Phishing Suspected";
-                linkElement.appendChild(shield);
-            }
+function insertShield(elementId, status) {
+    if (status === "SKIPPED") return;
+    const linkElement = document.querySelector(`[data-ai-checked="${elementId}"]`);
+    if (linkElement && !linkElement.querySelector('.ai-shield')) {
+        linkElement.dataset.aiStatus = status;
+        if (status === "DANGER" || status === "SAFE") { 
+            const shield = document.createElement('span');
+            shield.className = 'ai-shield';
+            shield.innerText = status === "SAFE" ? "✅" : "⛔";
+            shield.title = status === "SAFE" ? "Verified Safe" : "AI Warning: Phishing Suspected";
+            linkElement.appendChild(shield);
         }
     }
+}
+
+chrome.runtime.onMessage.addListener((message) => {
+    if (message.type === "INSERT_SHIELD") {
+        insertShield(message.elementId, message.status);
+    }
+    if (message.type === "INSERT_SHIELDS") {
+        message.shields.forEach(s => insertShield(s.elementId, s.status));
+    }
 });
 
 document.addEventListener('click', (e) => {
@@ -1,14 +1,18 @@
 import sqlite3
+import argparse
+import numpy as np
 import pandas as pd
-import kagglehub
 import os
 import time
 import threading
 import sys
-from ucimlrepo import fetch_ucirepo 
 
 # --- CONFIGURATION ---
 DB_NAME = "threats.db"
+CHUNK_SIZE = 50000   # Rows per read_csv chunk / insert transaction in --incremental mode
+PHISHTANK_FILE = "verified_online.csv"
+PHIUSIIL_FILES = ["phiusiil_cached.csv", "PhiUSIIL_Phishing_URL_Dataset.csv"]
+URL_INDEX_FILE = "known_urls.bin" # Exact-match verdicts for app.py (see url_index.py)
 
 # --- LIVE TIMER HELPER ---
 class LiveTimer:
@@ -39,19 +43,22 @@ class LiveTimer:
 
 # --- DATA FUNCTIONS ---
 
+def find_kaggle_csv():
+    import kagglehub
+    path = kagglehub.dataset_download("harisudhan411/phishing-and-legitimate-urls")
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            if file.endswith(".csv"):
+                return os.path.join(root, file)
+    return None
+
 def get_kaggle_data():
     timer = LiveTimer("Fetching Kaggle Data")
     timer.start()
     df_result = pd.DataFrame()
     
     try:
-        path = kagglehub.dataset_download("harisudhan411/phishing-and-legitimate-urls")
-        csv_file = None
-        for root, dirs, files in os.walk(path):
-            for file in files:
-                if file.endswith(".csv"):
-                    csv_file = os.path.join(root, file)
-                    break
+        csv_file = find_kaggle_csv()
         
         if csv_file:
             df = pd.read_csv(csv_file)
@@ -71,12 +78,7 @@ def get_kaggle_data():
 def get_phiusiil_data():
     print("⬇️  Checking for PhiUSIIL Data...")
     
-    possible_files = [
-        "phiusiil_cached.csv",
-        "PhiUSIIL_Phishing_URL_Dataset.csv"
-    ]
-
-    for filename in possible_files:
+    for filename in PHIUSIIL_FILES:
         if os.path.exists(filename):
             print(f"   📂 Found local file: {filename}")
             try:
@@ -91,6 +93,7 @@ def get_phiusiil_data():
     timer = LiveTimer("Downloading from UCI")
     timer.start()
     try:
+        from ucimlrepo import fetch_ucirepo
         phiusiil = fetch_ucirepo(id=967) 
         df = phiusiil.data.original
         df.columns = [c.lower() for c in df.columns]
@@ -107,7 +110,7 @@ def get_phiusiil_data():
 # --- NEW: PHISHTANK LOADER ---
 def get_phishtank_data():
     print("⬇️  Checking for PhishTank Data...")
-    filename = "verified_online.csv"
+    filename = PHISHTANK_FILE
 
     if os.path.exists(filename):
         print(f"   📂 Found local file: {filename}")
@@ -144,8 +147,123 @@ def standardize_label(label):
         
     return 'legitimate' # Default fallback
 
+def standardize_labels(labels):
+    """Vectorized standardize_label() for a whole column."""
+    s = pd.Series(labels, dtype=object).astype(str).str.lower().str.strip()
+    return np.where(s.isin(['0', 'phishing', 'verified']).to_numpy(), 'phishing', 'legitimate')
+
+# --- STREAMING (INCREMENTAL) INGEST ---
+
+def read_csv_chunks(path, label=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields [url, label] frames of `chunk_size` rows. Only the url/label/status
+    columns are parsed; `label` forces one label for every row (PhishTank).
+    """
+    wanted = {'url', 'label', 'status'}
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype=str, usecols=lambda c: c.lower() in wanted):
+        chunk.columns = [c.lower() for c in chunk.columns]
+        if 'label' not in chunk.columns and 'status' in chunk.columns:
+            chunk = chunk.rename(columns={'status': 'label'})
+        if label is not None:
+            chunk['label'] = label
+        yield chunk[['url', 'label']]
+
+def kaggle_chunks(chunk_size=CHUNK_SIZE):
+    csv_file = find_kaggle_csv()
+    if csv_file:
+        yield from read_csv_chunks(csv_file, chunk_size=chunk_size)
+
+def phiusiil_chunks(chunk_size=CHUNK_SIZE):
+    local = [f for f in PHIUSIIL_FILES if os.path.exists(f)]
+    if not local:
+        get_phiusiil_data() # Downloads once and saves phiusiil_cached.csv
+        local = [f for f in PHIUSIIL_FILES if os.path.exists(f)]
+    if local:
+        yield from read_csv_chunks(local[0], chunk_size=chunk_size)
+
+def phishtank_chunks(chunk_size=CHUNK_SIZE):
+    if os.path.exists(PHISHTANK_FILE):
+        yield from read_csv_chunks(PHISHTANK_FILE, label='phishing', chunk_size=chunk_size)
+    else:
+        print(f"   ⚠️ File {PHISHTANK_FILE} not found. Skipping PhishTank.")
+
+# Same priority as the full rebuild: on duplicate URLs the earlier source wins
+SOURCES = {'kaggle': kaggle_chunks, 'phiusiil': phiusiil_chunks, 'phishtank': phishtank_chunks}
+
+def ensure_schema(conn):
+    """training_samples with a UNIQUE index on the URL, so inserts can dedupe."""
+    conn.execute("CREATE TABLE IF NOT EXISTS training_samples (content TEXT, status TEXT)")
+    try:
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_training_samples_content ON training_samples(content)")
+    except sqlite3.IntegrityError:
+        print("   🧹 Removing duplicate URLs left by an older import...")
+        conn.execute("DELETE FROM training_samples WHERE rowid NOT IN "
+                     "(SELECT MIN(rowid) FROM training_samples GROUP BY content)")
+        conn.execute("CREATE UNIQUE INDEX idx_training_samples_content ON training_samples(content)")
+    conn.commit()
+
+def ingest_chunks(conn, chunks, name):
+    """
+    INSERT OR IGNORE each chunk in its own transaction: existing URLs are left
+    untouched (first one wins, like drop_duplicates), new ones are appended.
+    Returns (rows_seen, rows_inserted).
+    """
+    seen = inserted = 0
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=['url'])
+        before = conn.total_changes
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO training_samples (content, status) VALUES (?, ?)",
+                             zip(chunk['url'].tolist(), standardize_labels(chunk['label']).tolist()))
+        seen += len(chunk)
+        inserted += conn.total_changes - before
+        sys.stdout.write(f"\r   📥 {name}: {seen} rows read, {inserted} new")
+        sys.stdout.flush()
+    sys.stdout.write("\n")
+    return seen, inserted
+
+def incremental_ingest(sources, csv_files=(), csv_label=None, db_name=DB_NAME, chunk_size=CHUNK_SIZE):
+    conn = sqlite3.connect(db_name)
+    conn.execute("PRAGMA journal_mode=WAL")
+    ensure_schema(conn)
+    total_new = 0
+    for name in sources:
+        try:
+            total_new += ingest_chunks(conn, SOURCES[name](chunk_size), name)[1]
+        except Exception as e:
+            print(f"\n   ❌ {name} failed: {e}")
+    for path in csv_files:
+        total_new += ingest_chunks(conn, read_csv_chunks(path, csv_label, chunk_size), path)[1]
+    conn.close()
+    print(f"✅ SUCCESS! {total_new} new rows added to training_samples.")
+    refresh_url_index(db_name)
+    return total_new
+
+def refresh_url_index(db_name=DB_NAME, full=False):
+    """Appends rows past the index watermark (or rebuilds it) so app.py sees them."""
+    from url_index import update_index
+    index = update_index(db_name, URL_INDEX_FILE, full=full)
+    print(f"🗂️ Known-URL index: {len(index)} URLs up to rowid {index.max_rowid} ({URL_INDEX_FILE})")
+
 # --- MAIN EXECUTION ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill training_samples in threats.db.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Stream sources in chunks and only append new URLs (no full rewrite)")
+    parser.add_argument("--sources", default=",".join(SOURCES),
+                        help=f"With --incremental: comma-separated subset of {','.join(SOURCES)}")
+    parser.add_argument("--csv", action="append", default=[],
+                        help="With --incremental: extra local CSV with a url column (repeatable)")
+    parser.add_argument("--label", help="Label for every row of the --csv files (e.g. phishing)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if args.incremental:
+        print("--- 📥 INCREMENTAL INGEST ---")
+        sources = [s for s in args.sources.split(",") if s]
+        incremental_ingest(sources, args.csv, args.label, DB_NAME, args.chunk_size)
+        sys.exit()
+
     print("--- 🛠️ FIXING DATABASE LABELS ---")
     
     # 1. Get All Datasets
@@ -166,7 +284,7 @@ if __name__ == "__main__":
     df_final.drop_duplicates(subset=['url'], inplace=True)
     
     # Apply standardizer
-    df_final['status'] = df_final['label'].apply(standardize_label)
+    df_final['status'] = standardize_labels(df_final['label'])
     
     df_final.rename(columns={'url': 'content'}, inplace=True)
     df_db = df_final[['content', 'status']]
@@ -179,9 +297,11 @@ if __name__ == "__main__":
     try:
         conn = sqlite3.connect(DB_NAME)
         df_db.to_sql('training_samples', conn, if_exists='replace', index=False)
+        ensure_schema(conn) # So later --incremental runs can dedupe on insert
         conn.close()
         save_timer.stop()
         print("✅ SUCCESS! Database updated with PhishTank data.")
+        refresh_url_index(DB_NAME, full=True) # Rowids were reassigned by the rewrite
     except Exception as e:
         save_timer.stop()
         print(f"❌ Database Error: {e}")
\ No newline at end of file
@@ -0,0 +1,330 @@
+import os
+import sqlite3
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import bulk_scan
+from features import SCANNER
+from domain_index import host_of
+from bloom import whitelist_payload
+from cache import LRUCache
+from unroller import RedirectUnroller
+from hot_reload import FileWatcher
+from log_sink import LogSink
+from log_rollups import read_stats
+from metrics import Registry, SIZE_BUCKETS
+from model_artifact import current_path
+from config import (MODEL_FILE, MODEL_DIR, WHITELIST_FILE, URL_INDEX_FILE, RELOAD_INTERVAL, MAX_BATCH_URLS,
+                    BLOOM_FP_RATE, BLOOM_MAX_AGE, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, LOG_DB, LOG_REQUESTS,
+                    LOG_RETENTION_DAYS, UNROLL_WAIT, UNROLL_DEADLINE, UNROLL_MAX_HOPS, UNROLL_MAX_PENDING,
+                    VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL, VERDICT_CACHE_MAX_MB, LOG_LEVEL)
+
+# --- CONFIGURATION ---
+# Production mode for the /predict API: ONE asyncio process handles HTTP,
+# the cache and redirect unrolling, and a pool of worker processes runs
+# feature extraction + inference. At startup (before any thread exists) the
+# model, whitelist and known-URL index are loaded once and the workers are
+# forked, so they inherit them copy-on-write (the artifact arrays are mmaps:
+# literally the same pages). Shared settings live in config.py.
+#   python serve.py          (SERVE_WORKERS=4 python serve.py, ...)
+#   uvicorn serve:app        (same thing; the pool starts in the startup hook)
+SERVE_HOST = os.environ.get("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.environ.get("SERVE_PORT", 5000))
+SERVE_WORKERS = int(os.environ.get("SERVE_WORKERS", os.cpu_count() or 1))
+# Start method once threads are running (reloads): forking a threaded
+# process can copy a lock some other thread holds and deadlock the child
+RELOAD_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+log = logging.getLogger("serve")
+
+# --- METRICS ---
+metrics = Registry()
+REQUEST_SECONDS = {endpoint: metrics.histogram("phishing_detector_request_seconds", "Handler time per request",
+                                               labels={'endpoint': endpoint}) for endpoint in ('predict', 'predict_batch')}
+WORKER_SECONDS = metrics.histogram("phishing_detector_worker_seconds", "Round-trip of one task to the worker pool")
+TASK_SIZE = metrics.histogram("phishing_detector_worker_task_urls", "URLs per worker task", buckets=SIZE_BUCKETS)
+VERDICTS = {(path, result): metrics.counter("phishing_detector_verdicts_total", "URLs classified, by deciding path",
+                                            labels={'path': path, 'result': result})
+            for path in ('cache', 'whitelist', 'known_urls', 'model') for result in ('SAFE', 'DANGER')}
+ERRORS = metrics.counter("phishing_detector_errors_total", "Requests that failed with a 500")
+
+# --- GLOBAL VARIABLES ---
+# Only the event-loop thread swaps `pool`/`model_info`/`whitelist_bloom`, so a
+# handler never submits to a pool that is being shut down.
+pool = None
+model_info = {}
+whitelist_bloom = None
+verdict_cache = LRUCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL, VERDICT_CACHE_MAX_MB * 1024 * 1024)
+unroller = None
+log_sink = None
+
+# --- 1. WORKER POOL ---
+def classify(urls):
+    """Runs in a worker: [(verdict, path), ...] for already-unrolled, lowercased URLs."""
+    df = bulk_scan.classify_chunk(urls, with_features=False)
+    return list(zip(df['verdict'], df['source']))
+
+def start_pool():
+    """
+    Loads every artifact into this process and starts SERVE_WORKERS workers.
+    Returns (pool, model info, bloom). While this is the only thread, the
+    workers are forked and inherit the loaded artifacts; otherwise (reloads,
+    platforms without fork) they come from RELOAD_START_METHOD and load the
+    memory-mapped artifacts themselves in bulk_scan.init_worker.
+    """
+    resources = bulk_scan.load_resources(MODEL_DIR, MODEL_FILE)
+    loaded, whitelist, _ = resources
+    bloom = whitelist_payload(whitelist, SCANNER.shorteners, BLOOM_FP_RATE)
+    if "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+        bulk_scan._resources = resources
+        new_pool = ProcessPoolExecutor(SERVE_WORKERS, mp_context=multiprocessing.get_context("fork"))
+    else:
+        new_pool = ProcessPoolExecutor(SERVE_WORKERS, mp_context=multiprocessing.get_context(RELOAD_START_METHOD),
+                                       initializer=bulk_scan.init_worker, initargs=(MODEL_DIR, MODEL_FILE))
+    # With fork the first task forks the whole pool now; otherwise it proves
+    # a worker can load the new artifacts before the pool is published
+    new_pool.submit(os.getpid).result()
+    log.info("✅ %d worker(s) ready: model %s, %d whitelisted domains",
+             SERVE_WORKERS, loaded.version, len(whitelist))
+    return new_pool, loaded.info, bloom
+
+def publish(started):
+    global pool, model_info, whitelist_bloom
+    old = pool
+    pool, model_info, whitelist_bloom = started
+    verdict_cache.clear() # Old verdicts were made with the old artifacts
+    if old is not None:
+        old.shutdown(wait=False) # Tasks already submitted still finish
+
+# Any artifact change restarts the pool; loading is mmap-cheap, and fresh
+# workers are the only way the pool sees the new files.
+watchers = [FileWatcher(path, lambda: None) for path in
+            (current_path(MODEL_DIR), MODEL_FILE, WHITELIST_FILE, URL_INDEX_FILE)]
+
+async def watch_artifacts():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        changed = [w.path for w in watchers if w.check()] # Just a few os.stat calls
+        if not changed:
+            continue
+        try:
+            publish(await loop.run_in_executor(None, start_pool))
+            log.info("🔁 Reloaded after change to %s", ", ".join(changed))
+        except Exception as e:
+            log.warning("⚠️ Reload failed, keeping the running workers: %s", e)
+
+class TaskBatcher:
+    """
+    asyncio twin of batcher.MicroBatcher: URLs from concurrent requests are
+    queued for up to BATCH_MAX_WAIT_MS (or until BATCH_MAX_SIZE) and sent to
+    the pool as ONE task, so a burst of single-URL /predict calls costs one
+    pickle round-trip instead of one each. Only touched from the event loop.
+    """
+
+    def __init__(self, max_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._waiting = [] # (urls, future)
+        self._count = 0
+        self._timer = None
+
+    async def classify(self, urls):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((urls, future))
+        self._count += len(urls)
+        if self._count >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        waiting, self._waiting, self._count = self._waiting, [], 0
+        if not waiting:
+            return
+        urls = [u for chunk, _ in waiting for u in chunk]
+        TASK_SIZE.observe(len(urls))
+        started = perf_counter()
+        task = asyncio.get_running_loop().run_in_executor(pool, classify, urls)
+        task.add_done_callback(lambda done: self._deliver(done, waiting, started))
+
+    @staticmethod
+    def _deliver(done, waiting, started):
+        WORKER_SECONDS.observe(perf_counter() - started)
+        error = done.exception()
+        offset = 0
+        for chunk, future in waiting:
+            end = offset + len(chunk)
+            if not future.done(): # Cancelled when the client went away
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result()[offset:end])
+            offset = end
+
+task_batcher = TaskBatcher()
+
+# --- 2. THE PIPELINE (Event loop: I/O and bookkeeping only) ---
+async def unroll_if_shortened(urls):
+    """{url: (final_url, complete)}; unroller waits run on the default thread pool."""
+    short = [u for u in urls if SCANNER.is_shortener(host_of(u))]
+    results = {}
+    if short:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, unroller.resolve_many, short, UNROLL_WAIT)
+    return {u: results.get(u, (u, True)) for u in urls}
+
+async def classify_urls(distinct):
+    """{original url: verdict}. Cache hits never leave the loop; the rest goes to the workers."""
+    generation = verdict_cache.generation # A publish() while we wait makes our verdicts stale
+    unrolled = await unroll_if_shortened(distinct)
+    final_urls = {u: final.lower() for u, (final, _) in unrolled.items()}
+    verdicts = {}
+    pending = []
+    for original, url_for_ai in final_urls.items():
+        cached = verdict_cache.get(url_for_ai)
+        if cached:
+            verdicts[original] = cached
+            VERDICTS[('cache', cached)].inc()
+        else:
+            pending.append(original)
+
+    if pending:
+        results = await task_batcher.classify([final_urls[u] for u in pending])
+        for original, (result, path) in zip(pending, results):
+            verdicts[original] = result
+            VERDICTS[(path, result)].inc()
+            if unrolled[original][1]: verdict_cache.set(final_urls[original], result, generation)
+
+    if log_sink is not None:
+        for u, result in verdicts.items():
+            log_sink.log(u, result)
+    return verdicts
+
+# --- 3. APP ---
+app = FastAPI()
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Content-Type"],
+)
+
+class PredictRequest(BaseModel):
+    url: str = ""
+
+class BatchRequest(BaseModel):
+    urls: list = []
+
+@app.on_event("startup")
+async def start_background():
+    global unroller, log_sink
+    if pool is None:
+        publish(start_pool()) # Blocks startup on purpose: fork before the threads below exist
+    unroller = RedirectUnroller(max_pending=UNROLL_MAX_PENDING, max_hops=UNROLL_MAX_HOPS, deadline=UNROLL_DEADLINE,
+                                is_shortener=SCANNER.is_shortener)
+    log_sink = LogSink(LOG_DB, raw_retention_days=LOG_RETENTION_DAYS) if LOG_REQUESTS else None
+    asyncio.get_running_loop().create_task(watch_artifacts())
+
+@app.on_event("shutdown")
+def stop_background():
+    if log_sink is not None:
+        log_sink.close()
+    if unroller is not None:
+        unroller.close()
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+@app.post("/predict")
+async def predict(data: PredictRequest):
+    original_url = data.url.strip()
+    if not original_url:
+        return JSONResponse({'error': 'No URL'}, status_code=400)
+    started = perf_counter()
+    try:
+        verdicts = await classify_urls([original_url])
+    except Exception as e:
+        ERRORS.inc()
+        log.exception("❌ Error: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=500)
+    REQUEST_SECONDS['predict'].observe(perf_counter() - started)
+    return {'url': original_url, 'result': verdicts[original_url]}
+
+@app.post("/predict_batch")
+async def predict_batch(data: BatchRequest):
+    """Body: {"urls": [...]}  ->  {"results": [{"url": ..., "result": ...}, ...]}"""
+    if not data.urls:
+        return JSONResponse({'error': 'No URLs'}, status_code=400)
+    if len(data.urls) > MAX_BATCH_URLS:
+        return JSONResponse({'error': f'Too many URLs (max {MAX_BATCH_URLS})'}, status_code=413)
+    originals = [u.strip() if isinstance(u, str) else None for u in data.urls] # Non-strings are SKIPPED
+    started = perf_counter()
+    try:
+        verdicts = await classify_urls([u for u in dict.fromkeys(originals) if u])
+    except Exception as e:
+        ERRORS.inc()
+        log.exception("❌ Error: %s", e)
+        return JSONResponse({'error': str(e)}, status_code=500)
+    REQUEST_SECONDS['predict_batch'].observe(perf_counter() - started)
+    return {'results': [{'url': u if u is not None else raw, 'result': verdicts.get(u, 'SKIPPED')}
+                        for u, raw in zip(originals, data.urls)]}
+
+@app.get("/whitelist_bloom")
+def whitelist_bloom_filter(request: Request):
+    """Same payload and caching headers as app.py's endpoint."""
+    payload, etag = whitelist_bloom
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': f'public, max-age={BLOOM_MAX_AGE}'}
+    if request.headers.get('if-none-match') == headers['ETag']:
+        return Response(status_code=304, headers=headers)
+    return Response(payload, media_type='application/octet-stream', headers=headers)
+
+@app.get("/model")
+def model():
+    return model_info
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.get("/stats")
+def verdict_stats(period: str = 'hour', buckets: int = None, top: int = 10):
+    """Verdict counts from the log rollups (sync def: FastAPI runs the SQLite read off the loop)."""
+    try:
+        return read_stats(LOG_DB, period=period, buckets=buckets, top=top)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except sqlite3.Error as e:
+        return JSONResponse({'error': f'Log database unavailable: {e}'}, status_code=503)
+
+@app.get("/cache_stats")
+def cache_stats():
+    return {'verdicts': verdict_cache.stats(), 'unroller': unroller.stats(),
+            'log_sink': log_sink.stats() if log_sink else None}
+
+metrics.gauge("phishing_detector_verdict_cache_entries", "Entries in the verdict cache", lambda: len(verdict_cache))
+metrics.gauge("phishing_detector_serve_workers", "Worker processes in the pool", lambda: SERVE_WORKERS)
+metrics.register('counter', "phishing_detector_log_rows_dropped_total", "Request log rows dropped",
+                 lambda: log_sink.dropped if log_sink else 0)
+metrics.gauge("phishing_detector_log_writer_up", "1 while the request-log writer thread runs",
+              lambda: int(log_sink.alive) if log_sink else 0)
+
+# --- MAIN EXECUTION ---
+if __name__ == "__main__":
+    import uvicorn
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    print(f"--- 🚀 SERVER STARTED ({SERVE_WORKERS} worker process(es)) ---")
+    print(f"    ✅ Serving on http://127.0.0.1:{SERVE_PORT}")
+    uvicorn.run(app, host=SERVE_HOST, port=SERVE_PORT, log_level=LOG_LEVEL.lower())
@@ -0,0 +1,37 @@
+// Checks myextension/background.js against tests/fixtures/bloom_vectors.json,
+// the same vectors tests/test_bloom_fixture.py checks bloom.py against.
+// Run with: node --test tests/
+const test = require("node:test");
+const assert = require("node:assert");
+const fs = require("node:fs");
+const path = require("node:path");
+const vm = require("node:vm");
+
+const vectors = JSON.parse(fs.readFileSync(path.join(__dirname, "fixtures", "bloom_vectors.json"), "utf8"));
+
+function loadBackground() {
+    const context = {
+        chrome: { runtime: { onMessage: { addListener() {} } }, tabs: { sendMessage() {} } },
+        fetch: () => new Promise(() => {}), // Never settles: no refresh during the test
+        console, TextEncoder, TextDecoder, URL, DataView, Uint8Array, BigInt, Date, Math,
+    };
+    vm.createContext(context);
+    vm.runInContext(fs.readFileSync(path.join(__dirname, "..", "myextension", "background.js"), "utf8"), context);
+    return context;
+}
+
+const background = loadBackground();
+const hex = (n) => n.toString(16).padStart(16, "0");
+
+for (const filter of vectors.filters) {
+    const seed = BigInt("0x" + filter.seed);
+    test(`fnv1a64 / mix64 / positions (m=${filter.m}, k=${filter.k})`, () => {
+        for (const c of filter.cases) {
+            const hash = background.fnv1a64(c.domain);
+            assert.strictEqual(hex(hash), c.fnv1a64, `fnv1a64(${JSON.stringify(c.domain)})`);
+            assert.strictEqual(hex(background.mix64(hash ^ seed)), c.mix64, `mix64 for ${c.domain}`);
+            const positions = background.bloomPositions({ k: filter.k, m: filter.m, seed }, hash);
+            assert.deepStrictEqual(Array.from(positions), c.positions, `positions for ${c.domain}`); // Array from the vm realm
+        }
+    });
+}
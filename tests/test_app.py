@@ -0,0 +1,81 @@
+import importlib
+import os
+import sqlite3
+
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import config
+from features import FEATURE_COLUMNS
+from model_artifact import save_artifact
+from test_compiled_forest import feature_rows
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    """app.py imported inside a scratch directory holding a small model and whitelist."""
+    root = tmp_path_factory.mktemp("app")
+    X, y = feature_rows(n=200)
+    save_artifact(RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y), FEATURE_COLUMNS, 2,
+                  models_dir=str(root / config.MODEL_DIR))
+    (root / config.WHITELIST_TEXT_FILE).write_text("google.com\n")
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        module = importlib.import_module("app")
+        yield module
+    finally:
+        if module.log_sink is not None:
+            module.log_sink.close()
+        os.chdir(cwd)
+
+@pytest.fixture
+def client(app_module):
+    app_module.verdict_cache.clear()
+    return app_module.app.test_client()
+
+def test_predict_batch_dedupes_and_keeps_order(client):
+    urls = ["https://docs.google.com/a", "http://gcash-login.xyz/v", "https://docs.google.com/a", "  ",
+            "http://gcash-login.xyz/v"]
+    response = client.post('/predict_batch', json={'urls': urls})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['url'] for r in results] == [u.strip() for u in urls]
+    assert results[0]['result'] == results[2]['result'] == "SAFE" # Whitelisted
+    assert results[1]['result'] == results[4]['result'] in ("SAFE", "DANGER")
+    assert results[3]['result'] == "SKIPPED"
+
+def test_predict_batch_skips_non_strings(client, app_module):
+    response = client.post('/predict_batch', json={'urls': [5, None, {"x": 1}, "https://google.com"]})
+    assert response.status_code == 200
+    assert response.get_json()['results'] == [
+        {'url': 5, 'result': "SKIPPED"}, {'url': None, 'result': "SKIPPED"},
+        {'url': {"x": 1}, 'result': "SKIPPED"}, {'url': "https://google.com", 'result': "SAFE"}]
+    if app_module.log_sink is not None:
+        app_module.log_sink.close()
+        with sqlite3.connect(app_module.LOG_DB) as conn:
+            logged = {row[0] for row in conn.execute("SELECT content FROM logs")}
+        assert not logged & {"5", "None", "{'x': 1}"}
+        app_module.log_sink = None
+
+def test_predict_batch_limits(client, app_module):
+    assert client.post('/predict_batch', json={'urls': []}).status_code == 400
+    assert client.post('/predict_batch', json={}).status_code == 400
+    too_many = ["https://google.com/%d" % i for i in range(app_module.MAX_BATCH_URLS + 1)]
+    assert client.post('/predict_batch', json={'urls': too_many}).status_code == 413
+    at_limit = too_many[:app_module.MAX_BATCH_URLS]
+    assert client.post('/predict_batch', json={'urls': at_limit}).status_code == 200
+
+def test_reload_mid_request_drops_the_stale_verdict(client, app_module, monkeypatch):
+    extract = app_module.extract_features
+    def reload_then_extract(url):
+        app_module.verdict_cache.clear() # What load_model() does after swapping `active`
+        return extract(url)
+    monkeypatch.setattr(app_module, "extract_features", reload_then_extract)
+    url, stale = "http://gcash-verify.xyz/login", app_module.verdict_cache.stale_sets
+    assert client.post('/predict', json={'url': url}).status_code == 200
+    assert app_module.verdict_cache.get(url) is None
+    assert app_module.verdict_cache.stale_sets == stale + 1
+
+    monkeypatch.setattr(app_module, "extract_features", extract)
+    client.post('/predict', json={'url': url})
+    assert app_module.verdict_cache.get(url) is not None
@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from batcher import MicroBatcher
+
+class Recorder:
+    """predict_fn stand-in: labels each row with its first value and records every call."""
+
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, X, model):
+        if self.gate is not None:
+            self.gate.wait()
+        self.calls.append((model, X.shape))
+        return X[:, 0].astype(int)
+
+def row(value, width=3):
+    return np.full((1, width), value, dtype=np.float32)
+
+def test_coalesces_concurrent_rows_into_one_call():
+    predict = Recorder()
+    batcher = MicroBatcher(predict, max_batch=8, max_wait_ms=200)
+    futures = [batcher.submit(row(i)) for i in range(5)]
+    assert [f.result(2) for f in futures] == list(range(5))
+    assert predict.calls == [(None, (5, 3))]
+
+def test_flushes_a_partial_batch_after_max_wait():
+    predict = Recorder()
+    batcher = MicroBatcher(predict, max_batch=64, max_wait_ms=20)
+    started = time.monotonic()
+    assert batcher.predict(row(7), timeout=2) == 7
+    assert time.monotonic() - started < 1.0
+    assert predict.calls == [(None, (1, 3))]
+
+def test_groups_rows_by_model():
+    # A hot swap between two submits: each row keeps its own model and width
+    predict = Recorder()
+    old, new = object(), object()
+    batcher = MicroBatcher(predict, max_batch=8, max_wait_ms=200)
+    futures = [batcher.submit(row(1), old), batcher.submit(row(2, width=4), new), batcher.submit(row(3), old)]
+    assert [f.result(2) for f in futures] == [1, 2, 3]
+    assert len(predict.calls) == 2
+    assert dict((id(m), shape) for m, shape in predict.calls) == {id(old): (2, 3), id(new): (1, 4)}
+
+def test_rejects_beyond_max_queue():
+    gate = threading.Event()
+    batcher = MicroBatcher(Recorder(gate), max_batch=1, max_wait_ms=0, max_queue=1)
+    first = batcher.submit(row(0)) # Taken by the scheduler, which blocks on the gate
+    deadline = time.monotonic() + 2
+    while batcher.stats()['queue_depth'] and time.monotonic() < deadline:
+        time.sleep(0.001)
+    second = batcher.submit(row(1)) # Fills the queue
+    with pytest.raises(queue.Full):
+        batcher.submit(row(2))
+    assert batcher.rejected == 1
+    gate.set()
+    assert (first.result(2), second.result(2)) == (0, 1)
+
+def test_exception_reaches_every_waiter():
+    def fail(X, model):
+        raise RuntimeError("model broke")
+    batcher = MicroBatcher(fail, max_batch=8, max_wait_ms=200)
+    futures = [batcher.submit(row(i)) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model broke"):
+            future.result(2)
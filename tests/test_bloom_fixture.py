@@ -0,0 +1,34 @@
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from bloom import BloomFilter, _mix, _mix_array
+from domain_index import domain_hash, domain_hashes
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(HERE, "fixtures", "bloom_vectors.json"), encoding="utf-8") as f:
+    VECTORS = json.load(f)
+
+@pytest.mark.parametrize("vector", VECTORS["filters"], ids=lambda v: f"m{v['m']}-k{v['k']}")
+def test_python_matches_fixture(vector):
+    seed = int(vector['seed'], 16)
+    domains = [c['domain'] for c in vector['cases']]
+    hashes = domain_hashes(domains)
+    for c, h in zip(vector['cases'], hashes):
+        assert f"{domain_hash(c['domain']):016x}" == c['fnv1a64']
+        assert f"{int(h):016x}" == c['fnv1a64'] # Vectorized path agrees
+        assert f"{_mix(int(h) ^ seed):016x}" == c['mix64']
+    np.testing.assert_array_equal(_mix_array(hashes ^ np.uint64(seed)),
+                                  [int(c['mix64'], 16) for c in vector['cases']])
+    positions = BloomFilter._positions(hashes, seed, vector['m'], vector['k'])
+    assert positions.tolist() == [c['positions'] for c in vector['cases']]
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_extension_matches_fixture():
+    result = subprocess.run(["node", "--test", os.path.join(HERE, "bloom_fixture.test.js")],
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,65 @@
+import io
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import bulk_scan
+from compiled_forest import CompiledForest
+from domain_index import DomainIndex
+from features import FEATURE_COLUMNS, extract_features, extract_features_batch
+from model_artifact import LoadedModel
+from test_compiled_forest import feature_rows
+from url_index import KnownURLIndex
+
+URLS = ["https://docs.google.com/x", "http://gcash-login.xyz/verify", "https://shopee.ph/cart",
+        "http://bdo-online.top/signin"]
+
+@pytest.fixture
+def resources(monkeypatch):
+    X, y = feature_rows(n=200)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    loaded = LoadedModel(model, CompiledForest.from_sklearn(model), FEATURE_COLUMNS, {})
+    monkeypatch.setattr(bulk_scan, "_resources",
+                        (loaded, DomainIndex.from_domains(["google.com", "shopee.ph"]), KnownURLIndex.empty()))
+    return model
+
+def test_features_cover_every_row_when_requested(resources):
+    out = bulk_scan.classify_chunk(URLS)
+    assert out['source'].tolist() == ["whitelist", "model", "whitelist", "model"]
+    expected = extract_features_batch([u.lower() for u in URLS])
+    for col in FEATURE_COLUMNS:
+        assert out[col].tolist() == expected[col].tolist()
+    assert not out[FEATURE_COLUMNS].isna().any().any()
+
+def test_without_features_only_model_rows_are_extracted(resources, monkeypatch):
+    seen = []
+    def spy(url):
+        seen.append(url)
+        return extract_features(url)
+    monkeypatch.setattr(bulk_scan, "extract_features", spy) # Two rows: the per-URL path
+    monkeypatch.setattr(bulk_scan, "extract_features_batch", lambda urls: pytest.fail("batch extraction"))
+
+    out = bulk_scan.classify_chunk(URLS, with_features=False)
+    assert seen == [URLS[1], URLS[3]]
+    assert out.columns.tolist() == ['url', 'verdict', 'source', 'shortener']
+
+@pytest.mark.parametrize("with_features", [True, False])
+def test_model_verdicts_match_estimator(resources, with_features):
+    urls = [f"http://login-{i}.example/verify?id={i}" for i in range(bulk_scan.ROW_PATH_MAX * 2)]
+    out = bulk_scan.classify_chunk(urls, with_features)
+    expected = resources.predict(extract_features_batch(urls))
+    assert out['verdict'].tolist() == np.where(expected == 1, "SAFE", "DANGER").tolist()
+
+def test_jsonl_skips_and_counts_bad_lines(capsys):
+    lines = ['{"url": "http://a.example/"}', 'not json', '[1, 2]', '"text"', '{"other": 1}', '',
+             '{"url": "http://b.example/"}']
+    chunks = list(bulk_scan.iter_jsonl(io.StringIO("\n".join(lines)), "url", 1))
+    assert chunks == [["http://a.example/"], ["http://b.example/"]]
+    assert "Skipped 4 JSONL line(s)" in capsys.readouterr().err
+
+def test_csv_skips_and_counts_rows_without_url(capsys):
+    text = "id,URL\n1,http://a.example/\n2,\n3,   \n4\n5,http://b.example/\n"
+    chunks = list(bulk_scan.iter_csv(io.StringIO(text), None, 2))
+    assert chunks == [["http://a.example/"], ["http://b.example/"]]
+    assert "Skipped 3 CSV row(s)" in capsys.readouterr().err
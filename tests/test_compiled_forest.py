@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from compiled_forest import CompiledForest
+from features import FEATURE_COLUMNS, extract_features_batch
+
+SAFE = ["https://www.google.com/search?q=weather", "https://docs.python.org/3/library/os.html",
+        "https://en.wikipedia.org/wiki/Manila", "https://github.com/pandas-dev/pandas/issues/1",
+        "https://www.bpi.com.ph/personal", "https://shopee.ph/cart", "http://example.org/"]
+DANGER = ["http://gcash-verify-account.xyz/login.php?id=1", "http://192.168.4.20/paypal/secure-update",
+          "http://bdo-online.top/signin@confirm", "https://secure-login-maya.tk/verify?session=abc-def",
+          "http://free-prize-ph.click/claim?user=1&ref=2", "http://bit.ly/3xYz-login"]
+
+def feature_rows(n=600, seed=0):
+    """Real extract_features_batch rows from randomized variants of the URLs above."""
+    rng = np.random.default_rng(seed)
+    urls, labels = [], []
+    for i in range(n):
+        bad = i % 2
+        base = rng.choice(DANGER if bad else SAFE)
+        urls.append(base + "/" + "-x." * int(rng.integers(0, 6)) + str(rng.integers(0, 10 ** 6)))
+        labels.append(bad)
+    return extract_features_batch(urls), np.array(labels)
+
+@pytest.fixture(scope="module")
+def fitted():
+    X, y = feature_rows()
+    flip = np.random.default_rng(1).random(len(y)) < 0.1 # Noise keeps the trees deep
+    model = RandomForestClassifier(n_estimators=25, random_state=0).fit(X, np.where(flip, 1 - y, y))
+    return model, CompiledForest.from_sklearn(model)
+
+def assert_same(model, forest, X):
+    X = np.asarray(X, dtype=np.float32)
+    frame = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(frame))
+    np.testing.assert_array_equal(forest.predict_proba(X), model.predict_proba(frame))
+
+def test_matches_sklearn_on_real_feature_rows(fitted):
+    model, forest = fitted
+    X, _ = feature_rows(seed=2)
+    assert_same(model, forest, X.to_numpy())
+
+def test_matches_sklearn_on_threshold_ties(fitted):
+    model, forest = fitted
+    X = feature_rows(seed=3)[0].to_numpy().astype(np.float32)
+    split = np.flatnonzero(~forest.is_leaf)
+    rows = np.random.default_rng(4).choice(split, len(X))
+    # Put each row exactly on a split value, and on its float32 neighbours
+    for nudge in (0, np.inf, -np.inf):
+        Xt = X.copy()
+        at = np.nextafter(forest.threshold[rows].astype(np.float32), np.float32(nudge)) if nudge else forest.threshold[rows]
+        Xt[np.arange(len(X)), forest.feature[rows]] = at
+        assert_same(model, forest, Xt)
+
+def test_matches_sklearn_on_nan(fitted):
+    model, forest = fitted
+    X = feature_rows(seed=5)[0].to_numpy().astype(np.float32)
+    mask = np.random.default_rng(6).random(X.shape) < 0.3
+    X[mask] = np.nan
+    assert_same(model, forest, X)
+
+def test_rejects_inf_like_sklearn(fitted):
+    model, forest = fitted
+    X = feature_rows(n=4)[0].to_numpy().astype(np.float32)
+    X[1, 0] = np.inf
+    with pytest.raises(ValueError, match="infinity"):
+        model.predict(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+    with pytest.raises(ValueError, match="infinity"):
+        forest.predict(X)
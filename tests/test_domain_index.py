@@ -0,0 +1,40 @@
+import pytest
+
+from bloom import BloomFilter, whitelist_payload
+from domain_index import DomainIndex, candidate_suffixes, registrable_domain
+
+@pytest.mark.parametrize("host, expected", [
+    ("mail.google.com", ["mail.google.com", "google.com"]),
+    ("a.b.bar.co.uk", ["a.b.bar.co.uk", "b.bar.co.uk", "bar.co.uk"]),
+    ("evil.github.io", ["evil.github.io"]),
+    ("login.evil.blogspot.com", ["login.evil.blogspot.com", "evil.blogspot.com"]),
+    ("github.io", ["github.io"]),
+    ("x.y.brand.example", ["x.y.brand.example", "y.brand.example", "brand.example"]), # Not in the PSL
+    ("127.0.0.1", ["127.0.0.1"]),
+    ("localhost", ["localhost"]),
+])
+def test_candidate_suffixes_stop_at_registrable_domain(host, expected):
+    assert candidate_suffixes(host) == expected
+
+def test_registrable_domain_of_public_suffix_is_none():
+    assert registrable_domain("co.uk") is None
+    assert registrable_domain("herokuapp.com") is None
+    assert registrable_domain("shop.herokuapp.com") == "shop.herokuapp.com"
+
+def test_whitelisted_hosting_platform_does_not_vouch_for_subdomains():
+    index = DomainIndex.from_domains(["github.io", "google.com", "web.app"])
+    assert "docs.google.com" in index
+    assert "github.io" in index
+    assert "evil.github.io" not in index
+    assert "phish.web.app" not in index
+
+def test_bloom_payload_drops_public_suffixes():
+    index = DomainIndex.from_domains(["github.io", "google.com", "bit.ly"])
+    payload, _ = whitelist_payload(index, exclude=["bit.ly"])
+    whitelist = BloomFilter.from_bytes(payload)
+    suffixes = BloomFilter.from_bytes(payload, whitelist.nbytes)
+    assert whitelist.nbytes + suffixes.nbytes == len(payload)
+    assert whitelist.count == 1
+    assert whitelist.match("docs.google.com") == "google.com"
+    assert whitelist.match("evil.github.io") is None
+    assert "github.io" in suffixes
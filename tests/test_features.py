@@ -0,0 +1,64 @@
+import math
+from collections import Counter
+from urllib.parse import urlparse
+
+import numpy as np
+import pytest
+
+from features import FEATURE_COLUMNS, FEATURE_DTYPES, extract_features, extract_features_batch
+
+URLS = [
+    "",
+    "example.com/path",                              # No scheme
+    "https://user:pw@Example.com:8443/a/b?q=1#f",    # Userinfo, port, query, fragment
+    "http://[2001:db8::1]:80/x",                     # IPv6 literal
+    "https://bücher.example/straße",                 # Unicode
+    "http://gcash-verify-account.xyz/login.php?id=1",
+    "HTTPS://WWW.GOOGLE.COM/",
+    "mailto:someone@example.com",
+    "http://192.168.0.1/paypal/secure-update",
+]
+
+def reference_entropy(url):
+    if not url:
+        return 0.0
+    return -sum(c / len(url) * math.log2(c / len(url)) for c in Counter(url).values())
+
+def test_single_and_batch_paths_are_identical():
+    batch = extract_features_batch(URLS)
+    assert list(batch.columns) == FEATURE_COLUMNS
+    assert batch.dtypes.astype(str).to_dict() == FEATURE_DTYPES
+    for i, url in enumerate(URLS):
+        single = extract_features(url)
+        assert list(single) == FEATURE_COLUMNS
+        for col in FEATURE_COLUMNS:
+            assert single[col] == batch[col].iloc[i], (url, col) # Bit-identical, entropy included
+
+def test_batch_values_do_not_depend_on_neighbours():
+    alone = [extract_features_batch([u]).iloc[0].tolist() for u in URLS]
+    together = extract_features_batch(URLS * 3).iloc[:len(URLS)].values.tolist()
+    assert alone == together
+
+@pytest.mark.parametrize("url", URLS)
+def test_parts_match_urlparse(url):
+    lowered = url.lower()
+    parsed = urlparse(lowered if "://" in lowered or lowered.startswith("mailto:") else "http://" + lowered)
+    features = extract_features(url)
+    assert features['url_len'] == len(url)
+    assert features['hostname_len'] == len(parsed.netloc)
+    assert features['path_len'] == len(parsed.path)
+    assert features['entropy'] == pytest.approx(reference_entropy(lowered), abs=1e-6)
+
+def test_known_values():
+    assert extract_features("") == dict.fromkeys(FEATURE_COLUMNS, 0)
+    assert extract_features("example.com/path") == {
+        'url_len': 16, 'hostname_len': 11, 'path_len': 5, 'entropy': 3.5, 'count_dots': 1, 'count_dashes': 0,
+        'count_at': 0, 'count_qmark': 0, 'count_digits': 0, 'sus_word_count': 0, 'is_bad_tld': 0,
+        'is_https': 0, 'is_impersonating': 0}
+    features = extract_features("https://user:pw@Example.com:8443/a/b?q=1#f")
+    assert (features['hostname_len'], features['path_len'], features['count_at'], features['count_qmark'],
+            features['count_digits'], features['is_https']) == (24, 4, 1, 1, 5, 1)
+    features = extract_features("http://gcash-verify-account.xyz/login.php?id=1")
+    assert features['is_bad_tld'] == 1
+    assert features['sus_word_count'] >= 2
+    assert np.float32(features['entropy']) == features['entropy']
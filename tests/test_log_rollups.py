@@ -0,0 +1,16 @@
+import sqlite3
+
+import log_rollups
+
+NOW = 1_800_000_000
+
+def test_stats_series_is_zero_filled_per_status():
+    conn = sqlite3.connect(":memory:")
+    log_rollups.ensure_schema(conn)
+    log_rollups.apply(conn, [("http://bad.example/x", "DANGER", "", NOW)])
+
+    result = log_rollups.stats(conn, period='minute', buckets=3, now=NOW)
+    assert result['totals'] == {'SAFE': 0, 'DANGER': 1}
+    assert [{k: v for k, v in row.items() if k != 'bucket'} for row in result['series']] == [
+        {'SAFE': 0, 'DANGER': 0}, {'SAFE': 0, 'DANGER': 0}, {'SAFE': 0, 'DANGER': 1}]
+    assert result['top_flagged_domains'] == [{'domain': 'bad.example', 'count': 1}]
@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+import time
+
+import log_rollups
+import log_sink
+from log_sink import LogSink
+
+THREADS = 8
+PER_THREAD = 2000
+
+def test_every_row_is_written_or_counted_as_dropped(tmp_path):
+    sink = LogSink(str(tmp_path / "threats.db"), max_queue=16, batch_size=8, compact_interval=0)
+
+    def spam():
+        for i in range(PER_THREAD):
+            sink.log(f"http://example.org/{i}", "SAFE")
+
+    threads = [threading.Thread(target=spam) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sink.close(timeout=30)
+
+    stats = sink.stats()
+    assert stats['dropped'] > 0
+    assert stats['written'] + stats['dropped'] == THREADS * PER_THREAD
+    with sqlite3.connect(str(tmp_path / "threats.db")) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] == stats['written']
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+def test_migration_waits_out_a_locked_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_sink, "RETRY_DELAY", 0.05)
+    db = str(tmp_path / "threats.db")
+    holder = sqlite3.connect(db, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE") # Another process mid-migration
+    sink = LogSink(db, busy_timeout=0.05, compact_interval=0, flush_interval=0.05)
+    try:
+        assert sink.log("http://example.org/", "SAFE")
+        wait_for(lambda: sink.errors >= 2)
+        assert sink.stats()['writer_alive'] and sink.written == 0
+        holder.execute("ROLLBACK")
+        wait_for(lambda: sink.written == 1)
+    finally:
+        holder.close()
+        sink.close()
+
+def test_dead_writer_is_reported_and_close_does_not_hang(tmp_path, monkeypatch):
+    release = threading.Event()
+    def broken_connect(self):
+        release.wait()
+        raise RuntimeError("disk on fire")
+    monkeypatch.setattr(LogSink, "_connect", broken_connect)
+    sink = LogSink(str(tmp_path / "threats.db"), max_queue=2, compact_interval=0)
+    assert sink.log("http://a.example/", "SAFE") and sink.log("http://b.example/", "SAFE")
+    release.set()
+    wait_for(lambda: not sink.alive)
+
+    assert not sink.log("http://c.example/", "SAFE")
+    stats = sink.stats()
+    assert stats['writer_alive'] is False
+    assert stats['last_error'] == "disk on fire"
+    assert stats['dropped'] == 3 # Two stranded in the queue, one refused
+    started = time.monotonic()
+    sink.close(timeout=1)
+    assert time.monotonic() - started < 1
+
+def test_compaction_runs_beside_the_writer(tmp_path):
+    db = str(tmp_path / "threats.db")
+    with sqlite3.connect(db) as conn:
+        log_rollups.ensure_schema(conn)
+        old = int(time.time()) - 40 * 86400
+        conn.executemany("INSERT INTO logs (content, status, date, ts) VALUES (?, ?, ?, ?)",
+                         [(f"http://old.example/{i}", "SAFE", "", old) for i in range(log_rollups.DELETE_CHUNK + 10)])
+    sink = LogSink(db, compact_interval=3600, compact_delay=0, flush_interval=0.05)
+    try:
+        for i in range(100):
+            sink.log(f"http://new.example/{i}", "DANGER")
+        wait_for(lambda: sink.written == 100)
+        with sqlite3.connect(db) as conn:
+            wait_for(lambda: conn.execute("SELECT COUNT(*) FROM logs WHERE ts < ?", (old + 1,)).fetchone()[0] == 0)
+            assert conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] == 100
+    finally:
+        sink.close()
+    assert sink.stats()['errors'] == 0
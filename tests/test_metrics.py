@@ -0,0 +1,13 @@
+from metrics import Registry
+
+def test_counter_kept_elsewhere_renders_as_counter():
+    shed = {'n': 0}
+    registry = Registry()
+    registry.register('counter', "demo_shed_total", "Things shed", lambda: shed['n'])
+    owned = registry.counter("demo_owned_total", "Things counted here")
+    shed['n'] = 3
+    owned.inc(2)
+
+    text = registry.render()
+    assert "# TYPE demo_shed_total counter\ndemo_shed_total 3\n" in text
+    assert "# TYPE demo_owned_total counter\ndemo_owned_total 2\n" in text
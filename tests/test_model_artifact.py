@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import model_artifact
+from features import FEATURE_COLUMNS
+from test_compiled_forest import feature_rows
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = feature_rows(n=200)
+    return RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y), X.to_numpy(dtype=np.float32)
+
+@pytest.fixture
+def saved(tmp_path, forest):
+    model, _ = forest
+    info = model_artifact.save_artifact(model, FEATURE_COLUMNS, 2, models_dir=str(tmp_path))
+    return str(tmp_path), info
+
+def test_predicts_in_chunks_without_unpickling(saved, forest, monkeypatch):
+    models_dir, info = saved
+    model, X = forest
+    assert info['kind'] == 'compiled_forest'
+    assert model_artifact.ESTIMATOR_FILE in info['payload']
+
+    monkeypatch.setattr(model_artifact.joblib, "load", lambda path: pytest.fail(f"unpickled {path}"))
+    loaded = model_artifact.load_artifact(models_dir)
+    assert loaded.model is None
+    expected = model.predict(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+    np.testing.assert_array_equal(loaded.predict(X[:4], 8), expected[:4])
+    np.testing.assert_array_equal(loaded.predict(X, 7), expected) # 29 chunks, the last one partial
+
+def test_load_estimator_reads_back_the_fitted_model(saved, forest):
+    models_dir, _ = saved
+    model, X = forest
+    frame = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    np.testing.assert_array_equal(model_artifact.load_estimator(models_dir).predict(frame), model.predict(frame))
+
+def test_checksum_covers_estimator(saved):
+    models_dir, info = saved
+    with open(os.path.join(models_dir, info['version'], model_artifact.ESTIMATOR_FILE), "ab") as f:
+        f.write(b"tampered")
+    with pytest.raises(ValueError, match="Checksum"):
+        model_artifact.load_artifact(models_dir)
+
+def test_verify_is_cached_by_file_signature(saved, monkeypatch):
+    models_dir, _ = saved
+    model_artifact.load_artifact(models_dir)
+    calls = []
+    monkeypatch.setattr(model_artifact, "_sha256", lambda paths: calls.append(paths))
+    model_artifact.load_artifact(models_dir)
+    assert calls == []
+
+def test_legacy_compiled_artifact_stays_on_compiled_forest(saved, forest):
+    models_dir, info = saved
+    _, X = forest
+    version_dir = os.path.join(models_dir, info['version'])
+    os.remove(os.path.join(version_dir, model_artifact.ESTIMATOR_FILE))
+    os.remove(os.path.join(version_dir, "nan_left.npy"))
+    for key in ('payload', 'arrays'):
+        del info[key]
+    info['sha256'] = model_artifact._sha256(
+        [os.path.join(version_dir, f"{name}.npy") for name in model_artifact.LEGACY_ARRAYS])
+    with open(os.path.join(version_dir, model_artifact.METADATA_FILE), "w") as f:
+        json.dump(info, f)
+
+    loaded = model_artifact.load_artifact(models_dir)
+    assert loaded.model is None
+    assert len(loaded.predict(X, 8)) == len(X)
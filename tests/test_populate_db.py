@@ -0,0 +1,44 @@
+import sqlite3
+
+import populate_db
+from url_index import KnownURLIndex
+
+def write_csv(path, rows, header="URL,Label"):
+    path.write_text(header + "\n" + "".join(f"{url},{label}\n" for url, label in rows))
+    return str(path)
+
+def samples(db):
+    with sqlite3.connect(db) as conn:
+        return conn.execute("SELECT content, status FROM training_samples ORDER BY rowid").fetchall()
+
+def test_incremental_ingest_maps_labels_and_dedupes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # known_urls.bin is written next to the database
+    db = str(tmp_path / "threats.db")
+    first = write_csv(tmp_path / "a.csv", [("http://a.example/", "0"), ("http://b.example/", "1"),
+                                           ("http://c.example/", "Phishing"), ("http://d.example/", " verified "),
+                                           ("http://e.example/", "legitimate"), ("http://a.example/", "1")])
+    assert populate_db.incremental_ingest([], [first], db_name=db, chunk_size=2) == 5
+    assert samples(db) == [("http://a.example/", "phishing"), ("http://b.example/", "legitimate"),
+                           ("http://c.example/", "phishing"), ("http://d.example/", "phishing"),
+                           ("http://e.example/", "legitimate")]
+
+    # Known URLs keep their first label; a forced label only applies to new rows
+    second = write_csv(tmp_path / "b.csv", [("http://b.example/", ""), ("http://f.example/", "")], header="url,other")
+    assert populate_db.incremental_ingest([], [second], csv_label="phishing", db_name=db) == 1
+    assert samples(db)[1:] == [("http://b.example/", "legitimate"), ("http://c.example/", "phishing"),
+                               ("http://d.example/", "phishing"), ("http://e.example/", "legitimate"),
+                               ("http://f.example/", "phishing")]
+    assert populate_db.incremental_ingest([], [first, second], csv_label="phishing", db_name=db) == 0
+
+    index = KnownURLIndex.load(populate_db.URL_INDEX_FILE)
+    assert (len(index), index.max_rowid) == (6, 6)
+    assert index.lookup("http://f.example/") == 0
+
+def test_ensure_schema_removes_old_duplicates(tmp_path):
+    db = str(tmp_path / "threats.db")
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE training_samples (content TEXT, status TEXT)")
+        conn.executemany("INSERT INTO training_samples VALUES (?, ?)",
+                         [("http://a.example/", "phishing"), ("http://a.example/", "legitimate")])
+        populate_db.ensure_schema(conn)
+    assert samples(db) == [("http://a.example/", "phishing")]
@@ -0,0 +1,41 @@
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+import serve
+from features import FEATURE_COLUMNS
+from model_artifact import save_artifact
+from test_compiled_forest import feature_rows
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    X, y = feature_rows(n=200)
+    save_artifact(RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y), FEATURE_COLUMNS, 2,
+                  models_dir=str(tmp_path / "models"))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(serve, "MODEL_DIR", "models")
+    monkeypatch.setattr(serve, "SERVE_WORKERS", 1)
+    monkeypatch.setattr(serve, "LOG_REQUESTS", False)
+    monkeypatch.setattr(serve, "pool", None)
+    with TestClient(serve.app) as c: # Runs the startup hook, like `uvicorn serve:app`
+        yield c
+
+def test_startup_hook_starts_pool_and_bloom_without_publish(client):
+    response = client.get("/whitelist_bloom")
+    assert response.status_code == 200
+    assert response.content.startswith(b"PHBLOOM")
+    assert client.post("/predict", json={'url': "http://gcash-login.xyz/verify"}).json()['result'] in ("SAFE", "DANGER")
+
+def test_reload_pool_does_not_fork_a_threaded_process(client, monkeypatch):
+    contexts = []
+    real = serve.ProcessPoolExecutor
+    def spy(*args, mp_context=None, **kwargs):
+        contexts.append(mp_context.get_start_method())
+        return real(*args, mp_context=mp_context, **kwargs)
+    monkeypatch.setattr(serve, "ProcessPoolExecutor", spy)
+
+    serve.publish(serve.start_pool()) # The server's threads are running now, as on a hot reload
+    assert contexts == [serve.RELOAD_START_METHOD]
+    assert client.post("/predict_batch", json={'urls': ["http://a.example/login"]}).status_code == 200
@@ -0,0 +1,77 @@
+import sqlite3
+
+import numpy as np
+
+import feature_store
+import train_model
+from features import extract_features_batch
+
+URLS = [("https://www.google.com/", "legitimate"), ("http://gcash-login.xyz/verify", "phishing"),
+        ("https://docs.python.org/3/", "safe"), ("http://bdo-online.top/signin", "danger"),
+        ("http://unlabelled.example/", "unknown")]
+
+def make_db(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE training_samples (content TEXT, status TEXT)")
+        conn.executemany("INSERT INTO training_samples VALUES (?, ?)", URLS)
+
+def stored_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {feature_store.TABLE}").fetchone()[0]
+
+def test_in_memory_path_fills_and_reuses_feature_store(tmp_path, monkeypatch):
+    db = str(tmp_path / "threats.db")
+    make_db(db)
+    expected = extract_features_batch([u for u, _ in URLS[:4]]).to_numpy(dtype=np.float32)
+
+    X, y = train_model.load_in_memory(db)
+    np.testing.assert_array_equal(X, expected)
+    np.testing.assert_array_equal(y, [1, 0, 1, 0])
+    assert stored_rows(db) == 4
+
+    # Second run: nothing left to extract
+    def fail(urls):
+        raise AssertionError(f"re-extracted {urls}")
+    monkeypatch.setattr(feature_store, "extract_features_batch", fail)
+    X2, _ = train_model.load_in_memory(db)
+    np.testing.assert_array_equal(X2, expected)
+
+def test_in_memory_path_without_store(tmp_path):
+    db = str(tmp_path / "threats.db")
+    make_db(db)
+    X, _ = train_model.load_in_memory(db, use_store=False)
+    assert len(X) == 4
+    with sqlite3.connect(db) as conn:
+        assert not conn.execute("SELECT name FROM sqlite_master WHERE name = ?", (feature_store.TABLE,)).fetchall()
+
+def test_select_model_returns_the_chosen_candidate(capsys):
+    from test_compiled_forest import feature_rows
+    X, y = feature_rows(n=300)
+    model, acc, report = train_model.select_model(X.to_numpy(dtype=np.float32), y, [5, 10], [4, None])
+
+    chosen = next(r for r in report['candidates'] if r['name'] == report['selected'])
+    assert len(report['candidates']) == 4
+    assert acc == chosen['accuracy']
+    assert (model.n_estimators, model.max_depth) == (chosen['params']['n_estimators'], chosen['params']['max_depth'])
+    assert len(model.estimators_) == model.n_estimators # Fitted, read back from its artifact
+
+def test_parallel_store_matches_serial_on_rowid_gaps(tmp_path):
+    rows = [(f"{url}page/{i}", status) for i in range(12) for url, status in URLS]
+    db = str(tmp_path / "threats.db")
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE training_samples (content TEXT, status TEXT)")
+        conn.executemany("INSERT INTO training_samples VALUES (?, ?)", rows)
+        conn.execute("DELETE FROM training_samples WHERE rowid % 3 = 0 OR rowid BETWEEN 20 AND 31")
+        kept = conn.execute("SELECT content, status FROM training_samples ORDER BY rowid").fetchall()
+    labelled = [(u, s) for u, s in kept if s != "unknown"]
+    expected_X = extract_features_batch([u for u, _ in labelled]).to_numpy(dtype=np.float32)
+    expected_y = train_model.map_labels([s for _, s in labelled])
+
+    for use_store in (False, True):
+        serial = train_model.build_feature_store(db, 7, str(tmp_path / "x1.npy"), str(tmp_path / "y1.npy"),
+                                                 use_store=use_store, workers=1)
+        parallel = train_model.build_feature_store(db, 7, str(tmp_path / "x2.npy"), str(tmp_path / "y2.npy"),
+                                                   use_store=use_store, workers=2)
+        for X, y in (serial, parallel):
+            np.testing.assert_array_equal(X, expected_X)
+            np.testing.assert_array_equal(y, expected_y)
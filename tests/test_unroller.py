@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from unroller import RedirectUnroller
+
+# path -> (status, Location) served by the local stand-in for a shortener
+ROUTES = {
+    '/a': (302, '/b'),
+    '/b': (301, 'c'),         # Relative Location
+    '/c': (200, None),
+    '/loop1': (302, '/loop2'),
+    '/loop2': (307, '/loop1'),
+    '/gone': (302, 'http://127.0.0.1:9/unreachable'),
+}
+SLOW_SECONDS = 1.0
+
+class Handler(BaseHTTPRequestHandler):
+    hits = Counter()
+
+    def do_HEAD(self):
+        Handler.hits[self.path] += 1
+        if self.path == '/slow':
+            time.sleep(SLOW_SECONDS)
+        status, location = ROUTES.get(self.path, (200, None))
+        if self.path.startswith('/to/'): # A different destination host per link
+            status, location = 302, 'http://127.0.0.%s:9/' % self.path[4:]
+        self.send_response(status)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def base():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+@pytest.fixture
+def unroller():
+    Handler.hits.clear()
+    u = RedirectUnroller(max_workers=4, max_pending=8, max_hops=5, deadline=0.5)
+    yield u
+    u.close()
+
+def test_follows_hop_chain(base, unroller):
+    assert unroller.resolve(base + '/a', wait=2) == (base + '/c', True)
+
+def test_cache_hit_skips_network(base, unroller):
+    unroller.resolve(base + '/a', wait=2)
+    hits = sum(Handler.hits.values())
+    assert unroller.resolve(base + '/a', wait=2) == (base + '/c', True)
+    assert sum(Handler.hits.values()) == hits
+
+def test_redirect_loop_is_incomplete_and_not_cached(base, unroller):
+    final, ok = unroller.resolve(base + '/loop1', wait=2)
+    assert not ok
+    assert final in (base + '/loop1', base + '/loop2')
+    assert unroller.cache.get(base + '/loop1') is None
+
+def test_slow_host_gives_up_after_wait(base, unroller):
+    started = time.monotonic()
+    assert unroller.resolve(base + '/slow', wait=0.1) == (base + '/slow', False)
+    assert time.monotonic() - started < SLOW_SECONDS
+    assert unroller.cache.get(base + '/slow') is None
+
+def test_unreachable_destination_keeps_last_location(base, unroller):
+    final, ok = unroller.resolve(base + '/gone', wait=2)
+    assert (final, ok) == ('http://127.0.0.1:9/unreachable', True)
+    assert unroller.failures == 1
+
+def test_sheds_load_beyond_max_pending(base):
+    Handler.hits.clear()
+    u = RedirectUnroller(max_workers=1, max_pending=1, deadline=SLOW_SECONDS * 2)
+    try:
+        u.submit(base + '/slow')
+        assert u.resolve(base + '/c', wait=0) == (base + '/c', False)
+        assert u.shed == 1
+    finally:
+        u.close()
+
+def test_only_shortener_hosts_get_their_own_session(base):
+    u = RedirectUnroller(max_workers=4, max_pending=64, deadline=0.5, is_shortener=lambda host: host == '127.0.0.1')
+    try:
+        results = u.resolve_many([base + '/to/%d' % i for i in range(2, 42)], wait=5)
+        assert all(ok for _, ok in results.values())
+        assert u.stats()['pooled_hosts'] == 1 # Forty destinations, one shortener
+    finally:
+        u.close()
@@ -0,0 +1,40 @@
+import os
+import zipfile
+
+import pytest
+
+import update_whitelist
+from domain_index import DomainIndex
+
+def write_tranco_zip(path, domains):
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("top-1m.csv", "".join(f"{i},{d}\n" for i, d in enumerate(domains, 1)))
+
+def test_builds_index_from_local_zip(tmp_path):
+    zip_path, output = tmp_path / "top.zip", tmp_path / "whitelist.bin"
+    write_tranco_zip(zip_path, ["example.org", "WWW.Wikipedia.org", "cut.example", "beyond-top.example"])
+
+    index = update_whitelist.update_whitelist(str(zip_path), str(output), top_n=3)
+
+    loaded = DomainIndex.load(str(output))
+    assert len(loaded) == len(index)
+    assert "en.wikipedia.org" in loaded
+    assert "cut.example" in loaded
+    assert "beyond-top.example" not in loaded
+    assert "gcash.com" in loaded # Manual list
+
+def test_failed_fetch_leaves_existing_index(tmp_path):
+    output = tmp_path / "whitelist.bin"
+    DomainIndex.from_domains(["keep.example"]).save(str(output))
+    before = output.read_bytes()
+
+    with pytest.raises(update_whitelist.WhitelistError):
+        update_whitelist.update_whitelist(str(tmp_path / "missing.zip"), str(output))
+    assert output.read_bytes() == before
+
+def test_empty_list_is_an_error(tmp_path):
+    zip_path, output = tmp_path / "top.zip", tmp_path / "whitelist.bin"
+    write_tranco_zip(zip_path, [])
+    with pytest.raises(update_whitelist.WhitelistError):
+        update_whitelist.update_whitelist(str(zip_path), str(output))
+    assert not os.path.exists(output)
@@ -0,0 +1,56 @@
+import os
+import sqlite3
+
+import url_index
+from url_index import KnownURLIndex, update_index
+
+def make_db(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS training_samples (content TEXT, status TEXT)")
+        conn.executemany("INSERT INTO training_samples VALUES (?, ?)", rows)
+
+def test_update_advances_watermark_and_reads_only_new_rows(tmp_path, monkeypatch):
+    db, path = str(tmp_path / "threats.db"), str(tmp_path / "known_urls.bin")
+    make_db(db, [("http://a.example/", "phishing"), ("http://b.example/", "legitimate"), ("http://x.example/", "unknown")])
+    index = update_index(db, path)
+    assert (len(index), index.max_rowid) == (2, 3) # Unlabelled rows still move the watermark
+    assert KnownURLIndex.load(path).lookup("http://b.example/") == 1
+
+    make_db(db, [("http://c.example/", "danger")])
+    seen = []
+    read_rows = KnownURLIndex.read_rows
+    def spy(conn, after_rowid=0, chunk_size=url_index.CHUNK_SIZE):
+        seen.append(after_rowid)
+        return read_rows(conn, after_rowid, chunk_size)
+    monkeypatch.setattr(KnownURLIndex, "read_rows", staticmethod(spy))
+    index = update_index(db, path)
+    assert seen == [3]
+    assert (len(index), index.max_rowid) == (3, 4)
+    loaded = KnownURLIndex.load(path)
+    assert [loaded.lookup(u) for u in ("http://a.example/", "http://c.example/", "http://nope.example/")] == [0, 0, None]
+
+    # Nothing new: the file is left alone
+    mtime = os.stat(path).st_mtime_ns
+    update_index(db, path)
+    assert os.stat(path).st_mtime_ns == mtime
+
+def test_conflicting_labels_resolve_to_phishing(tmp_path):
+    db, path = str(tmp_path / "threats.db"), str(tmp_path / "known_urls.bin")
+    make_db(db, [("http://both.example/", "legitimate"), ("http://ok.example/", "safe")])
+    update_index(db, path)
+    make_db(db, [("http://both.example/", "0")]) # Same URL, later row says phishing
+    index = update_index(db, path)
+    assert len(index) == 2
+    assert list(index.lookup_many(["http://both.example/", "http://ok.example/", "http://nope.example/"])) == [0, 1, -1]
+
+def test_rebuilt_table_triggers_full_rebuild(tmp_path):
+    db, path = str(tmp_path / "threats.db"), str(tmp_path / "known_urls.bin")
+    make_db(db, [(f"http://old{i}.example/", "phishing") for i in range(5)])
+    assert update_index(db, path).max_rowid == 5
+
+    os.remove(db) # populate_db's full rewrite reassigns rowids from 1
+    make_db(db, [("http://new.example/", "legitimate")])
+    index = update_index(db, path)
+    assert (len(index), index.max_rowid) == (1, 1)
+    assert index.lookup("http://old0.example/") is None
+    assert KnownURLIndex.load(path).lookup("http://new.example/") == 1
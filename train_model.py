@@ -1,91 +1,326 @@
+import os
+import json
+import shutil
 import sqlite3
+import argparse
+import tempfile
+from time import perf_counter
+from multiprocessing import Pool
+import numpy as np
 import pandas as pd
 import joblib
-import math
 import gc  # <--- Garbage Collector (Frees RAM)
-from collections import Counter
-from urllib.parse import urlparse
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
+from features import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, extract_features_batch
+import feature_store
+from model_artifact import MODELS_DIR, save_artifact, load_artifact, load_estimator
+from config import COMPILED_CHUNK_ROWS # Same chunking as the servers
 
 # --- CONFIGURATION ---
 DB_PATH = "threats.db"
 MODEL_FILE = "phiusiil_model.pkl"
+CHUNK_SIZE = 100000                  # Rows per cursor fetch / worker task in --stream mode
+WORKERS = 1                          # Extraction processes in --stream mode (--workers)
+FEATURE_STORE = "train_features.npy" # Memory-mapped float32 feature matrix (--stream)
+LABEL_STORE = "train_labels.npy"     # Matching int8 labels
+LABEL_MAP = {'legitimate': 1, 'safe': 1, '1': 1, 'phishing': 0, 'danger': 0, '0': 0}
 
-def calculate_entropy(text):
-    if not text: return 0
-    entropy = 0
-    total = len(text)
-    for count in Counter(text).values():
-        p = count / total
-        entropy -= p * math.log2(p)
-    return entropy
-
-def extract_features(df):
-    print("   🧪 Extracting Features (Optimized)...")
-    df['url'] = df['content'].astype(str)
-    
-    # Use smaller data types to save RAM
-    df['url_len'] = df['url'].apply(len).astype('int32')
-    df['hostname_len'] = df['url'].apply(lambda x: len(urlparse(x).netloc) if urlparse(x).netloc else 0).astype('int32')
-    df['entropy'] = df['url'].apply(calculate_entropy).astype('float32')
-    df['count_dots'] = df['url'].apply(lambda x: x.count('.')).astype('int16')
-    df['count_dashes'] = df['url'].apply(lambda x: x.count('-')).astype('int16')
-    df['count_at'] = df['url'].apply(lambda x: x.count('@')).astype('int16')
-    df['count_digits'] = df['url'].apply(lambda x: sum(c.isdigit() for c in x)).astype('int16')
-    
-    sus_keywords = ['login', 'verify', 'update', 'account', 'secure', 'banking']
-    df['sus_word_count'] = df['url'].apply(lambda x: sum(1 for w in sus_keywords if w in x.lower())).astype('int8')
-    
-    bad_tlds = ['.xyz', '.top', '.club', '.info', '.site', '.cn']
-    df['is_bad_tld'] = df['url'].apply(lambda x: 1 if any(tld in x.lower() for tld in bad_tlds) else 0).astype('int8')
-    
-    df['is_https'] = df['url'].apply(lambda x: 1 if x.startswith('https') else 0).astype('int8')
-    
-    return df
+# --select: candidate grid and how they are judged
+SELECT_TREES = "25,50,100"
+SELECT_DEPTHS = "12,20,none"
+ACCURACY_BUDGET = 0.005   # Accept models at most this far below the most accurate one
+SINGLE_ROW_SAMPLES = 200  # Timed one-row predictions per candidate (the /predict path)
+BATCH_ROWS = 500          # Rows per timed batch (one page scan, app.MAX_BATCH_URLS)
+BATCH_REPEATS = 5
+SELECTION_REPORT = "selection_report.json" # Written into the chosen model's version directory
 
-if __name__ == "__main__":
+def map_labels(status):
+    """1 = safe, 0 = phishing, NaN = unknown (dropped)."""
+    return pd.Series(status, dtype=object).astype(str).str.lower().str.strip().map(LABEL_MAP).to_numpy(dtype=np.float64)
+
+def extract_features(conn, urls, use_store=True):
+    """
+    Feature matrix for `urls`. With `use_store`, rows already in the
+    url_features table at the current schema version are reused and newly
+    extracted ones are saved for the next run (same as --stream).
+    """
+    if not use_store:
+        print("   🧪 Extracting Features (Vectorized)...")
+        return extract_features_batch(urls).to_numpy(dtype=np.float32)
+    feature_store.ensure_table(conn)
+    X, new_hashes, new_rows = feature_store.resolve(conn, urls)
+    print(f"   🧪 {len(urls)} rows ready ({len(new_hashes)} extracted, {len(urls) - len(new_hashes)} from store)")
+    if len(new_hashes):
+        feature_store.upsert(conn, new_hashes, new_rows)
+        conn.commit()
+    return X
+
+# --- DATA LOADING ---
+def load_in_memory(db_path=DB_PATH, use_store=True):
+    """Original path: the whole table in one DataFrame."""
     print("🧠 Loading Data...")
-    conn = sqlite3.connect(DB_PATH)
-    # Load in chunks if needed, but for 1M rows, standard load is okay if we clean up
-    df = pd.read_sql("SELECT content, status FROM training_samples", conn)
-    conn.close()
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_wal(conn)
+        df = pd.read_sql("SELECT content, status FROM training_samples", conn)
 
-    # --- LABEL MAPPING ---
-    df['status'] = df['status'].astype(str).str.lower().str.strip()
-    label_map = {'legitimate': 1, 'safe': 1, '1': 1, 'phishing': 0, 'danger': 0, '0': 0}
-    df['target'] = df['status'].map(label_map)
-    df = df.dropna(subset=['target'])
-    
-    # Free up memory
-    del label_map
-    gc.collect()
+        # --- LABEL MAPPING ---
+        df['target'] = map_labels(df['status'])
+        df = df.dropna(subset=['target'])
 
-    # --- EXTRACT ---
-    df = extract_features(df)
-    
-    feature_cols = ['url_len', 'hostname_len', 'entropy', 'count_dots', 'count_dashes', 
-                    'count_at', 'count_digits', 'sus_word_count', 'is_bad_tld', 'is_https']
-    
-    X = df[feature_cols]
-    y = df['target']
+        # --- EXTRACT ---
+        X = extract_features(conn, [str(u) for u in df['content']], use_store)
+        y = df['target'].to_numpy(dtype=np.int8)
+    finally:
+        conn.close()
 
     # Free up the big DataFrame before training
     del df
     gc.collect()
-    print("   🧹 RAM Cleaned. Starting Training...")
+    return X, y
+
+def row_ranges(conn, chunk_size):
+    """
+    Splits training_samples into inclusive (first_rowid, last_rowid) ranges
+    of `chunk_size` rows each.
+    """
+    ranges = []
+    first = conn.execute("SELECT MIN(rowid) FROM training_samples").fetchone()[0]
+    while first is not None:
+        last = conn.execute("SELECT rowid FROM training_samples WHERE rowid >= ? ORDER BY rowid LIMIT 1 OFFSET ?",
+                            (first, chunk_size - 1)).fetchone()
+        if last is None:
+            last = conn.execute("SELECT MAX(rowid) FROM training_samples").fetchone()
+            ranges.append((first, last[0]))
+            break
+        ranges.append((first, last[0]))
+        first = conn.execute("SELECT MIN(rowid) FROM training_samples WHERE rowid > ?", (last[0],)).fetchone()[0]
+    return ranges
+
+def process_range(task):
+    """
+    Worker: reads ONE rowid range straight from SQLite (read-only) and returns
+    typed arrays: (X float32, y int8, new_hashes int64, new_rows float32).
+    The same function runs in-process for the serial path, so both paths
+    produce identical matrices.
+    """
+    db_path, first, last, use_store = task
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT content, status FROM training_samples WHERE rowid BETWEEN ? AND ? ORDER BY rowid",
+                            (first, last)).fetchall()
+        if not rows:
+            return (np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32), np.zeros(0, dtype=np.int8),
+                    np.zeros(0, dtype=np.int64), np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32))
+        urls, status = zip(*rows)
+        labels = map_labels(status)
+        keep = ~np.isnan(labels)
+        urls = [str(u) for u, k in zip(urls, keep) if k]
+
+        if use_store:
+            X, new_hashes, new_rows = feature_store.resolve(conn, urls)
+        else:
+            X = extract_features_batch(urls).to_numpy(dtype=np.float32)
+            new_hashes, new_rows = np.zeros(0, dtype=np.int64), X[:0]
+        return X, labels[keep].astype(np.int8), new_hashes, new_rows
+    finally:
+        conn.close()
+
+def build_feature_store(db_path=DB_PATH, chunk_size=CHUNK_SIZE, features_path=FEATURE_STORE, labels_path=LABEL_STORE,
+                        use_store=True, workers=WORKERS):
+    """
+    Streams training_samples `chunk_size` rows at a time and puts features
+    straight into memory-mapped .npy files. Only a few chunks of URL strings
+    are ever alive, so peak RAM is chunks + feature matrix.
+
+    With `use_store`, features already saved in the url_features table at the
+    current schema version are reused; only new or stale URLs are extracted.
+    With `workers` > 1, rowid ranges are extracted by a process pool; results
+    come back in range order and only this process writes to the database.
+    """
+    conn = sqlite3.connect(db_path)
+    ensure_wal(conn) # Readers in worker processes never block our writes
+    if use_store:
+        feature_store.ensure_table(conn)
+        conn.commit()
+    total = conn.execute("SELECT COUNT(*) FROM training_samples").fetchone()[0]
+    ranges = row_ranges(conn, chunk_size)
+    print(f"🧠 Streaming {total} rows in {len(ranges)} chunks of {chunk_size} ({workers} worker(s))...")
+
+    X = np.lib.format.open_memmap(features_path, mode="w+", dtype=np.float32, shape=(total, len(FEATURE_COLUMNS)))
+    y = np.lib.format.open_memmap(labels_path, mode="w+", dtype=np.int8, shape=(total,))
 
-    # --- TRAINING ---
+    tasks = [(db_path, first, last, use_store) for first, last in ranges]
+    pool = Pool(workers) if workers > 1 else None
+    results = pool.imap(process_range, tasks) if pool else map(process_range, tasks)
+
+    n = 0
+    extracted = 0
+    try:
+        for chunk, labels, new_hashes, new_rows in results:
+            X[n:n + len(chunk)] = chunk
+            y[n:n + len(chunk)] = labels
+            n += len(chunk)
+            if len(new_hashes):
+                feature_store.upsert(conn, new_hashes, new_rows)
+                conn.commit()
+            extracted += len(new_hashes) if use_store else len(chunk)
+            print(f"   🧪 {n}/{total} rows ready ({extracted} extracted, {n - extracted} from store)", end="\r")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    conn.close()
+    print()
+
+    X.flush()
+    y.flush()
+    return X[:n], y[:n]
+
+def ensure_wal(conn):
+    # WAL lets the servers' log writer and this job use threats.db side by side
+    conn.execute("PRAGMA journal_mode=WAL")
+
+# --- TRAINING ---
+def train(X, y):
+    print("   🧹 Starting Training...")
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Reduced n_estimators to 100 (Faster, Less RAM)
     # Reduced n_jobs to 4 (Prevents crashing)
     model = RandomForestClassifier(n_estimators=100, n_jobs=4, random_state=42)
-    model.fit(X_train, y_train)
+    model.fit(pd.DataFrame(X_train, columns=FEATURE_COLUMNS), y_train)
     
-    acc = accuracy_score(y_test, model.predict(X_test))
+    acc = accuracy_score(y_test, model.predict(pd.DataFrame(X_test, columns=FEATURE_COLUMNS)))
     print(f"🚀 ACCURACY: {acc*100:.2f}%")
+    return model, acc
+
+# --- MODEL SELECTION (--select) ---
+def candidates(trees, depths, include_hgb):
+    for n in trees:
+        for depth in depths:
+            name = f"rf-{n}-{'full' if depth is None else depth}"
+            yield name, RandomForestClassifier(n_estimators=n, max_depth=depth, n_jobs=4, random_state=42)
+    if include_hgb:
+        yield "hgb", HistGradientBoostingClassifier(random_state=42)
+
+def serving_latency(loaded, X_test):
+    """
+    Times the artifact exactly as app.py would load it (memory-mapped compiled
+    forest, or the joblib estimator): p50/p95 of single-row calls and the
+    median of BATCH_ROWS-row calls, in milliseconds.
+    """
+    rows = X_test[:SINGLE_ROW_SAMPLES]
+    single = []
+    for i in range(len(rows)):
+        started = perf_counter()
+        loaded.predict(rows[i:i + 1], COMPILED_CHUNK_ROWS)
+        single.append(perf_counter() - started)
+    batch_X = np.resize(X_test, (BATCH_ROWS, X_test.shape[1])) # Repeats rows if the test set is small
+    batch = []
+    for _ in range(BATCH_REPEATS):
+        started = perf_counter()
+        loaded.predict(batch_X, COMPILED_CHUNK_ROWS)
+        batch.append(perf_counter() - started)
+    single_ms = np.asarray(single) * 1000.0
+    return {'single_p50_ms': round(float(np.percentile(single_ms, 50)), 4),
+            'single_p95_ms': round(float(np.percentile(single_ms, 95)), 4),
+            'batch_ms': round(float(np.median(batch)) * 1000.0, 3)}
+
+def select_model(X, y, trees, depths, include_hgb=False, budget=ACCURACY_BUDGET):
+    """
+    Fits every candidate on the same split and measures accuracy, serving
+    latency and artifact size. Among candidates within `budget` of the best
+    accuracy, the one with the lowest single-row p50 wins (batch latency
+    breaks ties). Fitted candidates are not kept in memory: the winner is
+    read back from its scratch artifact. Returns (model, accuracy, report).
+    """
+    print("   🧹 Starting Model Selection...")
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train = pd.DataFrame(X_train, columns=FEATURE_COLUMNS)
+    X_test_df = pd.DataFrame(X_test, columns=FEATURE_COLUMNS)
+    X_test = np.ascontiguousarray(X_test, dtype=np.float32)
+
+    results, candidate_dirs = [], {}
+    scratch = tempfile.mkdtemp(prefix="model-select-")
+    try:
+        for name, model in candidates(trees, depths, include_hgb):
+            started = perf_counter()
+            model.fit(X_train, y_train)
+            fit_s = perf_counter() - started
+            acc = accuracy_score(y_test, model.predict(X_test_df))
+
+            candidate_dir = os.path.join(scratch, name)
+            os.makedirs(candidate_dir)
+            info = save_artifact(model, FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, float(acc), candidate_dir)
+            version_dir = os.path.join(candidate_dir, info['version'])
+            size = sum(os.path.getsize(os.path.join(version_dir, f)) for f in os.listdir(version_dir))
+
+            result = {'name': name, 'estimator': type(model).__name__, 'params': model.get_params(),
+                      'accuracy': round(float(acc), 6), 'fit_s': round(fit_s, 2), 'artifact_bytes': size,
+                      'kind': info['kind'], **serving_latency(load_artifact(candidate_dir), X_test)}
+            results.append(result)
+            candidate_dirs[name] = candidate_dir
+            print(f"   🌲 {name}: acc {acc*100:.2f}%, 1 row {result['single_p50_ms']} ms, "
+                  f"{BATCH_ROWS} rows {result['batch_ms']} ms, {size / 1e6:.1f} MB")
+            del model # Only the artifact on disk survives this iteration
+
+        best_acc = max(r['accuracy'] for r in results)
+        eligible = [r for r in results if r['accuracy'] >= best_acc - budget]
+        chosen = min(eligible, key=lambda r: (r['single_p50_ms'], r['batch_ms']))
+        print(f"🏆 Selected {chosen['name']} ({chosen['accuracy']*100:.2f}% vs best {best_acc*100:.2f}%)")
+        model = load_estimator(candidate_dirs[chosen['name']])
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {'accuracy_budget': budget, 'best_accuracy': best_acc, 'selected': chosen['name'],
+              'test_rows': int(len(y_test)), 'candidates': results}
+    return model, chosen['accuracy'], report
+
+def parse_depths(text):
+    return [None if d.strip().lower() in ("none", "full") else int(d) for d in text.split(",") if d.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the phishing URL model from threats.db.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read training_samples in chunks into a memory-mapped feature store (bounded RAM)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help=f"With --stream: extraction processes (this machine has {os.cpu_count()} cores)")
+    parser.add_argument("--no-store", action="store_true",
+                        help="Ignore the url_features table and extract every row")
+    parser.add_argument("--select", action="store_true",
+                        help="Sweep forest size/depth and keep the fastest model within --accuracy-budget")
+    parser.add_argument("--trees", default=SELECT_TREES, help="With --select: comma-separated n_estimators")
+    parser.add_argument("--depths", default=SELECT_DEPTHS, help="With --select: comma-separated max_depth ('none' = unlimited)")
+    parser.add_argument("--hgb", action="store_true", help="With --select: also try HistGradientBoostingClassifier")
+    parser.add_argument("--accuracy-budget", type=float, default=ACCURACY_BUDGET,
+                        help="With --select: max accuracy drop (fraction) accepted for a faster model")
+    args = parser.parse_args()
+
+    if args.stream:
+        X, y = build_feature_store(DB_PATH, args.chunk_size, use_store=not args.no_store, workers=args.workers)
+    else:
+        X, y = load_in_memory(DB_PATH, use_store=not args.no_store)
+
+    report = None
+    if args.select:
+        model, acc, report = select_model(X, y, [int(t) for t in args.trees.split(",") if t.strip()],
+                                          parse_depths(args.depths), args.hgb, args.accuracy_budget)
+    else:
+        model, acc = train(X, y)
     
-    joblib.dump({"model": model, "features": feature_cols}, MODEL_FILE)
-    print("✅ Model Saved.")
\ No newline at end of file
+    joblib.dump({"model": model, "features": FEATURE_COLUMNS, "schema_version": FEATURE_SCHEMA_VERSION}, MODEL_FILE)
+    print("✅ Model Saved.")
+    # Versioned, memory-mapped copy; running servers hot-swap to it
+    info = save_artifact(model, FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, float(acc), MODELS_DIR,
+                         extra={'training_rows': int(len(y)),
+                                **({'selected_candidate': report['selected']} if report else {})})
+    print(f"✅ Model artifact {info['version']} published in {MODELS_DIR}/")
+    if report is not None:
+        report_path = os.path.join(MODELS_DIR, info['version'], SELECTION_REPORT)
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"📊 Selection report saved to {report_path}")
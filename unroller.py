@@ -0,0 +1,176 @@
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, Future
+from time import monotonic
+from urllib.parse import urljoin, urlparse
+from requests.adapters import HTTPAdapter
+from cache import LRUCache
+
+log = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+MAX_WORKERS = 16         # Threads doing network I/O (shared by every request handler)
+MAX_PENDING = 256        # Global limit on queued + running unrolls; beyond this we shed load
+MAX_HOPS = 5             # Redirect hop cap
+DEADLINE = 3.0           # Total seconds for one short link, all hops included
+POOL_PER_HOST = 4        # Keep-alive connections per shortener host
+OTHER_HOSTS = 32         # Destination hosts the shared session keeps pools for (LRU, urllib3 closes the rest)
+CACHE_SIZE = 50000
+CACHE_TTL = 24 * 3600    # Short links rarely change target
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+class RedirectUnroller:
+    """
+    Resolves shortened links on a shared thread pool so request handlers
+    never sit on a socket themselves. Handlers wait a bounded time for the
+    answer; if it is late they carry on with the original URL while the
+    lookup finishes in the background and lands in the cache for next time.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING, max_hops=MAX_HOPS,
+                 deadline=DEADLINE, pool_per_host=POOL_PER_HOST, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL,
+                 is_shortener=None):
+        self.max_hops = max_hops
+        self.deadline = deadline
+        self.pool_per_host = pool_per_host
+        self.cache = LRUCache(cache_size, cache_ttl)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="unroller")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.is_shortener = is_shortener or (lambda host: False)
+        self._sessions = {}
+        self._shared = self._new_session(OTHER_HOSTS)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.shed = 0
+        self.failures = 0
+
+    # --- CONNECTION POOLS ---
+    def _new_session(self, hosts):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=hosts, pool_maxsize=self.pool_per_host, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _session(self, url):
+        """
+        One keep-alive Session per shortener host, so repeat hits skip TCP/TLS
+        setup. Every other hop (destinations, intermediate trackers) shares one
+        Session whose pool count is capped, so arbitrary hosts can't grow memory.
+        """
+        parts = urlparse(url)
+        if not self.is_shortener(parts.hostname or ""):
+            return self._shared
+        with self._lock:
+            session = self._sessions.get(parts.netloc)
+            if session is None:
+                session = self._new_session(1)
+                self._sessions[parts.netloc] = session
+            return session
+
+    # --- THE ACTUAL WALK ---
+    def _unroll(self, url):
+        """
+        Follows Location headers hop by hop (HEAD, no body) until a non-redirect
+        answer, the hop cap or the total deadline. Returns (last_url, ok); only
+        clean walks are cached, so a flaky shortener gets retried next time.
+        """
+        started = monotonic()
+        current = url
+        ok = True
+        try:
+            for _ in range(self.max_hops):
+                remaining = self.deadline - (monotonic() - started)
+                if remaining <= 0:
+                    ok = False
+                    break
+                response = self._session(current).head(current, allow_redirects=False, timeout=remaining)
+                response.close()
+                location = response.headers.get("Location")
+                if response.status_code not in REDIRECT_CODES or not location:
+                    break
+                current = urljoin(current, location)
+            else:
+                ok = False # Still redirecting at the hop cap (e.g. a loop): `current` is just a midpoint
+        except requests.RequestException:
+            # Once we have a Location, an unreachable destination is still an answer
+            with self._lock:
+                self.failures += 1
+            ok = current != url
+
+        if current != url:
+            log.debug("   🔄 Unrolled: %s  --->  %s", url, current)
+        if ok:
+            self.cache.set(url, current)
+        return current, ok
+
+    def _run(self, url):
+        try:
+            return self._unroll(url)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    # --- PUBLIC API ---
+    def submit(self, url):
+        """
+        Returns a Future for (final_url, ok). Cached answers resolve immediately,
+        concurrent requests for the same link share one lookup, and when the
+        pending limit is hit the Future resolves to (url, False) at once.
+        """
+        cached = self.cache.get(url)
+        if cached is not None:
+            return _done((cached, True))
+
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is not None:
+                return future
+            if not self._slots.acquire(blocking=False):
+                self.shed += 1
+                return _done((url, False))
+            future = self._executor.submit(self._run, url)
+            self._inflight[url] = future
+            return future
+
+    def resolve(self, url, wait=None):
+        """
+        Final URL for one link. Returns (final_url, complete); complete is False
+        when the walk failed or we gave up waiting, i.e. the caller is analysing
+        a URL that may not be the real destination.
+        """
+        return self.resolve_many([url], wait)[url]
+
+    def resolve_many(self, urls, wait=None):
+        """
+        Unrolls many links concurrently under ONE shared wait budget.
+        Returns {url: (final_url, complete)}.
+        """
+        wait = self.deadline if wait is None else wait
+        futures = {url: self.submit(url) for url in dict.fromkeys(urls)}
+        give_up_at = monotonic() + wait
+        results = {}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result(timeout=max(0.0, give_up_at - monotonic()))
+            except FutureTimeout:
+                results[url] = (url, False)
+        return results
+
+    def stats(self):
+        return {'cache': self.cache.stats(), 'in_flight': len(self._inflight),
+                'shed': self.shed, 'failures': self.failures, 'pooled_hosts': len(self._sessions)}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for session in self._sessions.values():
+            session.close()
+        self._shared.close()
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
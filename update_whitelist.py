@@ -1,12 +1,19 @@
 import requests
+import sys
 import zipfile
 import io
 import os
+import tempfile
+import argparse
+import numpy as np
+from domain_index import DomainIndex, domain_hashes, normalize_domain
 
 # --- CONFIGURATION ---
-WHITELIST_FILE = "whitelist.txt"
-TOP_N = 1000000  
+WHITELIST_FILE = "whitelist.bin"  # Binary, memory-mappable (see domain_index.py)
+TOP_N = 1000000
 TRANCO_URL = "https://tranco-list.eu/top-1m.csv.zip"
+HASH_BATCH = 100000   # Domains hashed per step (bounds memory while streaming)
+DOWNLOAD_CHUNK = 1 << 20
 
 # Your specific PH focus list (Manual Override)
 MANUAL_LIST = [
@@ -23,43 +30,91 @@ MANUAL_LIST = [
     "dti.gov.ph", "sec.gov.ph", "dfa.gov.ph", "poea.gov.ph", "prc.gov.ph","pinnacle.pnc.edu.ph"
 ]
 
-def update_whitelist():
-    print(f"🌍 Downloading Top {TOP_N} Global Sites (Tranco List)...")
-    final_domains = set()
+def download_zip(url, dest):
+    """Streams the archive to disk in chunks (a zip needs seeking, so not to RAM)."""
+    with requests.get(url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        for chunk in r.iter_content(DOWNLOAD_CHUNK):
+            dest.write(chunk)
+    dest.flush()
+
+def iter_tranco_domains(zip_path, top_n=TOP_N):
+    """Yields domains from a Tranco zip ("1,google.com" per line) without loading it whole."""
+    with zipfile.ZipFile(zip_path) as z:
+        with z.open(z.namelist()[0]) as raw:
+            for i, line in enumerate(io.TextIOWrapper(raw, encoding="utf-8")):
+                if i >= top_n:
+                    break
+                parts = line.strip().split(',')
+                if len(parts) >= 2:
+                    yield parts[1]
+
+def hash_stream(domains, batch=HASH_BATCH):
+    """Hashes a domain stream a batch at a time; only uint64 arrays are kept."""
+    chunks = []
+    pending = []
+    for domain in domains:
+        domain = normalize_domain(domain)
+        if domain:
+            pending.append(domain)
+        if len(pending) >= batch:
+            chunks.append(domain_hashes(pending))
+            pending = []
+    if pending:
+        chunks.append(domain_hashes(pending))
+    return chunks
+
+class WhitelistError(Exception):
+    """The global list could not be fetched or parsed; nothing was written."""
+
+def update_whitelist(zip_path=None, output=WHITELIST_FILE, top_n=TOP_N):
+    """
+    Builds and saves the index. Raises WhitelistError (leaving `output`
+    untouched) if the Tranco list fails: every server hot-reloads this file,
+    so a manual-list-only index would silently shrink all of them at once.
+    """
+    print(f"🌍 Building whitelist from Top {top_n} Global Sites (Tranco List)...")
 
     # 1. Add Manual List first (Priority)
-    for domain in MANUAL_LIST:
-        final_domains.add(domain.strip().lower())
-    print(f"   ✅ Added {len(final_domains)} manual PH domains.")
+    chunks = hash_stream(MANUAL_LIST)
+    print(f"   ✅ Added {len(MANUAL_LIST)} manual PH domains.")
 
-    # 2. Download & Parse Global List
+    # 2. Stream & Hash Global List
+    tmp = None
     try:
-        r = requests.get(TRANCO_URL)
-        z = zipfile.ZipFile(io.BytesIO(r.content))
-        
-        # The zip contains a CSV like: "1,google.com"
-        with z.open(z.namelist()[0]) as f:
-            for i, line in enumerate(f):
-                if i >= TOP_N: 
-                    break
-                # Decode bytes to string, split by comma, get the domain part
-                parts = line.decode('utf-8').strip().split(',')
-                if len(parts) >= 2:
-                    domain = parts[1]
-                    final_domains.add(domain)
-                    
-        print(f"   ✅ Merged with Global Top {TOP_N} sites.")
-        
+        if zip_path is None:
+            tmp = tempfile.NamedTemporaryFile(suffix=".zip", delete=False)
+            download_zip(TRANCO_URL, tmp)
+            tmp.close()
+            zip_path = tmp.name
+        tranco = hash_stream(iter_tranco_domains(zip_path, top_n))
     except Exception as e:
-        print(f"   ❌ Error fetching global list: {e}")
-        print("   ⚠️ Saving only manual list.")
+        raise WhitelistError(f"Error fetching global list: {e}") from e
+    finally:
+        if tmp is not None:
+            tmp.close()
+            os.unlink(tmp.name)
+    if not sum(len(c) for c in tranco):
+        raise WhitelistError(f"No domains found in {zip_path}")
+    chunks += tranco
+    print(f"   ✅ Merged with Global Top {top_n} sites.")
 
-    # 3. Save to file
-    with open(WHITELIST_FILE, "w") as f:
-        for domain in sorted(final_domains):
-            f.write(domain + "\n")
+    # 3. Sort + dedupe + save (atomic rename; running servers pick it up)
+    index = DomainIndex.from_hashes(np.concatenate(chunks))
+    index.save(output)
 
-    print(f"💾 Saved {len(final_domains)} safe domains to {WHITELIST_FILE}")
+    print(f"💾 Saved {len(index)} safe domains to {output} ({index.nbytes / 1e6:.1f} MB)")
+    return index
 
 if __name__ == "__main__":
-    update_whitelist()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the binary domain whitelist.")
+    parser.add_argument("--zip", help="Use a local Tranco zip instead of downloading it")
+    parser.add_argument("--output", default=WHITELIST_FILE)
+    parser.add_argument("--top", type=int, default=TOP_N)
+    args = parser.parse_args()
+    try:
+        update_whitelist(args.zip, args.output, args.top)
+    except WhitelistError as e:
+        print(f"   ❌ {e}")
+        print(f"   ⚠️ {args.output} left unchanged.")
+        sys.exit(1)
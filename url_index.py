@@ -0,0 +1,154 @@
+import os
+import time
+import struct
+import sqlite3
+import numpy as np
+from features import url_fingerprint
+
+# --- CONFIGURATION ---
+# Every labeled URL in training_samples as (fingerprint, label), for exact
+# matches before the model. Fingerprints are the same signed 64-bit
+# blake2b keys the feature store uses (features.url_fingerprint).
+#
+# On-disk format (little endian): 40-byte header, then `count` sorted int64
+# fingerprints, then `count` int8 labels (0 = phishing, 1 = legitimate).
+#   magic "PHURLIX\0" | format u32 | reserved u32 | count u64 | max_rowid u64 | built_at u64
+MAGIC = b"PHURLIX\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ")
+INDEX_FILE = "known_urls.bin"
+CHUNK_SIZE = 100000
+LABELS = {'phishing': 0, 'danger': 0, '0': 0, 'legitimate': 1, 'safe': 1, '1': 1}
+
+class KnownURLIndex:
+    """
+    Sorted int64 URL fingerprints with a parallel int8 label array. A lookup
+    is one blake2b and one np.searchsorted over the memory-mapped keys.
+    `max_rowid` is the highest training_samples rowid included, so an
+    update only has to read rows added since.
+    """
+
+    def __init__(self, hashes, labels, max_rowid=0, built_at=0):
+        self.hashes = hashes
+        self.labels = labels
+        self.max_rowid = int(max_rowid)
+        self.built_at = int(built_at)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8))
+
+    @classmethod
+    def from_pairs(cls, hashes, labels, max_rowid=0, built_at=0):
+        """Sorts by fingerprint; a URL seen with both labels is kept as phishing."""
+        hashes = np.asarray(hashes, dtype=np.int64)
+        labels = np.asarray(labels, dtype=np.int8)
+        order = np.lexsort((labels, hashes)) # By hash, then phishing (0) first
+        hashes, labels = hashes[order], labels[order]
+        first = np.ones(len(hashes), dtype=bool)
+        first[1:] = hashes[1:] != hashes[:-1]
+        return cls(hashes[first], labels[first], max_rowid, built_at)
+
+    # --- BUILDING FROM threats.db ---
+    @staticmethod
+    def read_rows(conn, after_rowid=0, chunk_size=CHUNK_SIZE):
+        """(fingerprints, labels, max_rowid) of training_samples rows with rowid > after_rowid."""
+        hashes, labels = [], []
+        max_rowid = after_rowid
+        cursor = conn.execute("SELECT rowid, content, status FROM training_samples WHERE rowid > ? ORDER BY rowid",
+                              (after_rowid,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            max_rowid = rows[-1][0]
+            for _, content, status in rows:
+                label = LABELS.get(str(status).lower().strip())
+                if content is None or label is None:
+                    continue
+                hashes.append(url_fingerprint(content))
+                labels.append(label)
+        return np.array(hashes, dtype=np.int64), np.array(labels, dtype=np.int8), max_rowid
+
+    def updated(self, conn, built_at=0):
+        """This index plus every row added after `max_rowid`."""
+        hashes, labels, max_rowid = self.read_rows(conn, self.max_rowid)
+        if not len(hashes):
+            return KnownURLIndex(self.hashes, self.labels, max_rowid, self.built_at)
+        return KnownURLIndex.from_pairs(np.concatenate([self.hashes, hashes]),
+                                        np.concatenate([self.labels, labels]), max_rowid, built_at)
+
+    # --- BINARY ARTIFACT ---
+    def save(self, path):
+        """Writes next to `path` and renames into place (readers never see half a file)."""
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self.hashes), self.max_rowid, self.built_at))
+            f.write(np.ascontiguousarray(self.hashes, dtype="<i8").tobytes())
+            f.write(np.ascontiguousarray(self.labels, dtype=np.int8).tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-maps both arrays read-only, like DomainIndex.load()."""
+        with open(path, "rb") as f:
+            magic, fmt, _, count, max_rowid, built_at = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a v{FORMAT_VERSION} known-URL index")
+        if count == 0:
+            return cls(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8), max_rowid, built_at)
+        hashes = np.memmap(path, dtype="<i8", mode="r", offset=HEADER.size, shape=(count,))
+        labels = np.memmap(path, dtype=np.int8, mode="r", offset=HEADER.size + 8 * count, shape=(count,))
+        return cls(hashes, labels, max_rowid, built_at)
+
+    # --- LOOKUP ---
+    def lookup(self, url):
+        """0 (phishing) / 1 (legitimate) for a URL in the table, else None."""
+        if not len(self.hashes):
+            return None
+        h = url_fingerprint(url)
+        pos = int(np.searchsorted(self.hashes, h))
+        if pos < len(self.hashes) and self.hashes[pos] == h:
+            return int(self.labels[pos])
+        return None
+
+    def lookup_many(self, urls):
+        """int8 label per URL, -1 where unknown (one searchsorted for the batch)."""
+        out = np.full(len(urls), -1, dtype=np.int8)
+        if not len(self.hashes) or not len(urls):
+            return out
+        keys = np.fromiter((url_fingerprint(u) for u in urls), dtype=np.int64, count=len(urls))
+        pos = np.searchsorted(self.hashes, keys)
+        pos[pos == len(self.hashes)] = 0
+        hit = np.asarray(self.hashes[pos]) == keys
+        out[hit] = self.labels[pos[hit]]
+        return out
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @property
+    def nbytes(self):
+        return self.hashes.nbytes + self.labels.nbytes
+
+def update_index(db_path, path=INDEX_FILE, full=False):
+    """
+    Brings `path` up to date with training_samples. Only rows past the stored
+    watermark are read, unless `full` or the table was rebuilt underneath
+    (its max rowid fell below the watermark). The file is only rewritten
+    when something changed. Returns the up-to-date index.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        index = KnownURLIndex.empty()
+        if not full and os.path.exists(path):
+            index = KnownURLIndex.load(path)
+            table_max = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM training_samples").fetchone()[0]
+            if table_max < index.max_rowid:
+                index = KnownURLIndex.empty()
+        new_index = index.updated(conn, int(time.time()))
+    finally:
+        conn.close()
+    if new_index.max_rowid != index.max_rowid or full or not os.path.exists(path):
+        new_index.save(path)
+    return new_index
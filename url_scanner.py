@@ -0,0 +1,89 @@
+import os
+import re
+import json
+from domain_index import candidate_suffixes, normalize_domain
+
+# --- CONFIGURATION ---
+# Keyword, TLD, brand and shortener lists. Features depend on them: bump
+# FEATURE_SCHEMA_VERSION in features.py after editing the first three.
+PATTERNS_FILE = os.environ.get("PATTERNS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns.json"))
+
+def load_patterns(path=PATTERNS_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        patterns = json.load(f)
+    return {'sus_keywords': list(patterns.get('sus_keywords', [])),
+            'bad_tlds': list(patterns.get('bad_tlds', [])),
+            'brands': dict(patterns.get('brands', {})),
+            'shorteners': list(patterns.get('shorteners', []))}
+
+def trie_regex(words):
+    """
+    Regex alternation shaped as a prefix trie (a(?:ccount|mazon|pple)|...):
+    at each position the engine follows one branch per character instead of
+    retrying every word, so all words are searched in a single scan.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+class URLScanner:
+    """
+    Every pattern feature of a lowercased URL from one compiled matcher.
+
+    Keywords and brand names share one trie regex wrapped in a lookahead, so
+    a single findall() reports overlapping hits anywhere in the URL. TLDs and
+    shorteners are matched against the hostname, not the whole string:
+    'http://x.com/page.info' is not a .info site and 'microsoft.com' is not t.co.
+    """
+
+    def __init__(self, keywords, bad_tlds, brands, shorteners):
+        self.keywords = frozenset(keywords)
+        self.brands = dict(brands)
+        words = self.keywords | set(self.brands)
+        self._matcher = re.compile('(?=(' + trie_regex(words) + '))') if words else None
+        # The trie reports the longest word at a position; shorter listed words it starts with matched too
+        self._implied = {w: tuple(p for p in words if w.startswith(p)) for w in words}
+        self.bad_tld_suffixes = tuple('.' + t.strip('.').lower() for t in bad_tlds)
+        self.shorteners = frozenset(normalize_domain(s) for s in shorteners)
+
+    @classmethod
+    def from_config(cls, path=PATTERNS_FILE):
+        p = load_patterns(path)
+        return cls(p['sus_keywords'], p['bad_tlds'], p['brands'], p['shorteners'])
+
+    def hits(self, url):
+        """Set of keywords/brand names occurring in `url`."""
+        found = set()
+        if self._matcher is not None:
+            for hit in self._matcher.findall(url):
+                found.update(self._implied[hit])
+        return found
+
+    def is_bad_tld(self, host):
+        return 1 if host.endswith(self.bad_tld_suffixes) else 0
+
+    def is_shortener(self, host):
+        return any(s in self.shorteners for s in candidate_suffixes(host))
+
+    def scan(self, url, netloc):
+        """
+        (sus_word_count, is_bad_tld, is_impersonating) for a lowercased URL
+        and its netloc. A brand counts as impersonated when its name appears
+        but its real domain is not in the netloc.
+        """
+        found = self.hits(url)
+        host = netloc.rsplit('@', 1)[-1].split(':', 1)[0].rstrip('.')
+        return (len(found & self.keywords), self.is_bad_tld(host),
+                1 if any(self.brands[b] not in netloc for b in found if b in self.brands) else 0)